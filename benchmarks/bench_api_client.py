@@ -0,0 +1,137 @@
+# benchmarks/bench_api_client.py
+#
+# Runs a local stand-in for the product catalog API with injected latency (and an
+# optional failure rate) and compares serial paging against the async client.
+#
+# Usage: python benchmarks/bench_api_client.py [products] [latency_ms] [failure_rate]
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import threading
+import http.client
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.api_client import AsyncProductClient
+
+PAGE_SIZE = 100
+
+
+def make_catalog(count):
+    return [{
+        "ProductID": f"P{i:03d}",
+        "ProductName": f"Product{i:03d}",
+        "Category": random.choice(["Electronics", "Accessories", "Office"]),
+        "Price": round(random.uniform(100, 10000), 2)
+    } for i in range(1, count + 1)]
+
+
+def start_server(catalog, latency, failure_rate):
+    by_id = {product["ProductID"]: product for product in catalog}
+
+    class CatalogHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive
+
+        def do_GET(self):
+            time.sleep(latency)
+            if random.random() < failure_rate:
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            query = parse_qs(urlsplit(self.path).query)
+            if 'ids' in query:
+                ids = query['ids'][0].split(',')
+                payload = {"products": [by_id[i] for i in ids if i in by_id]}
+            else:
+                page = int(query.get('page', ['1'])[0])
+                limit = int(query.get('limit', [str(PAGE_SIZE)])[0])
+                payload = {"products": catalog[(page - 1) * limit:page * limit], "total": len(catalog)}
+
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CatalogHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fetch_serial(port):
+    """
+    Baseline: one keep-alive connection, one page after another
+    """
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    products, page, total = [], 1, None
+    while total is None or len(products) < total:
+        while True:
+            connection.request('GET', f'/products?page={page}&limit={PAGE_SIZE}')
+            response = connection.getresponse()
+            body = response.read()
+            if response.status == 200:
+                break
+        payload = json.loads(body)
+        products.extend(payload['products'])
+        total = payload['total']
+        page += 1
+    connection.close()
+    return products
+
+
+async def fetch_async(port):
+    async with AsyncProductClient(f'http://127.0.0.1:{port}', page_size=PAGE_SIZE, retries=5) as client:
+        start = time.perf_counter()
+        products = await client.fetch_all_products()
+        all_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        wanted = [product["ProductID"] for product in products[::7]]
+        looked_up = await client.fetch_products_by_ids(wanted)
+        ids_seconds = time.perf_counter() - start
+        return products, all_seconds, looked_up, ids_seconds, client
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    failure_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+
+    catalog = make_catalog(count)
+    server = start_server(catalog, latency, failure_rate)
+    port = server.server_address[1]
+    pages = -(-count // PAGE_SIZE)
+    print(f"Stand-in API: {count} products, {pages} pages, {latency * 1000:.0f} ms latency, "
+          f"{failure_rate:.0%} failures")
+
+    start = time.perf_counter()
+    serial = fetch_serial(port)
+    serial_seconds = time.perf_counter() - start
+
+    products, async_seconds, looked_up, ids_seconds, client = asyncio.run(fetch_async(port))
+    server.shutdown()
+
+    assert products == catalog and serial == catalog, "fetched catalog differs from the source"
+    assert len(looked_up) == len(catalog[::7]), "batched lookup missed products"
+
+    print(f"{'Serial paging':<24} {serial_seconds:>8.3f} s")
+    print(f"{'Async client':<24} {async_seconds:>8.3f} s  ({serial_seconds / async_seconds:.1f}x faster)")
+    print(f"{'Batched id lookup':<24} {ids_seconds:>8.3f} s  ({len(looked_up)} products)")
+    print(f"Requests sent: {client.requests_sent}, connections opened: {client.connections_opened}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/bench_batch.py
+#
+# Wall time of batch ingestion (aggregate_files over a drop directory of
+# generated files) with one worker versus more, and the speedup over one.
+# The speedup is bounded by the cores available to this process; on one core
+# extra workers only add process start-up and pickling.
+#
+# Usage: python benchmarks/bench_batch.py [--files 8] [--rows 200000] [--workers 1,2,4]
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_sales_data import generate
+from utils.batch import expand_inputs
+from utils.parallel import aggregate_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch ingestion speedup over one worker")
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--rows', type=int, default=200_000, help="rows per file")
+    parser.add_argument('--workers', default=None,
+                        help="comma-separated worker counts (default: 1, 2, 4, ... up to the available cores)")
+    args = parser.parse_args()
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    if args.workers:
+        counts = [int(n) for n in args.workers.split(',')]
+    else:
+        counts = [1]
+        while counts[-1] * 2 <= max(cores, 2):
+            counts.append(counts[-1] * 2)
+
+    with tempfile.TemporaryDirectory() as drop:
+        for i in range(args.files):
+            generate(os.path.join(drop, f"store_{i:02d}.txt"), args.rows, seed=i)
+        filenames = expand_inputs([drop])
+        size_mb = sum(os.path.getsize(f) for f in filenames) / 1e6
+        print(f"{len(filenames)} files, {size_mb:.1f} MB, {cores} core(s) available")
+        print(f"{'Workers':>8} {'Time (s)':>10} {'MB/s':>8} {'Speedup':>8}")
+
+        baseline = rows = None
+        for workers in counts:
+            start = time.perf_counter()
+            results = aggregate_files(filenames, workers)
+            seconds = time.perf_counter() - start
+            kept = sum(agg.row_count for agg, _ in results.values())
+            assert rows is None or kept == rows, "worker counts disagree on the result"
+            rows = kept
+            baseline = baseline or seconds
+            print(f"{workers:>8} {seconds:>10.3f} {size_mb / seconds:>8.1f} {baseline / seconds:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# benchmarks/bench_cache.py
+#
+# Compares parsing the text file with loading the binary transaction cache.
+#
+# Usage: python benchmarks/bench_cache.py [path/to/sales_data.txt]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.file_handler import read_sales_data, cache_path, load_transactions
+from utils.data_processor import parse_transactions
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'data/sales_data.txt'
+    cache = cache_path(filename)
+    if os.path.exists(cache):
+        os.remove(cache)
+
+    parsed, parse_seconds = timed(lambda f: parse_transactions(read_sales_data(f)), filename)
+    _, cold_seconds = timed(load_transactions, filename)
+    # The cache is decoded lazily, so the warm load is timed over one streaming pass
+    _, warm_seconds = timed(lambda f: sum(1 for _ in load_transactions(f)), filename)
+    assert list(load_transactions(filename)) == parsed, "cache returned different transactions"
+
+    print(f"File: {filename} ({os.path.getsize(filename) / 1e6:.1f} MB, {len(parsed)} rows)")
+    print(f"Cache: {cache} ({os.path.getsize(cache) / 1e6:.1f} MB)")
+    print(f"{'Text parse':<28} {parse_seconds:>8.3f} s")
+    print(f"{'First load (parse + write)':<28} {cold_seconds:>8.3f} s")
+    print(f"{'Warm load (mmap, one pass)':<28} {warm_seconds:>8.3f} s  ({parse_seconds / warm_seconds:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_columnar.py
+#
+# Analytics over the NumPy columnar store (main.py --columnar) against the
+# per-row SalesAggregator. Rows from a sales file are parsed and validated once;
+# building each representation and running the Part 2 analytics on it are timed
+# separately. --synthetic N skips parsing and fills N rows of random columns
+# directly, to check the vectorized analytics at 10M rows.
+#
+# Usage: python benchmarks/bench_columnar.py [--input FILE] [--rows 1000000]
+#            [--synthetic 10000000]
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.file_handler import iter_sales_data
+from utils.data_processor import iter_transactions, iter_valid_transactions, aggregate_sales
+from utils import data_processor, columnar
+from utils.columnar import ColumnarTransactions, np
+from generate_sales_data import generate
+
+VIEWS = ('calculate_total_revenue', 'region_wise_sales', 'top_selling_products', 'customer_analysis',
+         'daily_sales_trend')
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def run_views(module, source):
+    for name in VIEWS:
+        getattr(module, name)(source)
+
+
+def synthetic_columns(rows, seed=42):
+    """
+    Random columns with the cardinalities of generate_sales_data's defaults
+    """
+    rng = np.random.default_rng(seed)
+    return ColumnarTransactions(
+        rng.integers(1, 20, rows), rng.uniform(100, 100_000, rows).round(2),
+        rng.integers(0, 4, rows), rng.integers(0, 100, rows), rng.integers(0, 10_000, rows),
+        rng.integers(0, 30, rows),
+        ['North', 'South', 'East', 'West'], [f"Product{i:03d}" for i in range(100)],
+        [f"C{i:05d}" for i in range(10_000)], [f"2024-12-{i + 1:02d}" for i in range(30)]
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark columnar analytics")
+    parser.add_argument('--input', help="sales file to analyze (default: generated)")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="rows to generate without --input")
+    parser.add_argument('--synthetic', type=int, metavar='N',
+                        help="also time the vectorized analytics on N random rows (e.g. 10000000)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if np is None:
+        print("Error: NumPy is required (pip install numpy)")
+        sys.exit(1)
+
+    filename = args.input
+    if filename is None:
+        filename = os.path.join(tempfile.gettempdir(), f"bench_columnar_{args.rows}.txt")
+        if not os.path.exists(filename):
+            generate(filename, args.rows)
+
+    valid = list(iter_valid_transactions(iter_transactions(iter_sales_data(filename))))
+    print(f"{len(valid)} valid rows from {filename}")
+
+    build_agg, sales_agg = timed(lambda: aggregate_sales(valid))
+    build_columns, columns = timed(lambda: ColumnarTransactions.from_transactions(valid))
+    views_agg, _ = timed(lambda: run_views(data_processor, sales_agg))
+    views_columns, _ = timed(lambda: run_views(columnar, columns))
+    fill_agg, _ = timed(columns.aggregate)
+
+    print(f"  {'build SalesAggregator':<28} {build_agg:>8.3f} s")
+    print(f"  {'build columns':<28} {build_columns:>8.3f} s")
+    print(f"  {'views over SalesAggregator':<28} {views_agg:>8.3f} s")
+    print(f"  {'vectorized views':<28} {views_columns:>8.3f} s")
+    print(f"  {'columns -> SalesAggregator':<28} {fill_agg:>8.3f} s  (what main.py --columnar runs)")
+
+    if args.synthetic:
+        _, columns = timed(lambda: synthetic_columns(args.synthetic))
+        seconds, _ = timed(lambda: run_views(columnar, columns))
+        print(f"{args.synthetic} synthetic rows")
+        print(f"  {'vectorized views':<28} {seconds:>8.3f} s  {args.synthetic / seconds / 1e6:>6.2f} M rows/s")
+        seconds, _ = timed(columns.aggregate)
+        print(f"  {'columns -> SalesAggregator':<28} {seconds:>8.3f} s  {args.synthetic / seconds / 1e6:>6.2f} M rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_dedup.py
+#
+# Time and memory of duplicate-TransactionID detection: exact hash set versus
+# Bloom filter with on-disk (SQLite) confirmation. Each mode runs in its own
+# process so peak RSS (which includes SQLite's page cache) is comparable;
+# tracemalloc is not used because it would slow the 10M-ID runs down several times.
+#
+# Usage: python benchmarks/bench_dedup.py [--ids 10000000] [--duplicates 0.01] [--error-rate 0.001]
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.dedup import ExactDeduplicator, BloomDeduplicator
+
+
+def iter_ids(count, duplicates, seed=42):
+    """
+    `count` TransactionIDs where a `duplicates` fraction replays an earlier ID
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        if i and rng.random() < duplicates:
+            yield f"T{rng.randrange(i):010d}"
+        else:
+            yield f"T{i:010d}"
+
+
+def peak_rss():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def run_child(mode, count, duplicates, error_rate):
+    ids = iter_ids(count, duplicates)
+    baseline = peak_rss()
+    if mode == 'exact':
+        dedup = ExactDeduplicator()
+    else:
+        dedup = BloomDeduplicator(capacity=count, error_rate=error_rate)
+
+    start = time.perf_counter()
+    removed = sum(1 for transaction_id in ids if dedup.seen(transaction_id))
+    seconds = time.perf_counter() - start
+    result = {
+        'mode': mode,
+        'seconds': round(seconds, 3),
+        'removed': removed,
+        'rss_bytes': peak_rss() - baseline,
+        'stats': dedup.stats
+    }
+    if mode == 'bloom':
+        result['filter_bytes'] = len(dedup.bloom.bits)
+    dedup.close()
+    print(json.dumps(result))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark exact vs Bloom-filter TransactionID dedup")
+    parser.add_argument('--ids', type=int, default=10_000_000)
+    parser.add_argument('--duplicates', type=float, default=0.01, help="fraction of replayed IDs (default: 0.01)")
+    parser.add_argument('--error-rate', type=float, default=0.001, help="Bloom false-positive rate (default: 0.001)")
+    parser.add_argument('--child', choices=('exact', 'bloom'), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        run_child(args.child, args.ids, args.duplicates, args.error_rate)
+        return
+
+    print(f"{args.ids} IDs, {args.duplicates:.1%} duplicates, Bloom error rate {args.error_rate}")
+    results = {}
+    for mode in ('exact', 'bloom'):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', mode, '--ids', str(args.ids),
+             '--duplicates', str(args.duplicates), '--error-rate', str(args.error_rate)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        results[mode] = result = json.loads(output.strip().splitlines()[-1])
+        print(f"  {mode:<6} {result['seconds']:>8.2f} s  {result['rss_bytes'] / 1e6:>8.1f} MB peak RSS  "
+              f"{result['rss_bytes'] / args.ids:>6.1f} B/ID  removed {result['removed']}")
+        if mode == 'bloom':
+            stats = result['stats']
+            print(f"         filter {result['filter_bytes'] / 1e6:.1f} MB, "
+                  f"{stats['bloom_positives']} positives confirmed on disk, "
+                  f"{stats['false_positives']} false positives")
+
+    assert results['exact']['removed'] == results['bloom']['removed']
+    print(f"Bloom mode uses {results['exact']['rss_bytes'] / max(results['bloom']['rss_bytes'], 1):.1f}x less memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_enriched_writer.py
+#
+# Compares the original json.dump(indent=4) output of save_enriched_data with
+# the streaming writer's formats and compressions: write time, size, read time.
+#
+# Usage: python benchmarks/bench_enriched_writer.py [records]
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.api_handler import save_enriched_data, iter_enriched_data, enriched_path, COMPRESSION
+
+
+def make_records(count):
+    rng = random.Random(42)
+    regions = ['North', 'South', 'East', 'West']
+    for i in range(count):
+        matched = rng.random() < 0.8
+        quantity = rng.randint(1, 10)
+        unit_price = round(rng.uniform(100, 5000), 2)
+        yield {
+            "TransactionID": f"T{i:07d}",
+            "Date": f"2024-12-{rng.randint(1, 31):02d}",
+            "ProductID": f"P{rng.randint(101, 110)}",
+            "ProductName": rng.choice(['Laptop', 'Mouse', 'USB Cable', 'Monitor', 'Webcam']),
+            "Quantity": quantity,
+            "UnitPrice": unit_price,
+            "CustomerID": f"C{rng.randint(1, 5000):04d}",
+            "Region": rng.choice(regions),
+            "Amount": quantity * unit_price,
+            "API_Match": matched,
+            "Category": rng.choice(['electronics', 'accessories']) if matched else None,
+            "Price": round(rng.uniform(10, 2000), 2) if matched else None
+        }
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    records = list(make_records(count))
+    workdir = tempfile.mkdtemp()
+
+    baseline = os.path.join(workdir, 'baseline.json')
+
+    def dump_all():
+        with open(baseline, 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=4)
+
+    _, base_seconds = timed(dump_all)
+    base_size = os.path.getsize(baseline)
+
+    print(f"{count} enriched records")
+    print(f"{'format':<18} {'write s':>8} {'size MB':>9} {'vs base':>8} {'read s':>8}")
+    print(f"{'json.dump indent=4':<18} {base_seconds:>8.3f} {base_size / 1e6:>9.2f} {'1.0x':>8} {'-':>8}")
+
+    for fmt in ('json', 'ndjson'):
+        for compression in (None, *COMPRESSION):
+            output = os.path.join(workdir, f'enriched.{fmt}')
+            written, write_seconds = timed(save_enriched_data, iter(records), output, fmt, compression)
+            path = enriched_path(output, compression)
+            read_count, read_seconds = timed(lambda: sum(1 for _ in iter_enriched_data(path)))
+            assert written == read_count == count
+            size = os.path.getsize(path)
+            label = fmt + ('+' + compression if compression else '')
+            print(f"{label:<18} {write_seconds:>8.3f} {size / 1e6:>9.2f} "
+                  f"{base_size / size:>7.1f}x {read_seconds:>8.3f}")
+            os.remove(path)
+
+    os.remove(baseline)
+    os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# benchmarks/bench_pipeline.py
+#
+# Times and memory-profiles every pipeline stage on synthetic (or given) sales
+# files and writes the results as JSON, optionally comparing with an earlier run.
+#
+# Usage: python benchmarks/bench_pipeline.py [--rows 10000 100000] [--input FILE]
+#            [--output results.json] [--compare old.json] [--threshold 1.2] [--no-memory]
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+from datetime import datetime
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.file_handler import read_sales_data
+from utils.data_processor import (
+    parse_transactions,
+    validate_and_filter,
+    aggregate_sales,
+    calculate_total_revenue,
+    region_wise_sales,
+    top_selling_products,
+    customer_analysis,
+    daily_sales_trend,
+    find_peak_sales_day,
+    low_performing_products
+)
+from utils.api_handler import (
+    fetch_all_products,
+    iter_enrich_sales_data,
+    empty_enrichment_summary,
+    enrich_sales_data,
+    save_enriched_data
+)
+from utils.product_index import ProductIndex
+from utils.report_generator import generate_sales_report
+from generate_sales_data import generate
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def run_stage(func, memory):
+    """
+    Runs func once for wall time; with `memory`, runs it again under tracemalloc.
+    Returns: (result, seconds, peak bytes or None)
+    """
+    with redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+
+        peak = None
+        if memory:
+            tracemalloc.start()
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return result, seconds, peak
+
+
+def bench_file(filename, workdir, memory=True):
+    """
+    Returns: list of {'stage', 'seconds', 'peak_bytes', 'rows'} in pipeline order
+    """
+    stages = []
+    state = {}
+
+    def stage(name, func, rows=None):
+        result, seconds, peak = run_stage(func, memory)
+        stages.append({
+            'stage': name,
+            'seconds': round(seconds, 6),
+            'peak_bytes': peak,
+            'rows': rows(result) if rows else None
+        })
+        print(f"  {name:<26} {seconds:>9.4f} s" + (f" {peak / 1e6:>9.1f} MB peak" if peak is not None else ""))
+        return result
+
+    lines = stage('read_sales_data', lambda: read_sales_data(filename), len)
+    transactions = stage('parse_transactions', lambda: parse_transactions(lines), len)
+    valid = stage('validate_and_filter', lambda: validate_and_filter(transactions)[0], len)
+
+    sales_agg = stage('aggregate_sales', lambda: aggregate_sales(valid), lambda agg: agg.row_count)
+    # Each analytics function on the row list (its own aggregation pass), as a caller without the
+    # shared aggregator would run it; the report below uses the views over sales_agg
+    analytics = [
+        ('calculate_total_revenue', calculate_total_revenue),
+        ('region_wise_sales', region_wise_sales),
+        ('top_selling_products', top_selling_products),
+        ('customer_analysis', customer_analysis),
+        ('daily_sales_trend', daily_sales_trend),
+        ('find_peak_sales_day', find_peak_sales_day),
+        ('low_performing_products', low_performing_products)
+    ]
+    for name, func in analytics:
+        stage(name, lambda func=func: func(valid))
+        state[name] = func(sales_agg)
+
+    products = stage('fetch_all_products', fetch_all_products, len)
+    index = ProductIndex(products)
+    stage('enrich_sales_data', lambda: enrich_sales_data(valid, index), len)
+
+    output = os.path.join(workdir, 'enriched.json')
+    stage('save_enriched_data', lambda: save_enriched_data(valid, output))
+
+    summary = empty_enrichment_summary()
+    for _ in iter_enrich_sales_data(valid, index, summary):
+        pass
+    report = os.path.join(workdir, 'report.txt')
+    stage('generate_sales_report', lambda: generate_sales_report(
+        state['calculate_total_revenue'], state['region_wise_sales'], state['top_selling_products'],
+        state['customer_analysis'], state['daily_sales_trend'], summary, report
+    ))
+    return stages
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_file, threshold):
+    """
+    Prints per-stage time ratios against an earlier results file.
+    Returns: number of stages slower than `threshold` x the baseline
+    """
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    old = {(run['rows'], s['stage']): s for run in baseline['runs'] for s in run['stages']}
+
+    regressions = 0
+    print(f"\nComparison with {baseline_file} ({baseline['meta'].get('commit')})")
+    for run in results['runs']:
+        for s in run['stages']:
+            before = old.get((run['rows'], s['stage']))
+            if before is None or not before['seconds']:
+                continue
+            ratio = s['seconds'] / before['seconds']
+            flag = ''
+            if ratio > threshold and s['seconds'] - before['seconds'] > 0.001:
+                flag = '  <-- slower'
+                regressions += 1
+            print(f"  {run['rows']:>10} {s['stage']:<26} {before['seconds']:>9.4f} -> {s['seconds']:>9.4f} s "
+                  f"({ratio:.2f}x){flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the sales pipeline")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000],
+                        help="sizes of the generated input files (default: 10000 100000)")
+    parser.add_argument('--input', help="benchmark this sales file instead of generated ones")
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--dirty', type=float, default=0.1)
+    parser.add_argument('--output', help="results JSON (default: benchmarks/results/pipeline-<time>.json)")
+    parser.add_argument('--compare', metavar='RESULTS', help="earlier results JSON to compare with")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="slowdown ratio reported as a regression (default: 1.2)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp()
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'runs': []
+    }
+
+    try:
+        if args.input:
+            inputs = [(args.input, None)]
+        else:
+            inputs = []
+            for rows in args.rows:
+                path = os.path.join(workdir, f'sales_{rows}.txt')
+                generate(path, rows, skew=args.skew, dirty=args.dirty)
+                inputs.append((path, rows))
+
+        for path, rows in inputs:
+            print(f"\n{path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+            stages = bench_file(path, workdir, memory=not args.no_memory)
+            results['runs'].append({
+                'rows': rows if rows is not None else stages[0]['rows'],
+                'file': path if args.input else None,
+                'bytes': os.path.getsize(path),
+                'skew': None if args.input else args.skew,
+                'dirty': None if args.input else args.dirty,
+                'total_seconds': round(sum(s['seconds'] for s in stages), 6),
+                'stages': stages
+            })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_readers.py
+#
+# Compares the list-based line reader (read_sales_data + parse_transactions),
+# the streaming line reader (iter_sales_data + iter_transactions) and the
+# memory-mapped record reader (iter_sales_records + iter_record_transactions).
+# By default the file is read once first, so every reader runs on a warm page
+# cache; with --cold the file's cached pages are evicted before each timed run
+# (posix_fadvise DONTNEED: Linux, and only pages not dirty), so the times
+# include reading from disk.
+#
+# Usage: python benchmarks/bench_readers.py [path/to/sales_data.txt] [--cold]
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.file_handler import read_sales_data, iter_sales_data, iter_sales_records
+from utils.data_processor import parse_transactions, iter_transactions, iter_record_transactions
+
+
+def line_reader(filename):
+    return sum(1 for _ in parse_transactions(read_sales_data(filename)))
+
+
+def stream_reader(filename):
+    return sum(1 for _ in iter_transactions(iter_sales_data(filename)))
+
+
+def mmap_reader(filename):
+    return sum(1 for _ in iter_record_transactions(iter_sales_records(filename)))
+
+
+def drop_page_cache(filename):
+    """
+    Asks the kernel to evict the file's pages from the page cache
+    """
+    fd = os.open(filename, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def warm_page_cache(filename):
+    with open(filename, 'rb') as f:
+        while f.read(1 << 24):
+            pass
+
+
+def measure(func, filename, cold=False):
+    """
+    Returns: (rows, seconds, peak traced bytes) for one run of func
+    """
+    if cold:
+        drop_page_cache(filename)
+    start = time.perf_counter()
+    rows = func(filename)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(filename)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, seconds, peak
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != '--cold']
+    cold = '--cold' in sys.argv[1:]
+    if cold and not hasattr(os, 'posix_fadvise'):
+        sys.exit("--cold needs os.posix_fadvise (Linux)")
+    filename = args[0] if args else 'data/sales_data.txt'
+    size_mb = os.path.getsize(filename) / 1e6
+    if not cold:
+        warm_page_cache(filename)
+    print(f"File: {filename} ({size_mb:.1f} MB), {'cold' if cold else 'warm'} page cache")
+    print(f"{'Reader':<12} {'Rows':>10} {'Time (s)':>10} {'MB/s':>8} {'Peak alloc (MB)':>16}")
+
+    for name, func in (('line', line_reader), ('stream', stream_reader), ('mmap', mmap_reader)):
+        rows, seconds, peak = measure(func, filename, cold)
+        print(f"{name:<12} {rows:>10} {seconds:>10.3f} {size_mb / seconds:>8.1f} {peak / 1e6:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/bench_transaction_memory.py
+#
+# Measures per-row memory (tracemalloc) of validated transactions held as
+# plain dicts (the previous representation) versus Transaction records.
+#
+# Usage: python benchmarks/bench_transaction_memory.py [path/to/sales_data.txt]
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.file_handler import read_sales_data
+from utils.data_processor import iter_transactions, iter_valid_transactions
+
+
+def iter_dict_transactions(raw_lines):
+    # The row layout parse_transactions produced before Transaction records
+    for line in raw_lines:
+        parts = line.split('|')
+        if len(parts) != 8:
+            continue
+        try:
+            yield {
+                'TransactionID': parts[0].strip(),
+                'Date': parts[1].strip(),
+                'ProductID': parts[2].strip(),
+                'ProductName': parts[3].replace(',', '').strip(),
+                'Quantity': int(parts[4].replace(',', '').strip()),
+                'UnitPrice': float(parts[5].replace(',', '').strip()),
+                'CustomerID': parts[6].strip(),
+                'Region': parts[7].strip()
+            }
+        except ValueError:
+            continue
+
+
+def measure(build, lines):
+    tracemalloc.start()
+    rows = build(lines)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return rows, size
+
+
+def main():
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'data/sales_data.txt'
+    lines = read_sales_data(filename)
+
+    # Dict rows first, so they cannot reuse strings interned for the records
+    dicts, dict_bytes = measure(
+        lambda raw: list(iter_valid_transactions(iter_dict_transactions(raw))), lines)
+    records, record_bytes = measure(
+        lambda raw: list(iter_valid_transactions(iter_transactions(raw))), lines)
+    assert records == dicts
+
+    rows = len(records)
+    print(f"File: {filename} ({rows} valid rows)")
+    print(f"{'dict rows':<20} {dict_bytes / 1e6:>8.1f} MB  {dict_bytes / rows:>7.0f} B/row")
+    print(f"{'Transaction rows':<20} {record_bytes / 1e6:>8.1f} MB  {record_bytes / rows:>7.0f} B/row"
+          f"  ({dict_bytes / record_bytes:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# benchmarks/generate_sales_data.py
+#
+# Writes synthetic sales files in the data/sales_data.txt format
+# (TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region)
+# with configurable size, cardinalities, Zipf skew and dirty-row rate.
+#
+# Usage: python benchmarks/generate_sales_data.py OUTPUT --rows 1000000
+#            [--products 100] [--customers 10000] [--skew 1.1] [--dirty 0.1]
+#            [--start-date 2024-12-01] [--days 30] [--seed 42]
+
+import sys
+import random
+import argparse
+from datetime import date, timedelta
+from itertools import accumulate
+
+HEADER = 'TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region\n'
+REGIONS = ['North', 'South', 'East', 'West']
+PRODUCT_NAMES = [
+    ('Laptop', 45000), ('Mouse', 600), ('Keyboard', 2200), ('Monitor', 12000), ('Webcam', 3500),
+    ('Headphones', 4000), ('USB Cable', 250), ('External Hard Drive', 5500), ('Laptop Charger', 1800),
+    ('Wireless Mouse', 1200)
+]
+VARIANTS = ['Pro', 'Premium', 'HD', 'LED', 'Gaming', '1TB', '65W', 'Mini']
+
+# Dirty row kinds and their share of the dirty rows. comma_number, comma_name and
+# blank_region are cleaned by the parser and stay valid; the rest are dropped.
+DIRTY_KINDS = {
+    'comma_number': 0.35,   # 1,916 instead of 1916
+    'comma_name': 0.2,      # Mouse,Wireless
+    'blank_region': 0.05,
+    'zero_quantity': 0.15,
+    'bad_id': 0.15,         # wrong prefix or empty TransactionID/ProductID/CustomerID
+    'field_count': 0.1      # a field missing or one too many
+}
+BATCH = 100_000
+
+
+def zipf_cum_weights(n, skew):
+    """
+    Cumulative Zipf weights (rank ** -skew) for random.choices; skew 0 is uniform
+    """
+    return list(accumulate(1 / (rank ** skew) for rank in range(1, n + 1)))
+
+
+def make_catalog(count, rng):
+    """
+    Returns: list of (ProductID, ProductName, base UnitPrice)
+    """
+    catalog = []
+    for i in range(count):
+        name, price = PRODUCT_NAMES[i % len(PRODUCT_NAMES)]
+        if i >= len(PRODUCT_NAMES):
+            name = f"{name} {VARIANTS[(i // len(PRODUCT_NAMES)) % len(VARIANTS)]} {i // len(PRODUCT_NAMES)}"
+        catalog.append((f"P{101 + i}", name, max(50, round(price * rng.uniform(0.7, 1.3)))))
+    return catalog
+
+
+def _make_dirty(fields, kind, rng):
+    if kind == 'comma_number':
+        fields[5] = f"{int(fields[5]):,}" if int(fields[5]) >= 1000 else f"{int(fields[5]) * 1000:,}"
+    elif kind == 'comma_name':
+        words = fields[3].split(' ')
+        fields[3] = ','.join(words) if len(words) > 1 else f"{fields[3]},{rng.choice(VARIANTS)}"
+    elif kind == 'blank_region':
+        fields[7] = ''
+    elif kind == 'zero_quantity':
+        fields[4] = '0'
+    elif kind == 'bad_id':
+        column = rng.choice([0, 2, 6])
+        fields[column] = rng.choice(['', 'X' + fields[column][1:], fields[column][1:]])
+    elif kind == 'field_count':
+        if rng.random() < 0.5:
+            del fields[rng.randrange(len(fields))]
+        else:
+            fields.append('EXTRA')
+    return fields
+
+
+def generate(output, rows, products=100, customers=10_000, skew=1.1, dirty=0.1,
+             start_date='2024-12-01', days=30, seed=42):
+    """
+    Writes `rows` transactions (plus header) to `output`.
+    Products and customers are drawn from Zipf(skew) popularity; a `dirty`
+    fraction of rows is corrupted as described by DIRTY_KINDS.
+    Returns: dict of row counts per dirty kind (and 'clean')
+    """
+    rng = random.Random(seed)
+    catalog = make_catalog(products, rng)
+    product_weights = zipf_cum_weights(products, skew)
+    customer_weights = zipf_cum_weights(customers, skew)
+    customer_ids = [f"C{i:0{max(3, len(str(customers)))}d}" for i in range(1, customers + 1)]
+    customer_regions = [rng.choice(REGIONS) for _ in range(customers)]
+    first = date.fromisoformat(start_date)
+    dates = [(first + timedelta(days=d)).isoformat() for d in range(days)]
+    kinds = list(DIRTY_KINDS)
+    kind_weights = list(accumulate(DIRTY_KINDS.values()))
+    id_width = max(3, len(str(rows - 1)))
+
+    counts = dict.fromkeys(['clean', *kinds], 0)
+    with open(output, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(HEADER)
+        for batch_start in range(0, rows, BATCH):
+            size = min(BATCH, rows - batch_start)
+            product_picks = rng.choices(range(products), cum_weights=product_weights, k=size)
+            customer_picks = rng.choices(range(customers), cum_weights=customer_weights, k=size)
+            lines = []
+            for offset, p, c in zip(range(size), product_picks, customer_picks):
+                product_id, name, price = catalog[p]
+                fields = [
+                    f"T{batch_start + offset:0{id_width}d}",
+                    dates[rng.randrange(days)],
+                    product_id,
+                    name,
+                    str(rng.randint(1, 10)),
+                    str(max(1, round(price * rng.uniform(0.9, 1.1)))),
+                    customer_ids[c],
+                    customer_regions[c] if rng.random() < 0.9 else rng.choice(REGIONS)
+                ]
+                if dirty and rng.random() < dirty:
+                    kind = rng.choices(kinds, cum_weights=kind_weights)[0]
+                    fields = _make_dirty(fields, kind, rng)
+                else:
+                    kind = 'clean'
+                counts[kind] += 1
+                lines.append('|'.join(fields))
+            lines.append('')
+            f.write('\n'.join(lines))
+    return counts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic sales data file")
+    parser.add_argument('output')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--products', type=int, default=100, help="distinct products (default: 100)")
+    parser.add_argument('--customers', type=int, default=10_000, help="distinct customers (default: 10000)")
+    parser.add_argument('--skew', type=float, default=1.1,
+                        help="Zipf exponent of product/customer popularity, 0 = uniform (default: 1.1)")
+    parser.add_argument('--dirty', type=float, default=0.1, help="fraction of dirty rows (default: 0.1)")
+    parser.add_argument('--start-date', default='2024-12-01')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    counts = generate(args.output, args.rows, args.products, args.customers, args.skew, args.dirty,
+                      args.start_date, args.days, args.seed)
+    print(f"Wrote {args.rows} rows to {args.output}")
+    for kind, count in counts.items():
+        print(f"  {kind:<14} {count:>10}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,118 +1,566 @@
 # main.py
 
+import os
 import sys
+import argparse
 from datetime import datetime
-from utils.file_handler import read_sales_data
+from functools import partial
+from utils.file_handler import iter_sales_data, load_transactions
 from utils.data_processor import (
-    parse_transactions,
-    validate_and_filter,
+    iter_transactions,
+    iter_valid_transactions,
+    aggregate_sales,
     calculate_total_revenue,
     region_wise_sales,
     top_selling_products,
     customer_analysis,
     daily_sales_trend,
     find_peak_sales_day,
-    low_performing_products
+    low_performing_products,
+    empty_summary,
+    merge_summary,
+    ValidTransactions
 )
-from utils.api_handler import fetch_all_products, create_product_mapping, enrich_sales_data, save_enriched_data
+from utils.parallel import parallel_aggregate, aggregate_files, parallel_enrich
+from utils.checkpoint import incremental_aggregate, IncrementalEnrichment
+from utils.api_handler import (
+    fetch_all_products,
+    fetch_products,
+    iter_enrich_sales_data,
+    empty_enrichment_summary,
+    save_enriched_data,
+    enriched_path,
+    ENRICHED_FORMATS,
+    COMPRESSION
+)
+from utils.product_cache import ProductCatalogCache
+from utils.product_index import ProductIndex, FUZZY_THRESHOLD
+from utils.sketches import make_aggregator
+from utils.columnar import ColumnarTransactions, iter_valid_batches, np as numpy
+from utils.time_index import DailyTimeIndex
+from utils.transaction import gc_paused
+from utils.dedup import make_deduplicator, DEDUP_MODES
+from utils.validation_rules import load_rules, QuarantineWriter
 from utils.report_generator import generate_sales_report
+from utils.batch import expand_inputs, write_batch_reports
+from utils.transaction_store import TransactionStore, store_path
+from utils.query_server import serve
+from utils.instrumentation import PipelineMetrics
+
+def _fraction(value):
+    number = float(value)
+    if not 0 < number < 1:
+        raise argparse.ArgumentTypeError(f"must be between 0 and 1 (exclusive), got {value}")
+    return number
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sales Analytics System")
+    parser.add_argument('inputs', nargs='*', metavar='INPUT',
+                        help="batch mode: sales files, directories or glob patterns to analyze without prompts, "
+                             "writing a report per file and a combined report")
+    parser.add_argument('--workers', type=int,
+                        help="worker processes for parallel parsing and aggregation (default: 1, batch mode: all cores)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="process only data appended since the last run, using the saved checkpoint")
+    parser.add_argument('--cache', action='store_true',
+                        help="load parsed transactions from the binary cache next to the data file")
+    parser.add_argument('--api-url',
+                        help="base URL of the product catalog API (default: simulated catalog)")
+    parser.add_argument('--product-cache', metavar='PATH',
+                        help="SQLite file caching product data between runs (e.g. data/product_cache.sqlite)")
+    parser.add_argument('--fuzzy-match', action='store_true',
+                        help="also match product names by trigram similarity when the ID, exact and "
+                             "normalized names do not match")
+    parser.add_argument('--fuzzy-threshold', type=_fraction, metavar='S',
+                        help=f"with --fuzzy-match: Dice similarity a fuzzy match needs (default: {FUZZY_THRESHOLD})")
+    parser.add_argument('--enriched-format', choices=ENRICHED_FORMATS, default='json',
+                        help="format of the enriched data file: pretty JSON array or NDJSON (default: json)")
+    parser.add_argument('--compress', choices=sorted(COMPRESSION),
+                        help="compress the enriched data file")
+    parser.add_argument('--approximate', action='store_true',
+                        help="bounded-memory sketches (top-K, HyperLogLog) instead of exact per-customer/day sets")
+    parser.add_argument('--top-k', type=int, metavar='N',
+                        help="with --approximate: heaviest products and customers kept by Space-Saving (default: 1000)")
+    parser.add_argument('--hll-error', type=_fraction, metavar='E',
+                        help="with --approximate: relative error of the unique-customers-per-day counts; "
+                             "HyperLogLog uses 2**ceil(log2((1.04/E)**2)) registers (default: 0.01, 2**14)")
+    parser.add_argument('--cms-epsilon', type=_fraction, metavar='E',
+                        help="with --approximate: Count-Min estimates exceed the truth by at most E times the "
+                             "total; width ceil(e/E) (default: 0.001)")
+    parser.add_argument('--cms-delta', type=_fraction, metavar='D',
+                        help="with --approximate: probability a Count-Min estimate exceeds that bound; "
+                             "depth ceil(ln(1/D)) (default: 0.01)")
+    parser.add_argument('--columnar', action='store_true',
+                        help="keep the valid rows as NumPy columns and aggregate with vectorized group-bys "
+                             "(requires numpy; default sequential path only)")
+    parser.add_argument('--serve', action='store_true',
+                        help="run the analytics query server instead of the batch pipeline")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="address the query server listens on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080,
+                        help="port the query server listens on (default: 8080)")
+    parser.add_argument('--socket', metavar='PATH',
+                        help="serve on a Unix socket instead of TCP")
+    parser.add_argument('--dedup', choices=DEDUP_MODES, default='exact',
+                        help="drop repeated TransactionIDs with a hash set (exact) or a Bloom filter with "
+                             "on-disk confirmation (bloom, bounded memory); default: exact")
+    parser.add_argument('--store', nargs='?', const=store_path('data/sales_data.txt'), metavar='PATH',
+                        help="keep validated transactions in a SQLite store (reused while the data file is "
+                             "unchanged) and run filters and analytics as SQL; default PATH: data/sales_data.txt.sqlite")
+    parser.add_argument('--rules', metavar='PATH',
+                        help="JSON file of validation rules replacing the built-in checks (see utils/validation_rules.py)")
+    parser.add_argument('--quarantine', metavar='PATH',
+                        help="write rejected lines to PATH as reason|line")
+    parser.add_argument('--region', type=lambda value: [r.strip() for r in value.split(',') if r.strip()],
+                        help="batch mode: comma-separated regions to include")
+    parser.add_argument('--min-amount', type=float,
+                        help="batch mode: minimum transaction amount")
+    parser.add_argument('--max-amount', type=float,
+                        help="batch mode: maximum transaction amount")
+    parser.add_argument('--pattern', default='*.txt',
+                        help="batch mode: files read from an INPUT directory (default: *.txt)")
+    parser.add_argument('--output-dir', default='output',
+                        help="batch mode: directory for the reports (default: output)")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="write per-stage run metrics to PATH (Prometheus text for *.prom, JSON otherwise)")
+    parser.add_argument('--profile', metavar='DIR',
+                        help="dump a cProfile file per stage into DIR (inspect with python -m pstats)")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="record peak memory per stage with tracemalloc (slows the run down)")
+    args = parser.parse_args(argv)
 
-def main():
+    if args.approximate and args.incremental:
+        parser.error("--approximate cannot be combined with --incremental (sketches are not checkpointed)")
+    sketch = {option: value for option, value in (('capacity', args.top_k), ('distinct_error', args.hll_error),
+                                                   ('cms_epsilon', args.cms_epsilon), ('cms_delta', args.cms_delta))
+              if value is not None}
+    if sketch and not args.approximate:
+        parser.error("--top-k, --hll-error, --cms-epsilon and --cms-delta require --approximate")
+    if args.fuzzy_threshold is not None and not args.fuzzy_match:
+        parser.error("--fuzzy-threshold requires --fuzzy-match")
+    if args.fuzzy_threshold is None:
+        args.fuzzy_threshold = FUZZY_THRESHOLD
+    if args.top_k is not None and args.top_k < 1:
+        parser.error("--top-k must be at least 1")
+    # Options for sketches.make_aggregator: None for exact aggregates
+    args.sketch = sketch if args.approximate else None
+    return args
+
+
+def run_batch(args):
+    """
+    Non-interactive pipeline over many files (e.g. from cron over a drop directory):
+    all files are ingested concurrently by one bounded process pool, then a report
+    is written per file and one over all files combined. Filters come from the
+    command line; enrichment and the enriched data file are skipped.
+    """
+    workers = args.workers or os.cpu_count() or 1
+    metrics = PipelineMetrics(trace_memory=args.trace_memory, profile_dir=args.profile)
+    try:
+        print("="*50)
+        print("        SALES ANALYTICS SYSTEM (BATCH)")
+        print("="*50)
+        rules = load_rules(args.rules) if args.rules else None
+
+        # ---------------- [1/4] Collect input files ----------------
+        print("\n[1/4] Collecting input files...")
+        with metrics.stage('read') as stage:
+            filenames = expand_inputs(args.inputs, args.pattern)
+            stage['rows'] = len(filenames)
+        if not filenames:
+            print("Error: No input files to process.", file=sys.stderr)
+            sys.exit(1)
+        print(f"✓ {len(filenames)} files, {sum(os.path.getsize(f) for f in filenames)} bytes")
+
+        # ---------------- [2/4] Ingest ----------------
+        print(f"\n[2/4] Parsing and cleaning data ({workers} workers)...")
+        with metrics.stage('parse') as stage:
+            # Duplicates are removed across files too, a TransactionID counting in the first file holding it
+            results = aggregate_files(filenames, workers, args.region, args.min_amount, args.max_amount,
+                                      approximate=args.sketch, dedup=args.dedup, rules=rules,
+                                      quarantine=args.quarantine)
+            sales_agg = make_aggregator(args.sketch)
+            summary = empty_summary()
+            for filename, (file_agg, file_summary) in results.items():
+                sales_agg.merge(file_agg)
+                merge_summary(summary, file_summary)
+                print(f"  {filename}: {file_summary['final_count']} kept, {file_summary['invalid']} invalid, "
+                      f"{file_summary['duplicates_removed']} duplicates")
+            stage['rows'] = summary['total_input']
+            metrics.add_reasons(summary['malformed'])
+            metrics.add_reasons(summary['invalid_reasons'])
+            metrics.add_reasons({'duplicate_transaction_id': summary['duplicates_removed']})
+        print(f"✓ Parsed {summary['total_input']} records")
+        print(f"Valid transactions: {sales_agg.row_count}, Invalid removed: {summary['invalid']}, "
+              f"Duplicates removed: {summary['duplicates_removed']}, "
+              f"Filtered out: {summary['filtered_by_region'] + summary['filtered_by_amount']}")
+        if args.quarantine:
+            print(f"✓ Rejected lines written to: {args.quarantine}")
+
+        # ---------------- [3/4] Analyze and report ----------------
+        print("\n[3/4] Analyzing and generating reports...")
+        with metrics.stage('report') as stage:
+            reports = write_batch_reports(results, sales_agg, args.output_dir)
+            stage['rows'] = sales_agg.row_count
+        for path, total_revenue in reports.items():
+            print(f"✓ {path} (₹{total_revenue:,.2f})")
+
+        # ---------------- [4/4] Complete ----------------
+        print("\n[4/4] Process Complete!")
+        metrics.status = 'ok'
+        if args.metrics or args.profile or args.trace_memory:
+            for line in metrics.summary_lines():
+                print(line)
+        print("="*50)
+
+    except Exception as e:
+        metrics.status = 'failed'
+        failed = metrics.failed_stage()
+        where = f"Stage '{failed}'" if failed else "Pipeline"
+        print(f"\n✗ {where} failed: {type(e).__name__}: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if args.metrics:
+            metrics.write(args.metrics)
+            print(f"✓ Metrics written to: {args.metrics}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.serve:
+        serve('data/sales_data.txt', args.host, args.port, args.socket, dedup=args.dedup,
+              rules=load_rules(args.rules) if args.rules else None)
+        return
+    if args.inputs:
+        run_batch(args)
+        return
+    args.workers = args.workers or 1
+
+    metrics = PipelineMetrics(trace_memory=args.trace_memory, profile_dir=args.profile)
+    store = None
     try:
         print("="*50)
         print("        SALES ANALYTICS SYSTEM")
         print("="*50)
         
+        filename = 'data/sales_data.txt'
+        incremental = args.incremental
+        parallel = args.workers > 1 and not incremental
+        use_store = bool(args.store) and not (incremental or parallel)
+        columnar = args.columnar and not (incremental or parallel or use_store or args.approximate)
+        if args.columnar and not columnar:
+            print("Warning: --columnar only applies to the default sequential exact path, ignoring it")
+        if columnar and numpy is None:
+            print("Error: --columnar requires NumPy (pip install numpy)", file=sys.stderr)
+            sys.exit(1)
+        malformed = {}
+        rules = load_rules(args.rules) if args.rules else None
+        quarantine = None
+        with_lines = False  # Parsed transactions come with their raw lines, for the quarantine
+        enriched_file = 'data/enriched_sales_data.txt' if args.enriched_format == 'json' else 'data/enriched_sales_data.ndjson'
+        # Parallel passes also collect ProductIDs, and enrich as they aggregate once the catalog is known
+        product_ids, product_index, parallel_enrichment = {}, None, None
+
         # ---------------- [1/10] Read sales data ----------------
         print("\n[1/10] Reading sales data...")
-        filename = 'data/sales_data.txt'
-        raw_lines = read_sales_data(filename)
-        print(f"✓ Successfully read {len(raw_lines)} transactions")
+        with metrics.stage('read') as stage:
+            if incremental:
+                print(f"✓ Resuming {filename} from its checkpoint")
+            elif parallel:
+                print(f"✓ Splitting {filename} across {args.workers} worker processes")
+                if not args.product_cache:
+                    # The catalog does not depend on the rows, so the workers enrich while they aggregate
+                    product_index = ProductIndex(fetch_all_products(args.api_url), args.fuzzy_match,
+                                                 args.fuzzy_threshold)
+                    parallel_enrichment = {}
+            elif use_store:
+                store = TransactionStore(args.store)
+                print(f"✓ Using transaction store {args.store}")
+            elif args.cache:
+                # Served from the binary cache when it matches the file, otherwise parsed and cached
+                if args.quarantine:
+                    quarantine = QuarantineWriter(args.quarantine)
+                transactions = load_transactions(filename, malformed, quarantine)
+                source = lambda: transactions
+                stage['rows'] = len(transactions)
+                print(f"✓ Loaded {len(transactions)} parsed transactions for {filename}")
+            else:
+                if args.quarantine:
+                    quarantine = QuarantineWriter(args.quarantine)
+                    with_lines = True
+                transactions = iter_transactions(iter_sales_data(filename), malformed, quarantine, with_lines)
+                # Later passes (filter, enrichment) stream the file again instead of holding its rows
+                source = lambda: iter_transactions(iter_sales_data(filename))
+                print(f"✓ Streaming transactions from {filename}")
 
         # ---------------- [2/10] Parse and clean ----------------
+        # Lines are read, parsed, validated and aggregated lazily in one pass; no rows
+        # are kept in memory. In parallel mode the workers aggregate their byte
+        # ranges and only the partial aggregates come back.
         print("\n[2/10] Parsing and cleaning data...")
-        transactions = parse_transactions(raw_lines)
-        valid_transactions, invalid_count, summary = validate_and_filter(transactions)
+        with metrics.stage('parse') as stage:
+            if incremental:
+                # Aggregates cover the whole file; only the new tail was read and parsed
+                sales_agg, summary, valid_transactions, new_bytes = incremental_aggregate(
+                    filename, dedup=args.dedup, rules=rules, quarantine=args.quarantine
+                )
+                print(f"✓ Processed {new_bytes} new bytes, {len(valid_transactions)} new valid transactions")
+                # The enriched file gets the new rows appended, or is rewritten from every valid
+                # row when it is not the one the checkpoint recorded
+                enrichment = IncrementalEnrichment(filename, valid_transactions, new_bytes, enriched_file,
+                                                   args.enriched_format, args.compress, args.dedup, rules)
+                valid_transactions = enrichment.transactions
+                if not enrichment.append:
+                    print(f"✓ Enriched data will be rewritten from all {sales_agg.row_count} transactions")
+                invalid_count = summary['invalid']
+                valid_count = sales_agg.row_count
+                available_regions = sorted(r for r in summary['regions'] if r)
+                min_amount, max_amount = summary['amount_range'] or (0, 0)
+            elif parallel:
+                sales_agg, summary = parallel_aggregate(filename, args.workers, approximate=args.sketch,
+                                                        dedup=args.dedup, rules=rules,
+                                                        quarantine=args.quarantine, product_ids=product_ids,
+                                                        product_index=product_index, enriched_file=enriched_file,
+                                                        fmt=args.enriched_format, compression=args.compress,
+                                                        enrichment_summary=parallel_enrichment)
+                invalid_count = summary['invalid']
+                valid_count = sales_agg.row_count
+                available_regions = sorted(r for r in summary['regions'] if r)
+                min_amount, max_amount = summary['amount_range'] or (0, 0)
+            elif use_store:
+                # Rows live in SQLite; the load is skipped while the data file is unchanged
+                summary, loaded = store.load_file(filename, args.dedup, rules, args.quarantine)
+                valid_transactions = store.transactions()
+                invalid_count = summary['invalid']
+                valid_count = summary['final_count']
+                print(f"✓ {'Loaded' if loaded else 'Reusing'} {valid_count} stored transactions")
+                available_regions = store.regions()
+                min_amount, max_amount = store.amount_range()
+            else:
+                dedup = make_deduplicator(args.dedup)
+                summary = {}
+                try:
+                    with gc_paused():
+                        if columnar:
+                            # Rules run as masks over column batches, and the valid rows become
+                            # typed columns instead of row objects; filters become array masks
+                            valid = iter_valid_batches(transactions, summary, dedup=dedup, rules=rules,
+                                                       quarantine=quarantine, with_lines=with_lines)
+                            columns = ColumnarTransactions.from_transactions(valid)
+                            sales_agg = columns.aggregate()
+                        else:
+                            valid = iter_valid_transactions(transactions, summary, dedup=dedup, rules=rules,
+                                                            quarantine=quarantine, with_lines=with_lines)
+                            if args.approximate:
+                                sales_agg = make_aggregator(args.sketch).update(valid)
+                            else:
+                                sales_agg = aggregate_sales(valid)
+                finally:
+                    if dedup is not None:
+                        dedup.close()
+                    if quarantine is not None:
+                        quarantine.close()
+                summary['malformed'] = malformed
+                invalid_count = summary['invalid']
+                valid_count = sales_agg.row_count
+                available_regions = sorted(r for r in summary['regions'] if r)
+                min_amount, max_amount = summary['amount_range'] or (0, 0)
+                valid_transactions = ValidTransactions(source, dedup=args.dedup, rules=rules)
+            stage['rows'] = summary['total_input']
+            metrics.add_reasons(summary.get('malformed', {}))
+            metrics.add_reasons(summary.get('invalid_reasons', {}))
+            metrics.add_reasons({'duplicate_transaction_id': summary.get('duplicates_removed', 0)})
         
-        # Compute filter info safely
-        available_regions = sorted(set(str(tx.get('region')) for tx in transactions if tx.get('region')))
-        amounts = [tx.get('amount', 0) for tx in transactions if tx.get('amount') is not None]
-        min_amount = min(amounts) if amounts else 0
-        max_amount = max(amounts) if amounts else 0
-        
-        print(f"Available Regions: {', '.join(str(r) for r in available_regions)}")
-        print(f"Transaction Amount Range: {min_amount} - {max_amount}")
-        print(f"✓ Parsed {len(transactions)} records")
-        print(f"Valid transactions: {len(valid_transactions)}, Invalid removed: {invalid_count}")
+        print(f"✓ Parsed {summary['total_input']} records")
+        print(f"Valid transactions: {valid_count}, Invalid removed: {invalid_count}, "
+              f"Duplicates removed: {summary['duplicates_removed']}")
+        if args.quarantine:
+            print(f"✓ Rejected lines written to: {args.quarantine}")
 
         # ---------------- [3/10] Filtering ----------------
         print("\n[3/10] Filter Options Available:")
         print(f"Regions: {', '.join(str(r) for r in available_regions)}")
         print(f"Amount Range: ₹{min_amount} - ₹{max_amount}")
         
-        user_filter = input("\nDo you want to filter data? (y/n): ").strip().lower()
+        selected_regions, amount_min, amount_max = None, None, None
+        if incremental:
+            # Checkpointed aggregates are unfiltered, so filters need a full run
+            print("Filtering is not available in incremental mode")
+            user_filter = 'n'
+        else:
+            user_filter = input("\nDo you want to filter data? (y/n): ").strip().lower()
         if user_filter == 'y':
             # Region filter
             selected_regions = input(f"Enter regions to include (comma-separated, leave empty for all): ")
             selected_regions = [r.strip() for r in selected_regions.split(",") if r.strip()]
-            if selected_regions:
-                valid_transactions = [tx for tx in valid_transactions if str(tx.get('region')) in selected_regions]
             
             # Amount filter
             amount_min = input(f"Enter minimum amount (leave empty for {min_amount}): ").strip()
             amount_max = input(f"Enter maximum amount (leave empty for {max_amount}): ").strip()
             amount_min = float(amount_min) if amount_min else min_amount
             amount_max = float(amount_max) if amount_max else max_amount
-            valid_transactions = [tx for tx in valid_transactions if tx.get('amount', 0) >= amount_min and tx.get('amount', 0) <= amount_max]
+
+            # Timed after the prompts so waiting for input does not count
+            with metrics.stage('filter') as stage:
+                if parallel:
+                    # Replaces the ProductIDs and the enriched file of the unfiltered pass
+                    product_ids = {}
+                    sales_agg, _ = parallel_aggregate(filename, args.workers, selected_regions, amount_min, amount_max,
+                                                      approximate=args.sketch, dedup=args.dedup,
+                                                      rules=rules, product_ids=product_ids,
+                                                      product_index=product_index, enriched_file=enriched_file,
+                                                      fmt=args.enriched_format, compression=args.compress,
+                                                      enrichment_summary=parallel_enrichment)
+                    valid_count = sales_agg.row_count
+                elif use_store:
+                    valid_transactions = store.transactions(selected_regions, amount_min, amount_max)
+                    valid_count = len(valid_transactions)
+                else:
+                    # A second streaming pass with the filters applied (masks over the columns
+                    # with --columnar); enrichment streams the filtered rows
+                    valid_transactions = valid_transactions.filter(selected_regions, amount_min, amount_max)
+                    with gc_paused():
+                        if columnar:
+                            sales_agg = columns.filter(selected_regions, amount_min, amount_max).aggregate()
+                        elif args.approximate:
+                            sales_agg = make_aggregator(args.sketch).update(valid_transactions)
+                        else:
+                            sales_agg = aggregate_sales(valid_transactions)
+                    valid_count = sales_agg.row_count
+                stage['rows'] = valid_count
 
         # ---------------- [4/10] Validate ----------------
         print("\n[4/10] Validating transactions...")
-        print(f"✓ Valid: {len(valid_transactions)} | Invalid: {invalid_count}")
+        print(f"✓ Valid: {valid_count} | Invalid: {invalid_count}")
+        reasons = sorted((reason, count) for reason, count in metrics.invalid_reasons.items() if count)
+        if reasons:
+            print("  " + ", ".join(f"{reason}: {count}" for reason, count in reasons))
+        # A record failing several rules is counted once above (first failure) but under each rule here
+        rule_failures = summary.get('rule_failures', {})
+        if rule_failures != summary.get('invalid_reasons', {}):
+            print("  Rule failures: " + ", ".join(f"{rule}: {count}" for rule, count in sorted(rule_failures.items())))
 
         # ---------------- [5/10] Analysis ----------------
         print("\n[5/10] Analyzing sales data...")
-        total_revenue = calculate_total_revenue(valid_transactions)
-        regions_stats = region_wise_sales(valid_transactions)
-        top_products = top_selling_products(valid_transactions, n=5)
-        customer_stats = customer_analysis(valid_transactions)
-        daily_trends = daily_sales_trend(valid_transactions)
-        peak_day = find_peak_sales_day(valid_transactions)
-        low_products = low_performing_products(valid_transactions)
-        print("✓ Analysis complete")
+        with metrics.stage('analyze') as stage:
+            # Fused aggregates (filled while streaming, by the workers or by SQL); each analysis below is a view over them
+            if use_store:
+                if args.approximate:
+                    sales_agg = make_aggregator(args.sketch).update(valid_transactions)
+                else:
+                    # GROUP BY queries; only the groups are loaded into memory
+                    sales_agg = store.aggregate(selected_regions, amount_min, amount_max)
+            total_revenue = calculate_total_revenue(sales_agg)
+            regions_stats = region_wise_sales(sales_agg)
+            top_products = top_selling_products(sales_agg, n=5)
+            customer_stats = customer_analysis(sales_agg)
+            daily_trends = daily_sales_trend(sales_agg)
+            peak_day = find_peak_sales_day(sales_agg)
+            low_products = low_performing_products(sales_agg)
+            # Prefix sums over the daily buckets for moving averages and week/month periods
+            time_index = DailyTimeIndex(daily_trends)
+            stage['rows'] = sales_agg.row_count
+        print(f"✓ Analysis complete ({sales_agg.row_count} rows visited)")
 
         # ---------------- [6/10] Fetch API products ----------------
         print("\n[6/10] Fetching product data from API...")
-        api_products = fetch_all_products()
-        product_mapping = create_product_mapping(api_products)
-        print(f"✓ Fetched {len(api_products)} products")
+        with metrics.stage('fetch_products') as stage:
+            if product_index is not None:
+                api_products = product_index.products
+                print(f"✓ Fetched {len(api_products)} products before parsing")
+            elif args.product_cache:
+                if not parallel:
+                    # Rows never left the workers in parallel mode; they sent back their distinct ProductIDs
+                    product_ids = (tx['ProductID'] for tx in valid_transactions)
+                # Only unknown or expired products go back to the API
+                fetcher = partial(fetch_products, base_url=args.api_url)
+                with ProductCatalogCache(args.product_cache, fetcher=fetcher) as product_cache:
+                    api_products = list(product_cache.get_products(product_ids).values())
+                    stats = product_cache.stats
+                print(f"✓ Product cache: {stats['memory_hits'] + stats['disk_hits']} hits, "
+                      f"{stats['misses']} misses, {stats['stale']} stale, {stats['fetched']} fetched")
+            else:
+                api_products = fetch_all_products(args.api_url)
+                print(f"✓ Fetched {len(api_products)} products")
+            if product_index is None:
+                product_index = ProductIndex(api_products, args.fuzzy_match, args.fuzzy_threshold)
+            stage['rows'] = len(api_products)
 
         # ---------------- [7/10] Enrich transactions ----------------
         print("\n[7/10] Enriching sales data...")
-        enriched_transactions = enrich_sales_data(valid_transactions, product_mapping)
-        matched_count = sum(1 for tx in enriched_transactions if tx.get('API_Match'))
-        print(f"✓ Enriched {matched_count}/{len(enriched_transactions)} transactions")
+        # Enrichment is lazy: each record is enriched as the writer in step 8 consumes it,
+        # so its cost is part of the 'save' stage. In parallel mode the workers enrich
+        # and write their own byte ranges, during the aggregation pass unless the
+        # product cache needed its ProductIDs first.
+        # In incremental mode only the newly appended transactions are enriched (and
+        # appended to the enriched file) unless the file has to be rewritten.
+        enrichment_summary = empty_enrichment_summary()
+        if not parallel:
+            enriched_transactions = iter_enrich_sales_data(valid_transactions, product_index, enrichment_summary)
 
         # ---------------- [8/10] Save enriched data ----------------
         print("\n[8/10] Saving enriched data...")
-        save_enriched_data(enriched_transactions, output_file='data/enriched_sales_data.txt')
-        print("✓ Saved to: data/enriched_sales_data.txt")
+        with metrics.stage('save') as stage:
+            run_summary = enrichment_summary  # Rows enriched by this run
+            if incremental:
+                # From here on the summary covers every valid row, including those of earlier runs
+                enrichment_summary = enrichment.write(enriched_transactions, run_summary)
+            elif parallel_enrichment is not None:
+                # Written by the workers during the aggregation pass
+                run_summary = enrichment_summary = parallel_enrichment
+            elif parallel:
+                run_summary = parallel_enrich(filename, product_index, enriched_file, args.workers,
+                                              selected_regions, amount_min, amount_max,
+                                              dedup=args.dedup, rules=rules,
+                                              fmt=args.enriched_format, compression=args.compress)
+                enrichment_summary = run_summary
+            else:
+                save_enriched_data(enriched_transactions, output_file=enriched_file,
+                                   fmt=args.enriched_format, compression=args.compress)
+            print(f"✓ Enriched {enrichment_summary['matched']}/{enrichment_summary['total']} transactions")
+            for tier, stats in product_index.match_report().items():
+                print(f"  {tier:<10} {stats['matches']:>6} matched ({stats['match_rate']}%), "
+                      f"{stats['avg_latency_us']} µs/lookup")
+            print(f"✓ Saved to: {enriched_path(enriched_file, args.compress)}")
+            stage['rows'] = run_summary['total']
 
         # ---------------- [9/10] Generate report ----------------
         print("\n[9/10] Generating report...")
-        generate_sales_report(
-            transactions=valid_transactions,
-            enriched_transactions=enriched_transactions,
-            output_file='output/sales_report.txt'
-        )
+        with metrics.stage('report'):
+            generate_sales_report(
+                total_revenue=total_revenue,
+                region_stats=regions_stats,
+                top_products=top_products,
+                customer_stats=customer_stats,
+                daily_trends=daily_trends,
+                enrichment_summary=enrichment_summary,
+                output_file='output/sales_report.txt',
+                time_index=time_index
+            )
         print("✓ Report saved to: output/sales_report.txt")
 
         # ---------------- [10/10] Complete ----------------
         print("\n[10/10] Process Complete!")
+        metrics.status = 'ok'
+        if args.metrics or args.profile or args.trace_memory:
+            for line in metrics.summary_lines():
+                print(line)
         print("="*50)
 
     except Exception as e:
-        print(f"\n✗ An unexpected error occurred: {e}", file=sys.stderr)
-
+        # Report which stage failed and exit non-zero instead of ending the run as if it succeeded
+        metrics.status = 'failed'
+        failed = metrics.failed_stage()
+        where = f"Stage '{failed}'" if failed else "Pipeline"
+        print(f"\n✗ {where} failed: {type(e).__name__}: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if store is not None:
+            store.close()
+        if args.metrics:
+            metrics.write(args.metrics)
+            print(f"✓ Metrics written to: {args.metrics}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,33 @@
+# tests/conftest.py
+
+import os
+import sys
+import shutil
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from generate_sales_data import generate  # noqa: E402
+
+
+@pytest.fixture
+def sales_file(tmp_path):
+    """
+    Copy of the bundled sample data (80 rows, some invalid), safe to modify
+    """
+    path = tmp_path / 'sales_data.txt'
+    shutil.copyfile(os.path.join(ROOT, 'data', 'sales_data.txt'), path)
+    return str(path)
+
+
+@pytest.fixture
+def generated_file(tmp_path):
+    """
+    3000 synthetic rows with 10% dirty rows (see benchmarks/generate_sales_data.py)
+    """
+    path = tmp_path / 'generated.txt'
+    generate(str(path), 3000)
+    return str(path)
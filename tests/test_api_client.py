@@ -0,0 +1,164 @@
+# tests/test_api_client.py
+
+import json
+import asyncio
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+from utils.api_client import AsyncProductClient, APIError
+
+CATALOG = [{"ProductID": f"P{i:03d}", "ProductName": f"Product{i:03d}", "Category": "Office", "Price": float(i)}
+           for i in range(1, 251)]
+
+
+class StandInAPI:
+    """
+    Raw asyncio stand-in for the catalog API. `faults` are applied to the next
+    requests in order: an HTTP status, 'timeout', 'malformed' (bad status line),
+    'eof' (200 without Content-Length, body ends at close) or 'chunked' (200
+    with the body in small chunks).
+    """
+
+    def __init__(self, faults=()):
+        self.faults = list(faults)
+        self.requests = []  # (target, headers)
+
+    def payload(self, target):
+        query = parse_qs(urlsplit(target).query)
+        if 'ids' in query:
+            ids = query['ids'][0].split(',')
+            return {"products": [p for p in CATALOG if p["ProductID"] in ids]}
+        page, limit = int(query['page'][0]), int(query['limit'][0])
+        return {"products": CATALOG[(page - 1) * limit:page * limit], "total": len(CATALOG)}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                target = request_line.split()[1].decode('ascii')
+                self.requests.append((target, headers))
+
+                fault = self.faults.pop(0) if self.faults else None
+                body = json.dumps(self.payload(target)).encode('utf-8')
+                if fault == 'timeout':
+                    await asyncio.sleep(1)
+                    return
+                if fault == 'malformed':
+                    writer.write(b"garbage\r\n\r\n")
+                    return
+                if fault == 'eof':
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n" + body)
+                    return
+                if fault == 'chunked':
+                    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+                    writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n" +
+                                 b''.join(b"%x;ext=1\r\n%s\r\n" % (len(chunk), chunk) for chunk in chunks) +
+                                 b"0\r\n\r\n")
+                elif isinstance(fault, int):
+                    writer.write(f"HTTP/1.1 {fault} Error\r\nContent-Length: 0\r\n\r\n".encode('ascii'))
+                else:
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+def run(api, operation, **options):
+    """
+    Starts the stand-in on a free port and runs `operation(client)` against it
+    """
+    async def main():
+        server = await asyncio.start_server(api.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            client = AsyncProductClient(f'http://127.0.0.1:{port}', timeout=0.3, backoff=0.01, **options)
+            async with client:
+                return await operation(client), client, port
+        finally:
+            server.close()
+    return asyncio.run(main())
+
+
+def test_pages_are_fetched_in_order_over_pooled_connections():
+    api = StandInAPI()
+    products, client, port = run(api, lambda c: c.fetch_all_products(), page_size=100, concurrency=2)
+    assert products == CATALOG
+    assert client.requests_sent == 3
+    assert client.connections_opened <= 2
+    # A non-default port is part of the Host header
+    assert {headers['host'] for _, headers in api.requests} == {f'127.0.0.1:{port}'}
+
+
+def test_ids_are_looked_up_in_batches():
+    api = StandInAPI()
+    wanted = [p["ProductID"] for p in CATALOG[::2]] + ['P999', 'P001']
+    products, client, _ = run(api, lambda c: c.fetch_products_by_ids(wanted), batch_size=50)
+    assert products == CATALOG[::2]
+    assert client.requests_sent == 3  # 126 distinct ids
+    assert all(len(parse_qs(urlsplit(target).query)['ids'][0].split(',')) <= 50 for target, _ in api.requests)
+
+
+@pytest.mark.parametrize('faults', [[503], [429], ['timeout'], ['malformed'], [502, 429, 'timeout', 'malformed']])
+def test_failures_are_retried(faults):
+    api = StandInAPI(faults)
+    products, client, _ = run(api, lambda c: c.fetch_products_by_ids(['P001']), retries=len(faults))
+    assert products == CATALOG[:1]
+    assert client.requests_sent == len(faults) + 1
+
+
+def test_retries_are_bounded():
+    api = StandInAPI(['malformed'] * 3)
+    with pytest.raises(APIError, match='after 3 attempts'):
+        run(api, lambda c: c.fetch_products_by_ids(['P001']), retries=2)
+
+
+def test_client_error_is_not_retried():
+    api = StandInAPI([404])
+    with pytest.raises(APIError, match='HTTP 404'):
+        run(api, lambda c: c.fetch_products_by_ids(['P001']))
+    assert len(api.requests) == 1
+
+
+def test_body_without_length_is_read_until_close():
+    api = StandInAPI(['eof'])
+
+    async def twice(client):
+        first = await client.fetch_products_by_ids(['P001'])
+        return first, await client.fetch_products_by_ids(['P002'])
+
+    (first, second), client, _ = run(api, twice)
+    assert (first, second) == (CATALOG[:1], CATALOG[1:2])
+    assert client.connections_opened == 2  # The unframed response's connection is not reused
+
+
+def test_chunked_body_is_reassembled():
+    api = StandInAPI(['chunked'])
+
+    async def twice(client):
+        first = await client.fetch_all_products()
+        return first, await client.fetch_products_by_ids(['P002'])
+
+    (first, second), client, _ = run(api, twice, page_size=250)
+    assert (first, second) == (CATALOG, CATALOG[1:2])
+    assert client.connections_opened == 1  # The chunked response left the connection reusable
+
+
+def test_close_waits_for_pooled_connections(monkeypatch):
+    waited = []
+    wait_closed = asyncio.StreamWriter.wait_closed
+
+    async def spy(writer):
+        await wait_closed(writer)
+        waited.append(writer.transport.is_closing())
+
+    monkeypatch.setattr(asyncio.StreamWriter, 'wait_closed', spy)
+    _, client, _ = run(StandInAPI(), lambda c: c.fetch_all_products(), page_size=50, concurrency=3)
+    assert waited == [True] * client.connections_opened
+    assert not client._pool
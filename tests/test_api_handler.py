@@ -0,0 +1,99 @@
+# tests/test_api_handler.py
+
+import gzip
+import json
+
+import pytest
+
+from utils.api_handler import (
+    iter_enrich_sales_data,
+    iter_enriched_data,
+    save_enriched_data,
+    write_enriched_part,
+    join_enriched_parts,
+    enriched_path
+)
+from utils.data_processor import iter_transactions, validate_and_filter
+from utils.file_handler import iter_sales_data
+from utils.product_index import ProductIndex
+
+CATALOG = [
+    {'ProductID': 'P101', 'ProductName': 'Laptop', 'Category': 'Electronics', 'Price': 45000.0},
+    {'ProductID': 'P102', 'ProductName': 'Mouse', 'Category': 'Accessories', 'Price': 500.0}
+]
+
+
+@pytest.fixture
+def enriched(generated_file):
+    """
+    Enriched Transactions of the generated file (over 64 KiB as JSON), plus records
+    with non-ASCII text and nested values, as save_enriched_data gets them
+    """
+    valid, _, _ = validate_and_filter(iter_transactions(iter_sales_data(generated_file)))
+    records = list(iter_enrich_sales_data(valid, ProductIndex(CATALOG)))
+    assert any(tx['API_Match'] for tx in records) and not all(tx['API_Match'] for tx in records)
+    return records + [
+        {'TransactionID': 'T9001', 'ProductName': 'Café “Crème” ☕', 'Price': None, 'Tags': ['a', {'b': 1.5}]},
+        {'TransactionID': 'T9002', 'ProductName': 'Line\nbreak, [bracket] and "quotes"', 'Price': -0.25}
+    ]
+
+
+def as_json(records):
+    return json.loads(json.dumps([dict(tx) for tx in records]))
+
+
+def read_text(path, compression):
+    with (gzip.open if compression else open)(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('compression', [None, 'gzip'])
+@pytest.mark.parametrize('fmt', ['json', 'ndjson'])
+def test_save_and_read_round_trip(tmp_path, enriched, fmt, compression):
+    output = str(tmp_path / 'enriched')
+    assert save_enriched_data(iter(enriched), output, fmt, compression, records_per_write=7) == len(enriched)
+    path = enriched_path(output, compression)
+    assert list(iter_enriched_data(path)) == as_json(enriched)
+
+    text = read_text(path, compression)
+    if fmt == 'json':
+        assert text == json.dumps(as_json(enriched), indent=4)
+    else:
+        assert [json.loads(line) for line in text.splitlines()] == as_json(enriched)
+
+
+@pytest.mark.parametrize('compression', [None, 'gzip'])
+@pytest.mark.parametrize('fmt', ['json', 'ndjson'])
+def test_empty_round_trip(tmp_path, fmt, compression):
+    output = str(tmp_path / 'enriched')
+    assert save_enriched_data([], output, fmt, compression) == 0
+    assert list(iter_enriched_data(enriched_path(output, compression))) == []
+
+
+@pytest.mark.parametrize('compression', [None, 'gzip'])
+@pytest.mark.parametrize('fmt', ['json', 'ndjson'])
+def test_joined_parts_match_one_save(tmp_path, enriched, fmt, compression):
+    expected = str(tmp_path / 'expected')
+    save_enriched_data(enriched, expected, fmt, compression)
+
+    bounds = [0, 0, 1, 1200, len(enriched) - 1, len(enriched)]  # Empty and one-record parts included
+    parts = []
+    for i, (start, end) in enumerate(zip(bounds, bounds[1:])):
+        part = str(tmp_path / f'enriched.{i}.part')
+        assert write_enriched_part(enriched[start:end], part, fmt, records_per_write=5) == end - start
+        parts.append(part)
+    output = str(tmp_path / 'joined')
+    join_enriched_parts(parts, output, fmt, compression)
+
+    assert read_text(enriched_path(output, compression), compression) == \
+        read_text(enriched_path(expected, compression), compression)
+    assert list(iter_enriched_data(enriched_path(output, compression))) == as_json(enriched)
+
+
+@pytest.mark.parametrize('fmt', ['json', 'ndjson'])
+def test_joining_only_empty_parts(tmp_path, fmt):
+    part = str(tmp_path / 'empty.part')
+    write_enriched_part([], part, fmt)
+    output = str(tmp_path / 'joined')
+    join_enriched_parts([part, part], output, fmt)
+    assert list(iter_enriched_data(output)) == []
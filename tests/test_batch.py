@@ -0,0 +1,74 @@
+# tests/test_batch.py
+
+import os
+
+import pytest
+
+from main import main
+from utils.batch import expand_inputs, report_names, COMBINED_REPORT
+
+
+def touch(path, text="TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region\n"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def drop_dir(tmp_path, monkeypatch):
+    """
+    A drop directory with two stores, relative paths from tmp_path
+    """
+    for name in ('north/b.txt', 'north/a.txt', 'north/notes.csv', 'south/a.txt', 'south/deep/c.txt', 'top.txt'):
+        touch(tmp_path / 'drop' / name)
+    monkeypatch.chdir(tmp_path)
+    return 'drop'
+
+
+def test_expand_inputs_keeps_the_given_order(drop_dir, capsys):
+    files = expand_inputs([os.path.join(drop_dir, 'top.txt'), os.path.join(drop_dir, 'north'),
+                           os.path.join(drop_dir, '**', 'a.txt'), 'missing.txt',
+                           os.path.join(drop_dir, '*.csv'), './' + os.path.join(drop_dir, 'top.txt')])
+    assert files == [os.path.join(drop_dir, *parts) for parts in
+                     [('top.txt',), ('north', 'a.txt'), ('north', 'b.txt'), ('south', 'a.txt')]]
+    out = capsys.readouterr().out
+    assert "Error: File 'missing.txt' not found." in out
+    assert f"Warning: No sales files match '{os.path.join(drop_dir, '*.csv')}'" in out
+
+
+def test_expand_inputs_pattern_and_recursion(drop_dir):
+    assert expand_inputs([os.path.join(drop_dir, 'north')], '*.csv') == [os.path.join(drop_dir, 'north', 'notes.csv')]
+    assert expand_inputs([os.path.join(drop_dir, 'south')]) == [os.path.join(drop_dir, 'south', 'a.txt')]
+    assert expand_inputs([os.path.join(drop_dir, 'south', '**', '*.txt')]) == \
+        [os.path.join(drop_dir, 'south', 'a.txt'), os.path.join(drop_dir, 'south', 'deep', 'c.txt')]
+    assert expand_inputs([os.path.join(drop_dir, '*')]) == [os.path.join(drop_dir, 'top.txt')]  # Files only
+
+
+def test_report_names_are_unique(tmp_path):
+    files = [os.path.join('drop', *parts) for parts in
+             [('north', 'a.txt'), ('south', 'a.txt'), ('south', 'deep', 'c.txt'), ('combined.txt',),
+              ('south_a.txt',), ('Combined.txt',), ('COMBINED_2.txt',)]]
+    names = report_names(files)
+    assert list(names.values()) == ['north_a_report.txt', 'south_a_report.txt', 'south_deep_c_report.txt',
+                                    'combined_2_report.txt', 'south_a_2_report.txt', 'Combined_3_report.txt',
+                                    'COMBINED_2_2_report.txt']
+    assert COMBINED_REPORT not in names.values()
+    assert report_names([os.path.join('drop', 'north', 'a.txt')]) == {os.path.join('drop', 'north', 'a.txt'):
+                                                                     'a_report.txt'}
+    assert report_names([]) == {}
+
+
+def test_batch_run_writes_every_report(tmp_path, sales_file, generated_file, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    drop = tmp_path / 'drop'
+    drop.mkdir()
+    os.replace(sales_file, drop / 'combined.txt')
+    os.replace(generated_file, drop / 'generated.txt')
+    main([str(drop), '--workers', '2', '--output-dir', 'reports'])
+
+    reports = sorted(os.listdir('reports'))
+    assert reports == ['combined_2_report.txt', 'combined_report.txt', 'generated_report.txt']
+    with open(os.path.join('reports', 'combined_2_report.txt'), encoding='utf-8') as f:
+        assert f"Source: {drop / 'combined.txt'}" in f.read()
+    with open(os.path.join('reports', COMBINED_REPORT), encoding='utf-8') as f:
+        assert "Sources: 2 files" in f.read()
@@ -0,0 +1,192 @@
+# tests/test_checkpoint.py
+
+import pytest
+
+import utils.checkpoint as checkpoint
+from utils.checkpoint import incremental_aggregate, Checkpoint, IncrementalEnrichment
+from utils.api_handler import (
+    iter_enrich_sales_data,
+    iter_enriched_data,
+    save_enriched_data,
+    empty_enrichment_summary,
+    enriched_path
+)
+from utils.product_index import ProductIndex
+from utils.data_processor import (
+    iter_transactions,
+    validate_and_filter,
+    aggregate_sales,
+    region_wise_sales,
+    top_selling_products,
+    customer_analysis,
+    daily_sales_trend,
+    low_performing_products
+)
+from utils.file_handler import iter_sales_data
+
+
+def views(agg):
+    return (
+        agg.row_count,
+        agg.total_revenue,
+        list(region_wise_sales(agg).items()),
+        top_selling_products(agg, n=10),
+        [(c, {**s, 'products_bought': sorted(s['products_bought'])}) for c, s in customer_analysis(agg).items()],
+        [(d, s) for d, s in daily_sales_trend(agg).items()],
+        low_performing_products(agg)
+    )
+
+
+def full_recompute(filename):
+    valid, _, summary = validate_and_filter(iter_transactions(iter_sales_data(filename)))
+    return aggregate_sales(valid), summary
+
+
+def split_file(path, source, parts):
+    with open(source, 'rb') as f:
+        data = f.read()
+    cuts = [len(data) * i // parts for i in range(parts + 1)]
+    path.write_bytes(b'')
+    return [data[a:b] for a, b in zip(cuts, cuts[1:])]  # Cuts mostly fall inside a line
+
+
+@pytest.mark.parametrize('dedup', ['exact', 'bloom'])
+def test_appends_match_full_recompute(tmp_path, generated_file, dedup):
+    path = tmp_path / 'sales.txt'
+    processed = 0
+    for piece in split_file(path, generated_file, 4):
+        with open(path, 'ab') as f:
+            f.write(piece)
+        sales_agg, summary, new, _ = incremental_aggregate(str(path), dedup=dedup)
+        processed += len(new)
+
+    expected_agg, expected = full_recompute(generated_file)
+    assert processed == expected_agg.row_count
+    assert views(sales_agg) == views(expected_agg)
+    for key in ('total_input', 'invalid', 'duplicates_removed', 'final_count', 'invalid_reasons'):
+        assert summary[key] == expected[key]
+    assert summary['regions'] == set(expected_agg.regions)
+
+
+@pytest.mark.parametrize('dedup', ['exact', 'bloom'])
+def test_duplicates_are_removed_across_runs(sales_file, dedup):
+    sales_agg, _, _, _ = incremental_aggregate(sales_file, dedup=dedup)
+    rows = sales_agg.row_count
+    with open(sales_file, encoding='utf-8') as f:
+        first = next(tx for tx in iter_transactions(f) if tx['TransactionID'].startswith('T'))
+    with open(sales_file, 'a', encoding='utf-8') as f:
+        f.write(f"{first['TransactionID']}|2024-12-31|P101|Laptop|1|1000|C001|North\n")
+        f.write("T99999|2024-12-31|P101|Laptop|1|1000|C001|North\n")
+
+    sales_agg, summary, new, _ = incremental_aggregate(sales_file, dedup=dedup)
+    assert [tx['TransactionID'] for tx in new] == ['T99999']
+    assert sales_agg.row_count == rows + 1
+    assert summary['duplicates_removed'] == full_recompute(sales_file)[1]['duplicates_removed']
+
+
+def test_unchanged_file_reads_nothing(sales_file):
+    first, _, _, _ = incremental_aggregate(sales_file)
+    again, _, new, processed = incremental_aggregate(sales_file)
+    assert (list(new), processed) == ([], 0)
+    assert views(again) == views(first)
+
+
+def test_rewritten_file_is_recomputed(sales_file, generated_file):
+    incremental_aggregate(sales_file)
+    with open(generated_file, 'rb') as src, open(sales_file, 'wb') as dst:
+        dst.write(src.read())
+    sales_agg, _, new, _ = incremental_aggregate(sales_file)
+    assert len(new) == sales_agg.row_count
+    assert views(sales_agg) == views(full_recompute(generated_file)[0])
+    # Spilled to disk and parsed back into the rows validation kept
+    valid, _, _ = validate_and_filter(iter_transactions(iter_sales_data(generated_file)))
+    assert list(new) == valid
+    assert list(new) == valid
+
+
+def test_interrupted_save_keeps_previous_state(sales_file, monkeypatch):
+    before, _, _, _ = incremental_aggregate(sales_file)
+    with open(sales_file, 'a', encoding='utf-8') as f:
+        f.write("T99999|2024-12-31|P101|Laptop|1|1000|C009|North\n")
+
+    fingerprint, calls = checkpoint._fingerprint, []
+
+    def interrupted(filename, offset):
+        # The first call validates the stored offset; the second builds the new
+        # offset row, after the groups and IDs were written
+        calls.append(offset)
+        if len(calls) > 1:
+            raise KeyboardInterrupt
+        return fingerprint(filename, offset)
+
+    monkeypatch.setattr(checkpoint, '_fingerprint', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        incremental_aggregate(sales_file)
+    monkeypatch.undo()
+
+    with Checkpoint(sales_file) as stored:
+        state = stored.load()
+        assert views(stored.aggregates(state)) == views(before)
+    sales_agg, _, new, _ = incremental_aggregate(sales_file)
+    assert [tx['TransactionID'] for tx in new] == ['T99999']
+    assert views(sales_agg) == views(full_recompute(sales_file)[0])
+
+
+CATALOG = [
+    {'ProductID': 'P101', 'ProductName': 'Laptop', 'Category': 'Electronics', 'Price': 45000.0},
+    {'ProductID': 'P103', 'ProductName': 'Keyboard', 'Category': 'Accessories', 'Price': 2200.0}
+]
+
+
+def incremental_run(path, output_file, fmt, compression):
+    """
+    Steps 2, 7 and 8 of main.py --incremental
+    """
+    _, _, new, new_bytes = incremental_aggregate(path)
+    enrichment = IncrementalEnrichment(path, new, new_bytes, output_file, fmt, compression)
+    run_summary = empty_enrichment_summary()
+    enriched = iter_enrich_sales_data(enrichment.transactions, ProductIndex(CATALOG), run_summary)
+    return enrichment.append, enrichment.write(enriched, run_summary)
+
+
+@pytest.mark.parametrize('fmt, compression', [('json', None), ('ndjson', None), ('json', 'gzip'), ('ndjson', 'xz')])
+def test_incremental_runs_extend_the_enriched_file(tmp_path, generated_file, fmt, compression):
+    path = tmp_path / 'sales.txt'
+    output = str(tmp_path / 'enriched')
+    appended = []
+    for piece in split_file(path, generated_file, 3):
+        with open(path, 'ab') as f:
+            f.write(piece)
+        append, summary = incremental_run(str(path), output, fmt, compression)
+        appended.append(append)
+    assert appended == [False, True, True]
+    assert incremental_run(str(path), output, fmt, compression) == (True, summary)  # Nothing new
+
+    valid, _, _ = validate_and_filter(iter_transactions(iter_sales_data(generated_file)))
+    expected_summary = empty_enrichment_summary()
+    expected = str(tmp_path / 'expected')
+    save_enriched_data(iter_enrich_sales_data(valid, ProductIndex(CATALOG), expected_summary), expected, fmt,
+                       compression)
+    assert summary == expected_summary
+    assert 0 < summary['matched'] < summary['total'] == len(valid)
+    assert list(iter_enriched_data(enriched_path(output, compression))) == \
+        list(iter_enriched_data(enriched_path(expected, compression)))
+    if compression is None:
+        with open(output, 'rb') as f, open(expected, 'rb') as g:
+            assert f.read() == g.read()
+
+
+def test_replaced_enriched_file_is_rewritten(tmp_path, sales_file):
+    output = str(tmp_path / 'enriched.txt')
+    _, first = incremental_run(sales_file, output, 'json', None)
+    with open(sales_file, 'a', encoding='utf-8') as f:
+        f.write("T99999|2024-12-31|P101|Laptop|1|1000|C009|North\n")
+    save_enriched_data([], output)  # e.g. a filtered run in between
+    append, summary = incremental_run(sales_file, output, 'json', None)
+    assert not append
+    assert summary['total'] == first['total'] + 1 == len(list(iter_enriched_data(output)))
+
+    # A different format does not match the recorded file either
+    append, summary = incremental_run(sales_file, output, 'ndjson', None)
+    assert not append
+    assert summary['total'] == len(list(iter_enriched_data(output)))
@@ -0,0 +1,74 @@
+# tests/test_columnar.py
+
+import pytest
+
+from utils import columnar, data_processor
+from utils.data_processor import iter_transactions, iter_valid_transactions, validate_and_filter, aggregate_sales
+from utils.dedup import make_deduplicator
+from utils.file_handler import iter_sales_data
+from utils.validation_rules import RuleSet, QuarantineWriter, DEFAULT_RULES
+
+np = pytest.importorskip('numpy')
+
+VIEWS = ('calculate_total_revenue', 'region_wise_sales', 'top_selling_products', 'customer_analysis',
+         'daily_sales_trend')
+
+
+def views(module, source):
+    result = [getattr(module, name)(source) for name in VIEWS]
+    for stats in result[3].values():
+        stats['products_bought'] = sorted(stats['products_bought'])
+    return result
+
+
+@pytest.mark.parametrize('filters', [{}, {'region': ['North', 'East'], 'min_amount': 1000, 'max_amount': 50000}])
+def test_columns_match_the_dict_based_analytics(generated_file, filters):
+    valid, _, _ = validate_and_filter(iter_transactions(iter_sales_data(generated_file)))
+    expected, _, _ = validate_and_filter(iter_transactions(iter_sales_data(generated_file)), **filters)
+    columns = columnar.ColumnarTransactions.from_transactions(valid).filter(**filters)
+
+    assert len(columns) == len(expected)
+    assert views(columnar, columns) == views(data_processor, expected)
+    sales_agg = columns.aggregate()
+    expected_agg = aggregate_sales(expected)
+    assert views(data_processor, sales_agg) == views(data_processor, expected_agg)
+    assert list(sales_agg.customers) == list(expected_agg.customers)
+    assert list(sales_agg.daily) == list(expected_agg.daily)
+
+
+@pytest.mark.parametrize('dedup', ['exact', 'bloom'])
+def test_batch_validation_matches_the_row_path(tmp_path, generated_file, dedup):
+    rules = RuleSet(DEFAULT_RULES + [
+        {'name': 'bulk_order', 'field': 'Quantity', 'type': 'one_of', 'values': [1, 2, 3, 4, 5]},
+        {'name': 'bad_region', 'field': 'Region', 'type': 'one_of', 'values': ['North', 'South', 'East', 'West']}
+    ])
+    with open(generated_file, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    path = tmp_path / 'replayed.txt'
+    path.write_text('\n'.join(lines + lines[1:300]) + '\n', encoding='utf-8')
+
+    results = []
+    for iter_valid, options in ((iter_valid_transactions, {}), (columnar.iter_valid_batches, {'batch_rows': 500})):
+        summary, rejected = {}, str(tmp_path / f'{iter_valid.__name__}.rejected')
+        with QuarantineWriter(rejected) as quarantine:
+            valid = list(iter_valid(iter_transactions(iter_sales_data(str(path)), {}, quarantine, with_lines=True),
+                                    summary, dedup=make_deduplicator(dedup), rules=rules, quarantine=quarantine,
+                                    with_lines=True, **options))
+        with open(rejected, encoding='utf-8') as f:
+            # The parser's rejections are written as the batch is read, ahead of its rule failures
+            results.append((valid, summary, sorted(f)))
+
+    (expected, expected_summary, expected_rejected), (valid, summary, rejected) = results
+    assert valid == expected and all('Amount' in tx for tx in valid)
+    assert summary == expected_summary
+    assert summary['duplicates_removed'] and summary['invalid_reasons']['bulk_order']
+    assert rejected == expected_rejected
+
+
+def test_sparse_pairs_match_the_bitmap(monkeypatch):
+    rng = np.random.default_rng(7)
+    groups, members = rng.integers(0, 50, 5000), rng.integers(0, 300, 5000)
+    dense = columnar._distinct_per_group(groups, members, 300, 50)
+    monkeypatch.setattr(columnar, 'DENSE_PAIR_LIMIT', 0)
+    sparse = columnar._distinct_per_group(groups, members, 300, 50)
+    assert np.array_equal(dense[0], sparse[0]) and np.array_equal(dense[1], sparse[1])
@@ -0,0 +1,109 @@
+# tests/test_data_processor.py
+
+import pytest
+
+from utils.data_processor import (
+    iter_transactions,
+    validate_and_filter,
+    ValidTransactions,
+    aggregate_sales,
+    calculate_total_revenue,
+    region_wise_sales,
+    top_selling_products,
+    customer_analysis,
+    daily_sales_trend,
+    find_peak_sales_day,
+    low_performing_products
+)
+from utils.file_handler import iter_sales_data
+
+
+def ids(transactions):
+    return [tx['TransactionID'] for tx in transactions]
+
+
+def test_valid_transactions_streams_like_validate_and_filter(generated_file):
+    stream = ValidTransactions(lambda: iter_transactions(iter_sales_data(generated_file)))
+    valid, _, summary = validate_and_filter(iter_transactions(iter_sales_data(generated_file)))
+    assert ids(stream) == ids(valid)
+    assert stream.summary['final_count'] == summary['final_count']
+    # Each pass starts a fresh deduplicator, so a second pass yields the same rows
+    assert ids(stream) == ids(valid)
+
+
+def test_valid_transactions_filter(generated_file):
+    stream = ValidTransactions(lambda: iter_transactions(iter_sales_data(generated_file)), dedup='bloom')
+    filtered = stream.filter(['North', 'East'], 1000, 50000)
+    valid, _, _ = validate_and_filter(iter_transactions(iter_sales_data(generated_file)),
+                                      region=['North', 'East'], min_amount=1000, max_amount=50000)
+    assert valid
+    assert ids(filtered) == ids(valid)
+    assert filtered.summary['filtered_by_region'] > 0
+
+
+# ---------------- Per-row scans the SalesAggregator views replaced ----------------
+def scan_region_wise_sales(transactions):
+    total = sum(tx['Quantity'] * tx['UnitPrice'] for tx in transactions)
+    stats = {}
+    for tx in transactions:
+        r = stats.setdefault(tx['Region'], {'total_sales': 0.0, 'transaction_count': 0})
+        r['total_sales'] += tx['Quantity'] * tx['UnitPrice']
+        r['transaction_count'] += 1
+    for r in stats.values():
+        r['percentage'] = round(r['total_sales'] / total * 100, 2)
+    return dict(sorted(stats.items(), key=lambda x: x[1]['total_sales'], reverse=True))
+
+
+def scan_products(transactions):
+    stats = {}
+    for tx in transactions:
+        p = stats.setdefault(tx['ProductName'], [0, 0.0])
+        p[0] += tx['Quantity']
+        p[1] += tx['Quantity'] * tx['UnitPrice']
+    return [(name, qty, revenue) for name, (qty, revenue) in stats.items()]
+
+
+def scan_customer_analysis(transactions):
+    stats = {}
+    for tx in transactions:
+        c = stats.setdefault(tx['CustomerID'], {'total_spent': 0.0, 'purchase_count': 0, 'products_bought': set()})
+        c['total_spent'] += tx['Quantity'] * tx['UnitPrice']
+        c['purchase_count'] += 1
+        c['products_bought'].add(tx['ProductName'])
+    for c in stats.values():
+        c['unique_products'] = len(c['products_bought'])
+        c['avg_order_value'] = round(c['total_spent'] / c['purchase_count'], 2)
+    return dict(sorted(stats.items(), key=lambda x: x[1]['total_spent'], reverse=True))
+
+
+def scan_daily_sales_trend(transactions):
+    stats = {}
+    for tx in transactions:
+        d = stats.setdefault(tx['Date'], {'revenue': 0.0, 'transaction_count': 0, 'unique_customers': set()})
+        d['revenue'] += tx['Quantity'] * tx['UnitPrice']
+        d['transaction_count'] += 1
+        d['unique_customers'].add(tx['CustomerID'])
+    for d in stats.values():
+        d['unique_customers'] = len(d['unique_customers'])
+    return dict(sorted(stats.items()))
+
+
+@pytest.mark.parametrize('source', ['sales_file', 'generated_file'])
+def test_aggregator_views_match_per_row_scans(source, request):
+    filename = request.getfixturevalue(source)
+    valid, _, _ = validate_and_filter(iter_transactions(iter_sales_data(filename)))
+    agg = aggregate_sales(valid)
+    products = scan_products(valid)
+
+    assert calculate_total_revenue(agg) == sum(tx['Quantity'] * tx['UnitPrice'] for tx in valid)
+    assert list(region_wise_sales(agg).items()) == list(scan_region_wise_sales(valid).items())
+    assert top_selling_products(agg, n=10) == sorted(products, key=lambda x: x[1], reverse=True)[:10]
+    customers = [(c, {**s, 'products_bought': set(s['products_bought'])}) for c, s in customer_analysis(agg).items()]
+    assert customers == list(scan_customer_analysis(valid).items())
+    daily = scan_daily_sales_trend(valid)
+    assert list(daily_sales_trend(agg).items()) == list(daily.items())
+    peak = max(daily.items(), key=lambda x: x[1]['revenue'])
+    assert find_peak_sales_day(agg) == (peak[0], peak[1]['revenue'], peak[1]['transaction_count'])
+    assert low_performing_products(agg) == sorted((p for p in products if p[1] < 10), key=lambda x: x[1])
+    # The list functions still accept the rows themselves
+    assert region_wise_sales(valid) == region_wise_sales(agg)
@@ -0,0 +1,156 @@
+# tests/test_file_handler.py
+
+import os
+import sys
+
+import pytest
+
+import utils.file_handler as file_handler
+from utils.data_processor import iter_transactions, iter_record_transactions
+from utils.file_handler import (
+    iter_sales_data,
+    iter_sales_records,
+    split_line_ranges,
+    load_transactions,
+    load_transaction_cache,
+    cache_path
+)
+
+
+@pytest.fixture
+def cached_file(generated_file):
+    """
+    The generated file with a fresh binary cache, and its parsed transactions
+    """
+    expected = list(iter_transactions(iter_sales_data(generated_file)))
+    assert list(load_transactions(generated_file)) == expected
+    return generated_file, expected
+
+
+def test_cache_round_trip(cached_file, monkeypatch):
+    filename, expected = cached_file
+    monkeypatch.setattr(file_handler, 'CACHE_BATCH_ROWS', 1000)  # Batches end inside the file and at its end
+    cached = load_transaction_cache(filename)
+    assert cached is not None and len(cached) == len(expected)
+    assert list(cached) == expected
+    assert list(cached) == expected  # Every pass decodes the columns again
+    assert load_transaction_cache(filename, verify=True) is not None
+
+
+def test_non_ascii_transaction_ids(tmp_path):
+    path = tmp_path / 'sales.txt'
+    path.write_text("TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region\n"
+                    "T001é|2024-12-01|P101|Laptop|1|45000|C001|North\n"
+                    "T002|2024-12-01|P101|Laptop|2|45000|C002|South\n", encoding='utf-8')
+    expected = list(iter_transactions(iter_sales_data(str(path))))
+    load_transactions(str(path))
+    assert [tx['TransactionID'] for tx in load_transaction_cache(str(path))] == ['T001é', 'T002']
+    assert list(load_transaction_cache(str(path))) == expected
+
+
+def test_appended_file_invalidates_the_cache(cached_file):
+    filename, _ = cached_file
+    with open(filename, 'a', encoding='utf-8') as f:
+        f.write("T99999|2024-12-31|P101|Laptop|1|1000|C001|North\n")
+    assert load_transaction_cache(filename) is None
+    assert list(load_transactions(filename))[-1]['TransactionID'] == 'T99999'
+    assert load_transaction_cache(filename) is not None
+
+
+def test_truncated_file_invalidates_the_cache(cached_file):
+    filename, expected = cached_file
+    with open(filename, 'r+b') as f:
+        f.truncate(os.path.getsize(filename) // 2)
+    assert load_transaction_cache(filename) is None
+    assert len(load_transactions(filename)) < len(expected)
+
+
+def test_touched_file_invalidates_the_cache(cached_file):
+    filename, _ = cached_file
+    stat = os.stat(filename)
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert load_transaction_cache(filename) is None
+
+
+def test_same_size_edit_is_caught_by_verify(cached_file):
+    filename, _ = cached_file
+    stat = os.stat(filename)
+    with open(filename, 'r+b') as f:
+        f.seek(-3, os.SEEK_END)
+        f.write(b'ZZ\n')
+    # Size and mtime restored: only the content hash tells the edit apart
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert load_transaction_cache(filename) is not None
+    assert load_transaction_cache(filename, verify=True) is None
+
+
+def test_version_and_byte_order_mismatch(cached_file, monkeypatch):
+    filename, _ = cached_file
+    with monkeypatch.context() as patch:
+        patch.setattr(file_handler, 'CACHE_VERSION', file_handler.CACHE_VERSION + 1)
+        assert load_transaction_cache(filename) is None
+    with monkeypatch.context() as patch:
+        patch.setattr(sys, 'byteorder', 'big' if sys.byteorder == 'little' else 'little')
+        assert load_transaction_cache(filename) is None
+    assert load_transaction_cache(filename) is not None
+
+
+def test_damaged_cache_is_ignored(cached_file):
+    filename, expected = cached_file
+    with open(cache_path(filename), 'r+b') as f:
+        f.write(b'NOTCACHE')
+    assert load_transaction_cache(filename) is None
+    assert list(load_transactions(filename)) == expected
+
+
+@pytest.fixture
+def dirty_file(tmp_path, generated_file):
+    """
+    The generated file with latin-1 and UTF-8 names, comma numbers, CRLF endings,
+    blank lines and malformed lines mixed in
+    """
+    with open(generated_file, 'rb') as f:
+        header, *lines = f.read().split(b'\n')
+    extra = [
+        "T80001|2024-12-01|P101|Caf\xe9 Cr\xe8me|2|1,250.50|C1|North".encode('latin-1'),
+        "T80002|2024-12-02|P102|Café Crème|1,000|99|C2|South".encode('utf-8'),
+        b"T80003 | 2024-12-03 | P103 | Mouse, Wireless | 3 | 500 | C3 | East\r",
+        b"   ",
+        b"T80004|2024-12-04|P104|Monitor|two|500|C4|West",
+        b"T80005|2024-12-05|P105|Monitor|1|500|C5",
+        b"T80006|2024-12-06|P106|Monitor|1|5e2|C6|West|EXTRA",
+        b"|||||||"
+    ]
+    for i, line in enumerate(extra):
+        lines.insert(100 + 400 * i, line)
+    path = tmp_path / 'dirty.txt'
+    path.write_bytes(b'\n'.join([header] + lines))  # No newline after the last line
+    return str(path)
+
+
+@pytest.mark.parametrize('block_size', [1, 7, 100, 4096, 1 << 22])
+def test_record_reader_matches_the_line_reader(dirty_file, block_size):
+    expected_malformed, malformed = {}, {}
+    expected = list(iter_transactions(iter_sales_data(dirty_file), expected_malformed))
+    records = iter_sales_records(dirty_file, block_size=block_size)  # Most blocks end inside a line
+    assert list(iter_record_transactions(records, malformed)) == expected
+    assert malformed == expected_malformed
+    assert expected_malformed['number_format'] == 2 and expected_malformed['field_count'] > 2
+    names = {tx['TransactionID']: tx['ProductName'] for tx in expected}
+    assert (names['T80001'], names['T80002'], names['T80003']) == ('Café Crème', 'Café Crème', 'Mouse Wireless')
+
+
+def test_record_reader_ranges_match_the_line_reader(dirty_file):
+    for start, end in split_line_ranges(dirty_file, 5):
+        expected = list(iter_transactions(iter_sales_data(dirty_file, start, end)))
+        assert list(iter_record_transactions(iter_sales_records(dirty_file, start, end, block_size=64))) == expected
+
+
+def test_latin1_file_decodes_like_the_line_reader(tmp_path):
+    path = tmp_path / 'latin1.txt'
+    path.write_bytes("TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region\n"
+                     "T1|2024-12-01|P1|Caf\xe9|1|10|C1|North\n".encode('latin-1') +
+                     "T2|2024-12-01|P2|Caf\xe9|1|10|C2|North\n".encode('utf-8'))
+    expected = list(iter_transactions(iter_sales_data(str(path))))
+    assert [tx['ProductName'] for tx in expected] == ['Café', 'Café']
+    assert list(iter_record_transactions(iter_sales_records(str(path)))) == expected
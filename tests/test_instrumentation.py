@@ -0,0 +1,61 @@
+# tests/test_instrumentation.py
+
+import threading
+import tracemalloc
+
+from utils.data_processor import (
+    iter_transactions,
+    validate_and_filter,
+    aggregate_sales,
+    region_wise_sales,
+    customer_analysis
+)
+from utils.file_handler import iter_sales_data
+from utils.instrumentation import PipelineMetrics, instrumented
+
+
+def test_nested_calls_and_streams_are_counted_once(generated_file):
+    transactions = list(iter_transactions(iter_sales_data(generated_file)))
+    metrics = PipelineMetrics()
+    valid, _, _ = validate_and_filter(iter(transactions))
+    sales_agg = aggregate_sales(tx for tx in valid)
+    region_wise_sales(sales_agg)
+    customer_analysis(valid)
+
+    functions = metrics.functions()
+    # The views call aggregate_sales internally; only the direct call counts
+    assert functions['aggregate_sales'] == {**functions['aggregate_sales'], 'calls': 1, 'rows': len(valid)}
+    assert functions['validate_and_filter']['rows'] == len(transactions)
+    assert functions['region_wise_sales']['rows'] == len(valid)
+    assert functions['customer_analysis']['rows'] == len(valid)
+
+
+def test_stage_peak_is_relative_to_its_start():
+    metrics = PipelineMetrics(trace_memory=True)
+    try:
+        with metrics.stage('hold'):
+            held = bytearray(8_000_000)
+        with metrics.stage('small'):
+            bytearray(1000)
+        del held
+    finally:
+        tracemalloc.stop()
+
+    hold, small = metrics.stages
+    assert hold['peak_bytes'] >= 8_000_000
+    assert small['peak_bytes'] < 1_000_000
+
+
+def test_calls_from_several_threads_are_all_counted():
+    @instrumented
+    def threaded_query(rows):
+        return len(rows)
+
+    metrics = PipelineMetrics()
+    threads = [threading.Thread(target=lambda: [threaded_query([1, 2, 3]) for _ in range(2000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert metrics.functions()['threaded_query'] == {**metrics.functions()['threaded_query'],
+                                                     'calls': 16000, 'rows': 48000}
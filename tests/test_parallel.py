@@ -0,0 +1,188 @@
+# tests/test_parallel.py
+
+import os
+import random
+
+import pytest
+
+from utils.api_handler import (
+    fetch_all_products,
+    iter_enrich_sales_data,
+    save_enriched_data,
+    empty_enrichment_summary,
+    enriched_path
+)
+from utils.data_processor import iter_transactions, validate_and_filter, aggregate_sales, SalesAggregator
+from utils.file_handler import iter_sales_data
+from utils.parallel import parallel_aggregate, aggregate_files, parallel_enrich
+from utils.product_index import ProductIndex
+from utils.validation_rules import RuleSet, QuarantineWriter, DEFAULT_RULES
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('fmt', ['json', 'ndjson'])
+def test_parallel_enrich_writes_the_sequential_file(tmp_path, generated_file, fmt):
+    products = fetch_all_products()
+    filters = {'region': ['North', 'East'], 'min_amount': 1000, 'max_amount': None}
+
+    valid, _, _ = validate_and_filter(iter_transactions(iter_sales_data(generated_file)), **filters)
+    expected_summary = empty_enrichment_summary()
+    expected_index = ProductIndex(products)
+    expected = str(tmp_path / 'sequential')
+    save_enriched_data(iter_enrich_sales_data(valid, expected_index, expected_summary), expected, fmt)
+
+    product_index = ProductIndex(products)
+    output = str(tmp_path / 'parallel')
+    summary = parallel_enrich(generated_file, product_index, output, workers=2, fmt=fmt, **filters)
+
+    assert read(output) == read(expected)
+    assert summary == expected_summary
+    assert product_index.lookups == expected_index.lookups
+    assert [stats['matches'] for stats in product_index.stats.values()] == \
+        [stats['matches'] for stats in expected_index.stats.values()]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.part')]
+
+    # The same file, ProductIDs and lookups from the aggregation pass
+    product_index, product_ids, enrichment = ProductIndex(products), {}, {}
+    output = str(tmp_path / 'aggregated')
+    sales_agg, _ = parallel_aggregate(generated_file, 2, product_ids=product_ids, product_index=product_index,
+                                      enriched_file=output, fmt=fmt, enrichment_summary=enrichment, **filters)
+    assert sales_agg.row_count == len(valid)
+    assert list(product_ids) == list(dict.fromkeys(tx['ProductID'] for tx in valid))
+    assert read(output) == read(expected)
+    assert enrichment == expected_summary
+    assert product_index.lookups == expected_index.lookups
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.part')]
+
+
+def test_parallel_enrich_without_rows(tmp_path):
+    empty = tmp_path / 'empty.txt'
+    empty.write_text("TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region\n")
+    output = str(tmp_path / 'enriched.txt')
+    summary = parallel_enrich(str(empty), ProductIndex([]), output, workers=2, compression='gzip')
+    assert summary['total'] == 0
+    assert os.path.exists(enriched_path(output, 'gzip'))
+
+
+def test_bloom_dedup_is_kept_in_both_passes(tmp_path, generated_file):
+    with open(generated_file, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    # Each row repeated right after itself, including where a range boundary falls between the two
+    doubled = tmp_path / 'doubled.txt'
+    doubled.write_text('\n'.join([lines[0]] + [line for line in lines[1:] for _ in (0, 1)]) + '\n')
+
+    exact_agg, exact = parallel_aggregate(str(doubled), 2, dedup='exact')
+    bloom_agg, bloom = parallel_aggregate(str(doubled), 2, dedup='bloom')
+    assert bloom == exact
+    assert bloom_agg.row_count == exact_agg.row_count
+    assert bloom['duplicates_removed'] == bloom['final_count']
+
+    enriched = parallel_enrich(str(doubled), ProductIndex(fetch_all_products()), str(tmp_path / 'out.txt'),
+                               workers=2, dedup='bloom')
+    assert enriched['total'] == bloom_agg.row_count
+
+
+@pytest.mark.parametrize('workers, chunks_per_worker', [(1, 1), (2, 1), (2, 4), (4, 3)])
+def test_parallel_aggregate_matches_the_sequential_path(tmp_path, generated_file, workers, chunks_per_worker):
+    source = with_replays(tmp_path / 'replayed.txt', generated_file, share=0.05)
+    with open(source, encoding='utf-8') as f:
+        header, *lines = f.read().splitlines()
+    # Lines the parser rejects, besides the generator's field_count rows
+    for position in range(50, len(lines), 400):
+        lines.insert(position, f"T9{position}|2024-12-01|P101|Laptop|two|45000|C1|North")
+    path = tmp_path / 'dirty.txt'
+    path.write_text('\n'.join([header] + lines) + '\n', encoding='utf-8')
+    rules = RuleSet(DEFAULT_RULES + [{'name': 'bulk_order', 'field': 'Quantity', 'type': 'range', 'lt': 8}])
+    filters = {'region': ['North', 'West'], 'min_amount': 500, 'max_amount': 100000}
+
+    expected_quarantine = str(tmp_path / 'sequential.rejected')
+    malformed = {}
+    with QuarantineWriter(expected_quarantine) as quarantine:
+        transactions = iter_transactions(iter_sales_data(str(path)), malformed, quarantine, with_lines=True)
+        valid, _, expected = validate_and_filter(transactions, rules=rules, quarantine=quarantine, with_lines=True,
+                                                 **filters)
+    assert malformed['field_count'] and malformed['number_format'] and expected['invalid_reasons']['bulk_order']
+
+    quarantine = str(tmp_path / 'parallel.rejected')
+    sales_agg, summary = parallel_aggregate(str(path), workers, chunks_per_worker=chunks_per_worker, rules=rules,
+                                            quarantine=quarantine, **filters)
+    assert_same_aggregates(sales_agg, aggregate_sales(valid))
+    assert summary['malformed'] == malformed
+    for key, value in expected.items():
+        if key != 'malformed':  # Counted by the parser, not by validate_and_filter
+            assert summary[key] == value, key
+    assert read(quarantine) == read(expected_quarantine)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.part')]
+
+
+def assert_same_aggregates(agg, expected):
+    """
+    Equal groups in equal order; sums may differ in the last bits, as partial sums are added up
+    """
+    assert agg.row_count == expected.row_count
+    assert agg.total_revenue == pytest.approx(expected.total_revenue)
+    for grouping in ('regions', 'products', 'customers', 'daily'):
+        groups, expected_groups = getattr(agg, grouping), getattr(expected, grouping)
+        assert list(groups) == list(expected_groups)
+        for key, stats in groups.items():
+            expected_stats = expected_groups[key]
+            assert stats.keys() == expected_stats.keys()
+            for name, value in stats.items():
+                if isinstance(value, float):
+                    assert value == pytest.approx(expected_stats[name])
+                else:
+                    assert value == expected_stats[name]
+
+
+def with_replays(path, source, share=0.1, seed=7):
+    """
+    Copies `source` with a `share` of its lines repeated at random later positions
+    """
+    rng = random.Random(seed)
+    with open(source, encoding='utf-8') as f:
+        header, *lines = f.read().splitlines()
+    for _ in range(int(len(lines) * share)):
+        position = rng.randrange(len(lines))
+        lines.insert(rng.randrange(position, len(lines) + 1), lines[position])
+    path.write_text('\n'.join([header] + lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.parametrize('dedup', ['exact', 'bloom'])
+@pytest.mark.parametrize('filters', [{}, {'region': ['North', 'East'], 'min_amount': 1000}])
+def test_cross_range_duplicates_match_the_sequential_path(tmp_path, generated_file, dedup, filters):
+    replayed = with_replays(tmp_path / 'replayed.txt', generated_file)
+    valid, _, expected = validate_and_filter(iter_transactions(iter_sales_data(replayed)), **filters)
+    assert expected['duplicates_removed'] > 100
+
+    sales_agg, summary = parallel_aggregate(replayed, 3, chunks_per_worker=3, dedup=dedup, **filters)
+    assert_same_aggregates(sales_agg, aggregate_sales(valid))
+    for key in ('total_input', 'invalid', 'duplicates_removed', 'filtered_by_region', 'filtered_by_amount',
+                'final_count', 'invalid_reasons'):
+        assert summary[key] == expected[key]
+
+    product_ids = {}
+    parallel_aggregate(replayed, 3, chunks_per_worker=3, dedup=dedup, product_ids=product_ids, **filters)
+    assert list(product_ids) == list(dict.fromkeys(tx['ProductID'] for tx in valid))
+    enriched = parallel_enrich(replayed, ProductIndex(fetch_all_products()), str(tmp_path / 'out.txt'), 3,
+                               dedup=dedup, **filters)
+    assert enriched['total'] == len(valid)
+
+
+def test_files_are_deduplicated_in_order(tmp_path, generated_file):
+    with open(generated_file, encoding='utf-8') as f:
+        header, *lines = f.read().splitlines()
+    first, second = tmp_path / 'first.txt', tmp_path / 'second.txt'
+    first.write_text('\n'.join([header] + lines[:2000]) + '\n', encoding='utf-8')
+    # The second file repeats the last 500 rows of the first
+    second.write_text('\n'.join([header] + lines[1500:]) + '\n', encoding='utf-8')
+
+    results = aggregate_files([str(first), str(second)], 2)
+    combined = SalesAggregator().merge(results[str(first)][0]).merge(results[str(second)][0])
+    valid, _, summary = validate_and_filter(iter_transactions(iter_sales_data(generated_file)))
+    assert_same_aggregates(combined, aggregate_sales(valid))
+    assert results[str(second)][1]['duplicates_removed'] > 400
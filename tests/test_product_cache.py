@@ -0,0 +1,123 @@
+# tests/test_product_cache.py
+
+import pytest
+
+from utils.api_handler import NOT_MODIFIED
+from utils.product_cache import ProductCatalogCache
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class StubFetcher:
+    """
+    fetch_products stand-in over an editable catalog; records every request
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.requests = []
+
+    def __call__(self, product_ids, etags=None):
+        etags = etags or {}
+        self.requests.append((list(product_ids), dict(etags)))
+        results = {}
+        for product_id in product_ids:
+            product = self.catalog.get(product_id)
+            if product is None:
+                results[product_id] = None
+                continue
+            etag = f"{product_id}-{product['Price']}"
+            results[product_id] = NOT_MODIFIED if etags.get(product_id) == etag else (product, etag)
+        return results
+
+
+def product(product_id, price=100):
+    return {'ProductID': product_id, 'ProductName': f"Item {product_id}", 'Category': 'Accessories', 'Price': price}
+
+
+@pytest.fixture
+def fetcher():
+    return StubFetcher({product_id: product(product_id) for product_id in ('P1', 'P2', 'P3')})
+
+
+def open_cache(tmp_path, fetcher, clock, **options):
+    return ProductCatalogCache(str(tmp_path / 'products.sqlite'), ttl=60, fetcher=fetcher, clock=clock, **options)
+
+
+def test_entries_expire_after_the_ttl(tmp_path, fetcher):
+    clock = FakeClock()
+    with open_cache(tmp_path, fetcher, clock) as cache:
+        assert cache.get_products(['P1', 'P9']) == {'P1': product('P1')}
+        assert fetcher.requests == [(['P1', 'P9'], {})]
+
+        clock.now += 59
+        assert cache.get_products(['P1', 'P9']) == {'P1': product('P1')}
+        assert len(fetcher.requests) == 1  # Fresh, including the negative entry
+        assert cache.stats['memory_hits'] == 2
+
+        clock.now += 1
+        fetcher.catalog['P9'] = product('P9')
+        assert cache.get_products(['P1', 'P9']) == {'P1': product('P1'), 'P9': product('P9')}
+        assert cache.stats['stale'] == 2
+        assert fetcher.requests[-1] == (['P1', 'P9'], {'P1': 'P1-100'})
+
+
+def test_stale_entries_are_revalidated_with_their_etag(tmp_path, fetcher):
+    clock = FakeClock()
+    with open_cache(tmp_path, fetcher, clock) as cache:
+        cache.get_products(['P1', 'P2'])
+        clock.now += 61
+        fetcher.catalog['P2'] = product('P2', price=150)
+
+        assert cache.get_products(['P1', 'P2']) == {'P1': product('P1'), 'P2': product('P2', price=150)}
+        assert fetcher.requests[-1] == (['P1', 'P2'], {'P1': 'P1-100', 'P2': 'P2-100'})
+        assert (cache.stats['not_modified'], cache.stats['fetched']) == (1, 3)
+
+        # The revalidated entry is fresh again, and the new ETag is stored
+        clock.now += 30
+        cache.get_products(['P1', 'P2'])
+        assert len(fetcher.requests) == 2
+        clock.now += 31
+        cache.get_products(['P2'])
+        assert fetcher.requests[-1] == (['P2'], {'P2': 'P2-150'})
+        assert cache.stats['not_modified'] == 2
+
+
+def test_lru_evicts_the_least_recently_used_entry(tmp_path, fetcher):
+    with open_cache(tmp_path, fetcher, FakeClock(), lru_size=2) as cache:
+        cache.get_products(['P1', 'P2'])
+        cache.get_products(['P1'])  # P2 is now the least recently used
+        cache.get_products(['P3'])
+        assert cache.stats['evictions'] == 1
+        assert list(cache._lru) == ['P1', 'P3']
+
+        hits = cache.stats['memory_hits']
+        cache.get_products(['P1'])
+        assert cache.stats['memory_hits'] == hits + 1
+        # An evicted entry comes from disk, not from the API
+        assert cache.get_products(['P2']) == {'P2': product('P2')}
+        assert cache.stats['disk_hits'] == 1
+        assert len(fetcher.requests) == 2
+
+
+def test_entries_persist_across_instances(tmp_path, fetcher):
+    clock = FakeClock()
+    with open_cache(tmp_path, fetcher, clock) as cache:
+        cache.get_products(['P1', 'P2', 'P9'])
+
+    reopened = StubFetcher(dict(fetcher.catalog))
+    with open_cache(tmp_path, reopened, clock) as cache:
+        assert cache.get_products(['P1', 'P2', 'P9']) == {'P1': product('P1'), 'P2': product('P2')}
+        assert cache.stats['disk_hits'] == 3
+        assert reopened.requests == []
+
+        clock.now += 61
+        cache.get_products(['P1', 'P2', 'P9'])
+        assert reopened.requests == [(['P1', 'P2', 'P9'], {'P1': 'P1-100', 'P2': 'P2-100'})]
+        assert cache.stats['not_modified'] == 2
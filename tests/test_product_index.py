@@ -0,0 +1,69 @@
+# tests/test_product_index.py
+
+import pytest
+
+from main import parse_args
+from utils.product_index import ProductIndex, normalize_name
+
+CATALOG = [
+    {'ProductID': 'P101', 'ProductName': 'Laptop', 'Category': 'Electronics', 'Price': 45000},
+    {'ProductID': 'P102', 'ProductName': 'Wireless Mouse', 'Category': 'Accessories', 'Price': 1200},
+    {'ProductID': 'P103', 'ProductName': 'USB-Cable', 'Category': 'Accessories', 'Price': 250},
+    {'ProductID': 'P104', 'ProductName': 'Laptop Charger', 'Category': 'Accessories', 'Price': 1800}
+]
+
+
+def test_normalize_name():
+    assert normalize_name(" USB-Cable ") == normalize_name("usb_cable") == "usbcable"
+
+
+@pytest.mark.parametrize('product_id, name, expected, tier', [
+    ('P102', 'Laptop', 'P102', 'id'),
+    ('P999', 'Laptop', 'P101', 'exact'),
+    (None, 'usb cable', 'P103', 'normalized'),
+    ('', 'LAPTOP-CHARGER', 'P104', 'normalized'),
+    (None, 'Wireles Mouse', 'P102', 'fuzzy'),
+    (None, 'Laptop Pro', None, None),
+    (None, 'Keyboard', None, None),
+    (None, '---', None, None)
+])
+def test_lookup_tiers(product_id, name, expected, tier):
+    product, found = ProductIndex(CATALOG, fuzzy=True).lookup(product_id, name)
+    assert (product and product['ProductID'], found) == (expected, tier)
+
+
+def test_fuzzy_is_opt_in_with_a_strict_default():
+    assert ProductIndex(CATALOG).lookup(None, 'Wireles Mouse') == (None, None)
+    # A longer name sharing a word is not a typo of it
+    assert ProductIndex(CATALOG, fuzzy=True).lookup(None, 'Laptop Chargers')[0]['ProductID'] == 'P104'
+    assert ProductIndex(CATALOG[:1], fuzzy=True).lookup(None, 'Laptop Charger') == (None, None)
+    assert ProductIndex(CATALOG[:1], fuzzy=True, fuzzy_threshold=0.5).lookup(None, 'Laptop Charger')[1] == 'fuzzy'
+
+
+def test_stats_and_match_report():
+    index = ProductIndex(CATALOG, fuzzy=True)
+    for product_id, name in [('P101', 'x'), (None, 'Laptop'), (None, 'usb cable'), (None, 'Wireles Mouse'),
+                             (None, 'Wireles Mouse'), (None, 'Keyboard')]:
+        index.lookup(product_id, name)
+    assert index.lookups == 6
+    assert {tier: (s['attempts'], s['matches']) for tier, s in index.stats.items()} == {
+        'id': (1, 1), 'exact': (5, 1), 'normalized': (4, 1), 'fuzzy': (3, 2)}
+    report = index.match_report()
+    assert [report[tier]['matches'] for tier in ProductIndex.TIERS] == [1, 1, 1, 2]
+    assert report['fuzzy']['match_rate'] == round(2 / 6 * 100, 2)
+
+    other = ProductIndex(CATALOG, fuzzy=True)
+    other.lookup('P101')
+    index.add_stats(other.lookups, other.stats)
+    assert (index.lookups, index.stats['id']['matches']) == (7, 2)
+    index.reset_stats()
+    assert index.lookups == 0 and not any(s['attempts'] for s in index.stats.values())
+
+
+def test_fuzzy_options():
+    args = parse_args([])
+    assert (args.fuzzy_match, args.fuzzy_threshold) == (False, 0.75)
+    args = parse_args(['--fuzzy-match', '--fuzzy-threshold', '0.6'])
+    assert (args.fuzzy_match, args.fuzzy_threshold) == (True, 0.6)
+    with pytest.raises(SystemExit):
+        parse_args(['--fuzzy-threshold', '0.6'])
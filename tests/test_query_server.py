@@ -0,0 +1,159 @@
+# tests/test_query_server.py
+
+import os
+import json
+import asyncio
+import threading
+
+import utils.query_server as query_server
+from utils.data_processor import iter_transactions, iter_valid_transactions, validate_and_filter, region_wise_sales
+from utils.dedup import make_deduplicator
+from utils.file_handler import iter_sales_data
+from utils.query_server import AnalyticsServer, QUERIES
+from utils.validation_rules import RuleSet, DEFAULT_RULES
+
+
+def query(server, target):
+    status, body = server.answer(target)
+    return status, json.loads(body)
+
+
+def test_index_is_built_only_for_amount_filters(generated_file):
+    server = AnalyticsServer(generated_file)
+    status, _ = query(server, '/region_wise_sales')
+    assert status == 200
+    status, _ = query(server, '/region_wise_sales?region=North')  # Answered by the cube
+    assert status == 200
+    assert server.dataset.current._index is None
+
+    status, body = query(server, '/region_wise_sales?region=North,East&min_amount=1000')
+    assert status == 200
+    assert server.dataset.current._index is not None
+    valid, _, _ = validate_and_filter(iter_transactions(iter_sales_data(generated_file)),
+                                      region=['North', 'East'], min_amount=1000)
+    assert body['result'] == json.loads(json.dumps(region_wise_sales(valid)))
+
+
+async def get(port, target):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n".encode('ascii'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers['content-length']))
+    writer.close()
+    return status, json.loads(body)
+
+
+def serving(server, scenario):
+    async def main():
+        listener = await server.start(port=0)
+        try:
+            return await scenario(listener.sockets[0].getsockname()[1])
+        finally:
+            listener.close()
+            server.close()
+    return asyncio.run(main())
+
+
+def test_unexpected_errors_become_500(generated_file, monkeypatch):
+    def broken(source):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(QUERIES, 'total_revenue', (broken, ()))
+    server = AnalyticsServer(generated_file)
+    status, body = serving(server, lambda port: get(port, '/total_revenue'))
+    assert status == 500
+    assert body == {'error': 'internal error: RuntimeError'}
+    assert query(server, '/region_wise_sales')[0] == 200
+    assert server.stats['errors'] == 1
+
+
+def test_slow_work_does_not_block_other_clients(generated_file, monkeypatch):
+    server = AnalyticsServer(generated_file)
+    release = threading.Event()
+
+    def slow(source):
+        release.wait(5)
+        return 'slow'
+
+    monkeypatch.setitem(QUERIES, 'total_revenue', (slow, ()))
+
+    async def scenario(port):
+        slow_query = asyncio.ensure_future(get(port, '/total_revenue'))
+        await asyncio.sleep(0.05)
+        # Answered while the slow query holds a worker
+        assert (await get(port, '/region_wise_sales'))[0] == 200
+        assert not slow_query.done()
+
+        with open(generated_file, 'a', encoding='utf-8') as f:
+            f.write("T99999|2024-12-31|P101|Laptop|1|1000|C001|North\n")
+        os.utime(generated_file, ns=(0, os.stat(generated_file).st_mtime_ns + 10 ** 9))
+        loading = threading.Event()
+
+        def blocked(*args, **kwargs):
+            loading.set()
+            release.wait(5)
+            return original(*args, **kwargs)
+
+        original = query_server.iter_valid_transactions
+        monkeypatch.setattr(query_server, 'iter_valid_transactions', blocked)
+        reload_query = asyncio.ensure_future(get(port, '/region_wise_sales'))
+        while not loading.is_set():
+            await asyncio.sleep(0.01)
+        # The reload holds another worker; this request is answered from version 1
+        status, body = await get(port, '/region_wise_sales?region=North')
+        assert (status, body['version']) == (200, 1)
+
+        release.set()
+        assert (await slow_query)[1]['result'] == 'slow'
+        return (await reload_query)[1]['version']
+
+    assert serving(server, scenario) == 2
+
+
+def test_dataset_uses_the_configured_dedup_and_rules(generated_file):
+    rules = RuleSet(DEFAULT_RULES + [{'name': 'bulk_order', 'field': 'Quantity', 'type': 'range', 'lt': 8}])
+    first = next(tx for tx in iter_transactions(iter_sales_data(generated_file)) if rules.is_valid(tx))
+    with open(generated_file, 'a', encoding='utf-8') as f:
+        f.write(f"{first['TransactionID']}|2024-12-31|P101|Laptop|1|1000|C001|North\n")  # Repeats a valid ID
+    for dedup in ('exact', 'bloom', 'off'):
+        server = AnalyticsServer(generated_file, dedup=dedup, rules=rules)
+        server.dataset.refresh()
+        expected, deduplicator = {}, make_deduplicator(dedup)
+        valid = list(iter_valid_transactions(iter_transactions(iter_sales_data(generated_file)), expected,
+                                             dedup=deduplicator, rules=rules))
+        if deduplicator is not None:
+            deduplicator.close()
+        summary = server.describe()['summary']
+        assert summary['invalid_reasons'] == expected['invalid_reasons']
+        assert summary['invalid_reasons']['bulk_order']
+        assert summary['duplicates_removed'] == expected['duplicates_removed'] == (0 if dedup == 'off' else 1)
+        assert query(server, '/region_wise_sales')[1]['result'] == json.loads(json.dumps(region_wise_sales(valid)))
+        server.close()
+
+
+def test_request_bodies_are_skipped(generated_file):
+    async def scenario(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        # A body on a kept-alive connection, then a second request on the same connection
+        writer.write(b"GET /total_revenue HTTP/1.1\r\nContent-Length: 22\r\n\r\nGET /nope HTTP/1.1\r\n\r\n"
+                     b"GET /region_wise_sales HTTP/1.1\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+        replies = (await reader.read()).split(b'HTTP/1.1 ')[1:]
+        writer.close()
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b"GET /total_revenue HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nhello\r\n0\r\n\r\n")
+        await writer.drain()
+        chunked = await reader.read()
+        writer.close()
+        return replies, chunked
+
+    replies, chunked = serving(AnalyticsServer(generated_file), scenario)
+    assert [reply[:3] for reply in replies] == [b'200', b'200']
+    assert b'"query": "region_wise_sales"' in replies[1]
+    assert chunked.startswith(b'HTTP/1.1 400 ') and b'Connection: close' in chunked
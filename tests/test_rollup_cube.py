@@ -0,0 +1,100 @@
+# tests/test_rollup_cube.py
+
+import pytest
+
+from utils.data_processor import (
+    iter_transactions,
+    validate_and_filter,
+    aggregate_sales,
+    calculate_total_revenue,
+    region_wise_sales,
+    top_selling_products,
+    daily_sales_trend,
+    find_peak_sales_day,
+    low_performing_products
+)
+from utils.file_handler import iter_sales_data
+from utils.rollup_cube import SalesCube
+
+
+@pytest.fixture
+def cube_and_rows(generated_file):
+    cube = SalesCube()
+    valid, _, _ = validate_and_filter(iter_transactions(iter_sales_data(generated_file)), cube=cube)
+    return cube, valid
+
+
+def scan(rows, region=None, start_date=None, end_date=None):
+    """
+    The rows a rollup covers, picked one by one
+    """
+    if isinstance(region, str):
+        region = [region]
+    return [tx for tx in rows
+            if (not region or tx['Region'] in region)
+            and (start_date is None or tx['Date'] >= start_date)
+            and (end_date is None or tx['Date'] <= end_date)]
+
+
+def approx(value):
+    """
+    pytest.approx through nested dicts and lists; sums are added up in another order
+    """
+    if isinstance(value, dict):
+        return {key: approx(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(approx(item) for item in value)
+    return pytest.approx(value) if isinstance(value, float) else value
+
+
+def assert_same_rollup(agg, expected):
+    assert agg.row_count == expected.row_count
+    assert agg.total_revenue == pytest.approx(expected.total_revenue)
+    # Same groups in the same first-row order, so ties rank the same
+    assert list(agg.regions) == list(expected.regions)
+    assert list(agg.products) == list(expected.products)
+    assert agg.regions == approx(expected.regions)
+    assert agg.products == approx(expected.products)
+    assert agg.daily == approx(expected.daily)
+
+
+@pytest.mark.parametrize('region', [None, 'North', ['North', 'East'], ['West', 'Nowhere'], ['Nowhere']])
+@pytest.mark.parametrize('bounds', [(None, None), ('2024-12-10', None), (None, '2024-12-10'),
+                                    ('2024-12-05', '2024-12-20'), ('2024-12-07', '2024-12-07'),
+                                    ('2024-12-20', '2024-12-05'), ('2024-12-04T', '2024-12-09~')])
+def test_rollup_matches_a_scan_of_the_rows(cube_and_rows, region, bounds):
+    cube, rows = cube_and_rows
+    agg = cube.rollup(region, *bounds)
+    expected = aggregate_sales(scan(rows, region, *bounds))
+    assert_same_rollup(agg, expected)
+
+    assert calculate_total_revenue(agg) == pytest.approx(calculate_total_revenue(expected))
+    assert region_wise_sales(agg) == approx(region_wise_sales(expected))
+    assert top_selling_products(agg, n=10) == approx(top_selling_products(expected, n=10))
+    assert daily_sales_trend(agg) == approx(daily_sales_trend(expected))
+    assert low_performing_products(agg, threshold=40) == approx(low_performing_products(expected, threshold=40))
+    if expected.row_count:
+        assert find_peak_sales_day(agg) == approx(find_peak_sales_day(expected))
+
+
+def test_unfiltered_rollup_and_dimensions(cube_and_rows):
+    cube, rows = cube_and_rows
+    assert cube.row_count == len(rows)
+    assert cube.regions() == sorted({tx['Region'] for tx in rows if tx['Region']})
+    assert cube.dates() == sorted({tx['Date'] for tx in rows})
+    assert_same_rollup(cube.rollup(), aggregate_sales(rows))
+
+
+def test_cube_filled_later_matches_and_refreshes_its_dates(cube_and_rows):
+    cube, rows = cube_and_rows
+    later = SalesCube().update(rows[:1000])
+    assert later.dates() == sorted({tx['Date'] for tx in rows[:1000]})
+    later.update(rows[1000:])
+    assert later.dates() == cube.dates()
+    for bounds in [(None, None), ('2024-12-05', '2024-12-20')]:
+        assert_same_rollup(later.rollup('South', *bounds), cube.rollup('South', *bounds))
+
+
+def test_empty_cube():
+    agg = SalesCube().rollup('North', '2024-12-01', '2024-12-31')
+    assert (agg.row_count, agg.total_revenue, agg.regions, agg.products, agg.daily) == (0, 0, {}, {}, {})
@@ -0,0 +1,53 @@
+# tests/test_sketches.py
+
+import math
+
+import pytest
+
+from main import parse_args
+from utils.parallel import parallel_aggregate
+from utils.data_processor import iter_transactions, validate_and_filter, aggregate_sales, customer_analysis
+from utils.file_handler import iter_sales_data
+from utils.sketches import make_aggregator, ApproxSalesAggregator
+
+
+def test_sketch_options_reach_the_aggregators(generated_file):
+    args = parse_args(['--approximate', '--top-k', '7', '--hll-error', '0.05',
+                       '--cms-epsilon', '0.01', '--cms-delta', '0.1'])
+    sales_agg = make_aggregator(args.sketch)
+    assert isinstance(sales_agg, ApproxSalesAggregator)
+    assert (sales_agg.capacity, sales_agg.distinct_error) == (7, 0.05)
+    assert sales_agg.product_quantities.width == math.ceil(math.e / 0.01)
+    assert sales_agg.product_quantities.depth == math.ceil(math.log(1 / 0.1))
+
+    sales_agg, _ = parallel_aggregate(generated_file, 2, approximate=args.sketch)
+    assert 0 < len(sales_agg.customers) <= 7
+    assert type(make_aggregator(parse_args([]).sketch)) is not ApproxSalesAggregator
+    assert isinstance(make_aggregator(parse_args(['--approximate']).sketch), ApproxSalesAggregator)
+
+
+@pytest.mark.parametrize('argv', [
+    ['--approximate', '--incremental'],
+    ['--hll-error', '0.02'],
+    ['--approximate', '--cms-delta', '1'],
+    ['--approximate', '--top-k', '0']
+])
+def test_invalid_sketch_flags_are_rejected(argv):
+    with pytest.raises(SystemExit) as exc_info:
+        parse_args(argv)
+    assert exc_info.value.code == 2
+
+
+def test_customer_analysis_has_the_same_shape_in_both_modes(generated_file):
+    valid, _, _ = validate_and_filter(iter_transactions(iter_sales_data(generated_file)))
+    exact = customer_analysis(aggregate_sales(valid))
+    approximate = customer_analysis(ApproxSalesAggregator(capacity=len(exact)).update(valid))
+    assert approximate.keys() == exact.keys()
+
+    for stats in exact.values():
+        assert isinstance(stats['products_bought'], list)
+        assert stats['unique_products'] == len(set(stats['products_bought']))
+    assert all(stats.keys() == next(iter(exact.values())).keys() for stats in approximate.values())
+    for stats in approximate.values():
+        assert stats['products_bought'] is None and isinstance(stats['unique_products'], int)
+        assert stats['unique_products'] > 0
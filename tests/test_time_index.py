@@ -0,0 +1,115 @@
+# tests/test_time_index.py
+
+from datetime import date, timedelta
+
+import pytest
+
+from utils.time_index import DailyTimeIndex
+
+# 2024-11-25 is a Monday; the data runs to Tuesday 2025-01-07 with gaps
+START = date(2024, 11, 25)
+END = date(2025, 1, 7)
+GAPS = {date(2024, 12, 3), date(2024, 12, 4), date(2024, 12, 31), date(2025, 1, 1)}
+
+
+def trends():
+    daily = {}
+    day = START
+    while day <= END:
+        if day not in GAPS:
+            n = (day - START).days
+            daily[day.isoformat()] = {'revenue': 100.0 + 10 * n, 'transaction_count': 1 + n % 3,
+                                      'unique_customers': 1}
+        day += timedelta(days=1)
+    # Any date order is accepted
+    return dict(reversed(list(daily.items())))
+
+
+def scan(daily, lo, hi, field):
+    return sum(stats[field] for d, stats in daily.items() if lo <= d <= hi)
+
+
+def test_range_totals_match_a_scan():
+    daily = trends()
+    index = DailyTimeIndex(daily)
+    assert (index.start, index.end, len(index)) == (START, END, (END - START).days + 1)
+    days = [(START + timedelta(days=n)).isoformat() for n in range(-2, len(index) + 2)]
+    for lo in days:
+        for hi in days:
+            assert index.range_revenue(lo, hi) == pytest.approx(scan(daily, lo, hi, 'revenue'))
+            assert index.range_transactions(lo, hi) == scan(daily, lo, hi, 'transaction_count')
+    assert index.range_revenue() == pytest.approx(sum(s['revenue'] for s in daily.values()))
+    assert index.range_transactions(end_date='2024-11-25') == daily['2024-11-25']['transaction_count']
+    assert index.range_transactions(start_date='2025-01-07') == daily['2025-01-07']['transaction_count']
+    assert index.range_revenue('2024-12-03', '2024-12-04') == 0
+
+
+def test_moving_average_counts_gaps_as_zero():
+    daily = trends()
+    index = DailyTimeIndex(daily)
+    for window in (1, 3, 7, 30):
+        averages = index.moving_average(window)
+        assert len(averages) == len(index) - window + 1
+        for d, average in averages.items():
+            first = (date.fromisoformat(d) - timedelta(days=window - 1)).isoformat()
+            assert average == pytest.approx(round(scan(daily, first, d, 'revenue') / window, 2))
+    assert index.moving_average(len(index) + 1) == {}
+    with pytest.raises(ValueError):
+        index.moving_average(0)
+
+
+def test_weekly_and_monthly_growth():
+    daily = trends()
+    index = DailyTimeIndex(daily)
+    weeks = index.weekly()
+    assert list(weeks)[0] == '2024-W48' and list(weeks)[-1] == '2025-W02'
+    assert all(w['complete'] for w in list(weeks.values())[:-1])
+    last = weeks['2025-W02']
+    assert (last['start_date'], last['end_date'], last['days'], last['complete']) == ('2025-01-06', '2025-01-07',
+                                                                                      2, False)
+    for w in weeks.values():
+        assert w['revenue'] == pytest.approx(scan(daily, w['start_date'], w['end_date'], 'revenue'))
+    assert weeks['2024-W48']['growth_pct'] is None
+    # Complete weeks compare totals, a partial week compares daily averages
+    w49, w50 = weeks['2024-W49'], weeks['2024-W50']
+    assert w50['growth_pct'] == round((w50['revenue'] - w49['revenue']) / w49['revenue'] * 100, 2)
+    w01 = weeks['2025-W01']
+    assert last['growth_pct'] == round((last['revenue'] / 2 - w01['revenue'] / 7) / (w01['revenue'] / 7) * 100, 2)
+
+    months = index.monthly()
+    assert [(m, s['days'], s['complete']) for m, s in months.items()] == [
+        ('2024-11', 6, False), ('2024-12', 31, True), ('2025-01', 7, False)]
+    nov, dec = months['2024-11'], months['2024-12']
+    assert dec['growth_pct'] == round((dec['revenue'] / 31 - nov['revenue'] / 6) / (nov['revenue'] / 6) * 100, 2)
+    assert index.peak_month()[0] == '2024-12'
+    assert index.peak_week() == max(((w, s['revenue'], s['transaction_count']) for w, s in weeks.items()
+                                     if s['complete']), key=lambda p: p[1])
+
+
+def test_single_day_and_empty_index():
+    index = DailyTimeIndex({'2024-12-01': {'revenue': 50.0, 'transaction_count': 2, 'unique_customers': 1}})
+    assert len(index) == 1
+    assert index.range_revenue('2024-12-01', '2024-12-01') == 50.0
+    assert index.moving_average(1) == {'2024-12-01': 50.0}
+    assert index.weekly()['2024-W48']['days'] == 1
+    assert index.peak_week() == ('2024-W48', 50.0, 2)
+
+    empty = DailyTimeIndex({})
+    assert len(empty) == 0
+    assert empty.range_revenue('2024-12-01', '2024-12-31') == 0
+    assert empty.moving_average() == {} and empty.weekly() == {} and empty.peak_month() is None
+
+
+def test_non_iso_dates_are_skipped_and_counted():
+    daily = trends()
+    daily['12/30/2024'] = {'revenue': 999.0, 'transaction_count': 4, 'unique_customers': 1}
+    index = DailyTimeIndex(daily)
+    assert (index.skipped_days, index.skipped_transactions) == (['12/30/2024'], 4)
+    assert (index.start, index.end) == (START, END)
+    assert index.range_revenue() == pytest.approx(sum(s['revenue'] for s in trends().values()))
+
+    with pytest.raises(ValueError, match='start_date'):
+        index.range_revenue('12/01/2024')
+    with pytest.raises(ValueError, match='end_date'):
+        DailyTimeIndex({}).range_transactions(end_date='2024-13-01')
+    assert index.range_revenue(date(2024, 12, 1), date(2024, 12, 1)) == daily['2024-12-01']['revenue']
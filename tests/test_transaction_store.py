@@ -0,0 +1,136 @@
+# tests/test_transaction_store.py
+
+import pytest
+
+import utils.transaction_store as transaction_store
+from utils.data_processor import (
+    iter_transactions,
+    validate_and_filter,
+    aggregate_sales,
+    region_wise_sales,
+    top_selling_products,
+    customer_analysis,
+    daily_sales_trend,
+    find_peak_sales_day,
+    low_performing_products
+)
+from utils.file_handler import iter_sales_data, source_fingerprint
+from utils.transaction_store import TransactionStore
+
+
+def views(agg):
+    """
+    Every Part 2 analytic over an aggregator, with sums rounded to cents
+    (SQL sums may differ from Python's in the last bits)
+    """
+    return (
+        agg.row_count,
+        round(agg.total_revenue, 2),
+        {r: (round(s['total_sales'], 2), s['transaction_count'], s['percentage'])
+         for r, s in region_wise_sales(agg).items()},
+        [(p, q, round(revenue, 2)) for p, q, revenue in top_selling_products(agg, n=10)],
+        {c: (round(s['total_spent'], 2), s['purchase_count'], sorted(s['products_bought']))
+         for c, s in customer_analysis(agg).items()},
+        {d: (round(s['revenue'], 2), s['transaction_count'], s['unique_customers'])
+         for d, s in daily_sales_trend(agg).items()},
+        find_peak_sales_day(agg)[0],
+        low_performing_products(agg)
+    )
+
+
+def in_memory(filename, **filters):
+    valid, _, _ = validate_and_filter(iter_transactions(iter_sales_data(filename)), **filters)
+    return valid
+
+
+@pytest.fixture
+def store(tmp_path):
+    with TransactionStore(str(tmp_path / 'store.sqlite')) as store:
+        yield store
+
+
+@pytest.mark.parametrize('fixture', ['sales_file', 'generated_file'])
+def test_pushdown_matches_aggregate_sales(request, store, fixture):
+    filename = request.getfixturevalue(fixture)
+    summary, loaded = store.load_file(filename)
+    assert loaded
+    valid = in_memory(filename)
+    assert len(store) == len(valid) == summary['final_count']
+    assert views(store.aggregate()) == views(aggregate_sales(valid))
+
+
+def test_filtered_pushdown_matches_filtered_rows(store, generated_file):
+    store.load_file(generated_file)
+    regions = store.regions()[:2]
+    valid = in_memory(generated_file, region=regions, min_amount=1000, max_amount=50000)
+    assert views(store.aggregate(regions, 1000, 50000)) == views(aggregate_sales(valid))
+
+    stored = store.transactions(regions, 1000, 50000)
+    assert len(stored) == len(valid)
+    assert [tx['TransactionID'] for tx in stored] == [tx['TransactionID'] for tx in valid]
+    # Re-iterable: a second pass runs the query again
+    assert sum(1 for _ in stored) == len(valid)
+
+
+def test_unchanged_file_is_reused(store, sales_file):
+    first, loaded = store.load_file(sales_file)
+    assert loaded
+    again, loaded = store.load_file(sales_file)
+    assert not loaded
+    assert again == first
+    assert len(store) == first['final_count']
+
+
+def test_changes_trigger_reload(store, sales_file):
+    store.load_file(sales_file)
+    _, loaded = store.load_file(sales_file, dedup='off')
+    assert loaded  # Dedup mode changed
+
+    with open(sales_file, 'a', encoding='utf-8') as f:
+        f.write("T999|2024-12-31|P101|Laptop|1|1000|C001|North\n")
+    summary, loaded = store.load_file(sales_file, dedup='off')
+    assert loaded
+    assert len(store) == summary['final_count']
+    assert 'T999' in {tx['TransactionID'] for tx in store.transactions()}
+
+
+def test_interrupted_reload_keeps_previous_contents(store, sales_file, monkeypatch):
+    summary, _ = store.load_file(sales_file)
+    rows = len(store)
+    source = source_fingerprint(sales_file)
+
+    with open(sales_file, 'a', encoding='utf-8') as f:
+        f.write("T999|2024-12-31|P101|Laptop|1|1000|C001|North\n")
+
+    def interrupted(filename, *args):
+        for i, line in enumerate(iter_sales_data(filename, *args)):
+            if i == 40:
+                raise KeyboardInterrupt
+            yield line
+
+    monkeypatch.setattr(transaction_store, 'iter_sales_data', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        store.load_file(sales_file)
+
+    # Rows and metadata were rolled back together
+    assert len(store) == rows
+    assert store.is_current(source) == summary
+    monkeypatch.undo()
+    summary, loaded = store.load_file(sales_file)
+    assert loaded
+    assert len(store) == rows + 1 == summary['final_count']
+
+
+def test_failed_load_rolls_back(store, sales_file):
+    store.load_file(sales_file)
+    rows = len(store)
+    stored = list(store.transactions())
+
+    def failing():
+        yield from stored
+        raise ValueError("source went away")
+
+    with pytest.raises(ValueError):
+        store.load(failing())
+    assert len(store) == rows
+    assert store.regions()
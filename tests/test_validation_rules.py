@@ -0,0 +1,114 @@
+# tests/test_validation_rules.py
+
+import os
+
+import pytest
+
+from utils.data_processor import iter_transactions, iter_valid_transactions
+from utils.file_handler import iter_sales_data, load_transactions, cache_path
+from utils.transaction import Transaction
+from utils.validation_rules import RuleSet, QuarantineWriter, DEFAULT_RULES
+
+CUSTOM_RULES = DEFAULT_RULES + [
+    {'name': 'quantity_out_of_range', 'field': 'Quantity', 'type': 'range', 'ge': 1, 'lt': 50},
+    {'name': 'bad_region', 'field': 'Region', 'type': 'one_of', 'values': ['North', 'South', 'East', 'West']},
+    {'name': 'bad_date', 'field': 'Date', 'type': 'date_format'},
+    {'name': 'bad_transaction_number', 'field': 'TransactionID', 'type': 'regex', 'pattern': r'T\d+'}
+]
+
+
+@pytest.mark.parametrize('specs', [None, CUSTOM_RULES, CUSTOM_RULES[-1:], []])
+def test_compiled_predicate_agrees_with_failures(generated_file, specs):
+    rules = RuleSet(specs)
+    transactions = list(iter_transactions(iter_sales_data(generated_file)))
+    for tx in transactions:
+        valid = not rules.failures(tx)
+        assert rules.check_record(tx) is valid
+        assert rules.check_mapping(tx.to_dict()) is valid
+
+    summary = {}
+    valid = list(iter_valid_transactions(transactions, summary, rules=rules))
+    assert sum(summary['invalid_reasons'].values()) == summary['invalid'] == len(transactions) - len(valid)
+    columns = {field: [tx[field] for tx in transactions] for field in ('Quantity', 'UnitPrice', 'TransactionID',
+                                                                         'ProductID', 'CustomerID', 'Region', 'Date')}
+    mask, rule_counts, reason_counts = rules.check_columns(columns)
+    assert int(mask.sum()) == len(valid)
+    assert {k: v for k, v in reason_counts.items() if v} == summary['invalid_reasons']
+    assert {k: v for k, v in rule_counts.items() if v} == summary['rule_failures']
+
+
+ROWS = [
+    Transaction('T1', '2024-12-01', 'P101', 'Laptop', 1, 45000.0, 'C1', 'North'),
+    Transaction('T2', '12/01/2024', 'P102', 'Mouse', 3, 600.0, 'C2', 'south'),
+    Transaction('X3', '2024-12-31', 'Q103', 'Keyboard', 0, 2200.5, 'C3', ''),
+    Transaction('T44', '2024-02-30', 'P104', 'Monitor', 50, -1.0, 'D4', 'East')
+]
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ({'field': 'Quantity', 'type': 'range', 'gt': 0, 'lt': 50}, [True, True, False, False]),
+    ({'field': 'UnitPrice', 'type': 'range', 'ge': 600, 'le': 45000}, [True, True, True, False]),
+    ({'field': 'CustomerID', 'type': 'prefix', 'prefix': 'C'}, [True, True, True, False]),
+    ({'field': 'TransactionID', 'type': 'regex', 'pattern': r'T\d'}, [True, True, False, False]),
+    ({'field': 'Region', 'type': 'one_of', 'values': ['North', 'East']}, [True, False, False, True]),
+    ({'field': 'Quantity', 'type': 'one_of', 'values': [1, 3]}, [True, True, False, False]),
+    ({'field': 'UnitPrice', 'type': 'one_of', 'values': [600, 2200.5]}, [False, True, True, False]),
+    ({'field': 'Date', 'type': 'date_format'}, [True, False, True, False]),
+    ({'field': 'Date', 'type': 'date_format', 'format': '%m/%d/%Y'}, [False, True, False, False])
+])
+def test_rule_types_in_row_and_column_form(spec, expected):
+    rules = RuleSet([{'name': 'rule', **spec}])
+    assert [rules.is_valid(tx) for tx in ROWS] == expected
+    assert [rules.is_valid(tx.to_dict()) for tx in ROWS] == expected
+    assert [not rules.failures(tx) for tx in ROWS] == expected
+    mask, rule_counts, reason_counts = rules.check_columns({spec['field']: [tx[spec['field']] for tx in ROWS]})
+    assert mask.tolist() == expected
+    assert rule_counts == reason_counts == {'rule': expected.count(False)}
+
+
+@pytest.mark.parametrize('spec', [
+    {'name': 'r', 'field': 'Quantity', 'type': 'prefix', 'prefix': '1'},
+    {'name': 'r', 'field': 'Region', 'type': 'range', 'gt': 0},
+    {'name': 'r', 'field': 'UnitPrice', 'type': 'range', 'gt': '0'},
+    {'name': 'r', 'field': 'Region', 'type': 'one_of', 'values': ['North', 1]},
+    {'name': 'r', 'field': 'Quantity', 'type': 'one_of', 'values': ['1']},
+    {'name': 'r', 'field': 'Date', 'type': 'regex', 'pattern': '('},
+    {'name': 'r', 'field': 'CustomerID', 'type': 'prefix'},
+    {'name': 'r', 'field': 'CustomerID', 'type': 'contains'}
+])
+def test_mismatched_rules_are_rejected_at_load(spec):
+    with pytest.raises(ValueError):
+        RuleSet([spec])
+
+
+def test_quarantine_keeps_raw_lines(tmp_path, generated_file):
+    with open(generated_file, encoding='utf-8') as f:
+        raw = set(f.read().splitlines())
+    # Rule failures keep their raw line only when the parser passes it along
+    for with_lines in (True, False):
+        path = str(tmp_path / 'rejected.txt')
+        with QuarantineWriter(path) as quarantine:
+            summary = {}
+            transactions = iter_transactions(iter_sales_data(generated_file), {}, quarantine, with_lines)
+            for _ in iter_valid_transactions(transactions, summary, quarantine=quarantine, with_lines=with_lines):
+                pass
+
+        with open(path, encoding='utf-8') as f:
+            rejected = [line.split('|', 1) for line in f.read().splitlines()]
+        assert len(rejected) > summary['invalid'] > 0
+        assert all(line in raw for _, line in rejected) is with_lines
+
+
+def test_cache_keeps_malformed_lines(tmp_path, generated_file):
+    expected = {}
+    transactions = list(iter_transactions(iter_sales_data(generated_file), expected))
+    assert expected
+
+    for cached in (False, True):  # Parsed and cached, then served from the cache
+        assert os.path.exists(cache_path(generated_file)) is cached
+        malformed, path = {}, str(tmp_path / 'rejected.txt')
+        with QuarantineWriter(path) as quarantine:
+            assert list(load_transactions(generated_file, malformed, quarantine)) == transactions
+        assert malformed == expected
+        with open(path, encoding='utf-8') as f:
+            assert len(f.read().splitlines()) == sum(expected.values())
@@ -0,0 +1,206 @@
+# utils/api_client.py
+
+import json
+import random
+import asyncio
+from urllib.parse import urlsplit, urlencode
+
+
+class APIError(Exception):
+    """Raised when the product API answers with a non-retryable error"""
+
+
+class _RetryableError(Exception):
+    pass
+
+
+# ---------------- Async product API client ----------------
+class AsyncProductClient:
+    """
+    Asyncio HTTP/1.1 client for the paginated product catalog.
+    - at most `concurrency` requests in flight (semaphore)
+    - keep-alive connections are pooled and reused between requests
+    - timeouts, dropped connections, 429 and 5xx answers are retried with
+      exponential backoff plus jitter
+
+    Endpoints used:
+        GET /products?page=N&limit=L  -> {"products": [...], "total": T}
+        GET /products?ids=P001,P002   -> {"products": [...]}
+    """
+
+    def __init__(self, base_url, concurrency=8, timeout=5.0, retries=3, backoff=0.2,
+                 page_size=100, batch_size=50):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.ssl = url.scheme == 'https'
+        self.port = url.port or (443 if self.ssl else 80)
+        host = f"[{self.host}]" if ':' in self.host else self.host  # IPv6 literal
+        self.host_header = host if url.port in (None, 443 if self.ssl else 80) else f"{host}:{url.port}"
+        self.base_path = url.path.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pool = []
+        self.requests_sent = 0
+        self.connections_opened = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        while self._pool:
+            _, writer = self._pool.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass  # Already reset by the server; it is closed either way
+
+    # ---------------- Connection pool ----------------
+    async def _acquire(self):
+        if self._pool:
+            return self._pool.pop()
+        self.connections_opened += 1
+        return await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+
+    def _release(self, connection, keep_alive):
+        if keep_alive:
+            self._pool.append(connection)
+        else:
+            connection[1].close()
+
+    # ---------------- HTTP ----------------
+    async def _exchange(self, connection, target):
+        """
+        Sends one GET and reads the response.
+        Returns: (status, body, keep_alive)
+        Raises: _RetryableError for a response that cannot be parsed
+        """
+        reader, writer = connection
+        writer.write(
+            f"GET {target} HTTP/1.1\r\n"
+            f"Host: {self.host_header}\r\n"
+            "Accept: application/json\r\n"
+            "Connection: keep-alive\r\n\r\n".encode('ascii')
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        try:
+            return await self._read_response(reader, status_line)
+        except ValueError as e:  # Bad status line, header or length; the connection is closed by the caller
+            raise _RetryableError(f"malformed response: {e}") from e
+
+    async def _read_response(self, reader, status_line):
+        version, status = status_line.split()[:2]
+        if not version.startswith(b'HTTP/'):
+            raise ValueError(f"bad status line {status_line!r}")
+        status = int(status)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get('connection', '').lower() != 'close'
+        if status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            # No framing: the body runs to the end of the connection
+            body = await reader.read()
+            keep_alive = False
+        return status, body, keep_alive
+
+    async def _get_json(self, path, params):
+        target = f"{self.base_path}{path}?{urlencode(params)}"
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                connection = None
+                try:
+                    connection = await asyncio.wait_for(self._acquire(), self.timeout)
+                    self.requests_sent += 1
+                    status, body, keep_alive = await asyncio.wait_for(
+                        self._exchange(connection, target), self.timeout
+                    )
+                    self._release(connection, keep_alive)
+                    connection = None
+
+                    if status == 429 or status >= 500:  # Rate limited or server error
+                        raise _RetryableError(f"HTTP {status}")
+                    if status != 200:
+                        raise APIError(f"GET {target} failed with HTTP {status}")
+                    try:
+                        return json.loads(body)
+                    except ValueError as e:
+                        raise APIError(f"GET {target} returned invalid JSON: {e}") from e
+                except (asyncio.TimeoutError, ConnectionError, OSError,
+                        asyncio.IncompleteReadError, _RetryableError) as e:
+                    if connection is not None:
+                        connection[1].close()  # Never reuse a connection in an unknown state
+                    if attempt == self.retries:
+                        raise APIError(f"GET {target} failed after {attempt + 1} attempts: {e!r}") from e
+                    # Exponential backoff with full jitter
+                    await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    # ---------------- Catalog ----------------
+    async def fetch_all_products(self):
+        """
+        Fetches the first page to learn the total, then all remaining pages concurrently.
+        Returns: list of product dicts in page order
+        """
+        first = await self._get_json('/products', {'page': 1, 'limit': self.page_size})
+        pages = -(-first['total'] // self.page_size)
+        rest = await asyncio.gather(*(
+            self._get_json('/products', {'page': page, 'limit': self.page_size})
+            for page in range(2, pages + 1)
+        ))
+
+        products = list(first['products'])
+        for page in rest:
+            products.extend(page['products'])
+        return products
+
+    async def fetch_products_by_ids(self, product_ids):
+        """
+        Looks up products by ProductID in batches of `batch_size` ids per request.
+        Returns: list of product dicts (unknown ids are simply absent)
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        batches = [product_ids[i:i + self.batch_size] for i in range(0, len(product_ids), self.batch_size)]
+        results = await asyncio.gather(*(
+            self._get_json('/products', {'ids': ','.join(batch)}) for batch in batches
+        ))
+        return [product for result in results for product in result['products']]
+
+
+async def fetch_all_products_async(base_url, **options):
+    async with AsyncProductClient(base_url, **options) as client:
+        return await client.fetch_all_products()
+
+
+async def fetch_products_by_ids_async(base_url, product_ids, **options):
+    async with AsyncProductClient(base_url, **options) as client:
+        return await client.fetch_products_by_ids(product_ids)
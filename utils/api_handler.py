@@ -1,25 +1,83 @@
 # utils/api_handler.py
 
+import bz2
+import gzip
+import io
+import os
 import json
+import lzma
 import random
+import shutil
+import asyncio
+import hashlib
+import itertools
+
+from utils.api_client import fetch_all_products_async, fetch_products_by_ids_async
+from utils.product_index import ProductIndex
+from utils.transaction import json_default
+
+NOT_MODIFIED = 'not-modified'
 
 # ---------------- Fetch all products from API ----------------
-def fetch_all_products():
+def fetch_all_products(base_url=None, **options):
     """
-    Simulate fetching product list from an API.
+    Fetch the product list from the catalog API at `base_url` with the async client
+    (pages fetched concurrently, see utils/api_client.py); without a URL the API is simulated.
     Returns a list of product dictionaries.
     """
-    products = []
-    for i in range(1, 101):  # 100 dummy products
-        products.append({
-            "ProductID": f"P{i:03d}",
-            "ProductName": f"Product{i:03d}",
-            "Category": random.choice(["Electronics", "Accessories", "Office"]),
-            "Price": round(random.uniform(100, 10000), 2)
-        })
+    if base_url:
+        products = asyncio.run(fetch_all_products_async(base_url, **options))
+        print(f"Successfully fetched {len(products)} products from API.")
+        return products
+
+    products = [_simulated_product(i) for i in range(1, 101)]  # 100 dummy products
     print(f"Successfully fetched {len(products)} products from API.")
     return products
 
+
+def _simulated_product(i):
+    # Seeded per product, so the simulated catalog is stable between calls like a real one
+    rng = random.Random(i)
+    return {
+        "ProductID": f"P{i:03d}",
+        "ProductName": f"Product{i:03d}",
+        "Category": rng.choice(["Electronics", "Accessories", "Office"]),
+        "Price": round(rng.uniform(100, 10000), 2)
+    }
+
+
+def product_etag(product):
+    """
+    Content hash used as the ETag of a product entry
+    """
+    return hashlib.blake2b(json.dumps(product, sort_keys=True).encode('utf-8'), digest_size=8).hexdigest()
+
+# ---------------- Fetch products by ID ----------------
+def fetch_products(product_ids, etags=None, base_url=None):
+    """
+    Fetch individual products by ProductID with conditional (ETag style) requests:
+    a product whose current ETag equals the one in `etags` comes back as NOT_MODIFIED.
+    ETags are content hashes computed locally, as the catalog API does not send them.
+    Returns a dict ProductID -> (product, etag), NOT_MODIFIED, or None for unknown IDs.
+    """
+    etags = etags or {}
+    if base_url:
+        found = asyncio.run(fetch_products_by_ids_async(base_url, product_ids))
+        found = {prod["ProductID"]: prod for prod in found}
+    else:
+        catalog = {f"P{i:03d}": i for i in range(1, 101)}
+        found = {pid: _simulated_product(catalog[pid]) for pid in product_ids if pid in catalog}
+
+    results = {}
+    for product_id in product_ids:
+        product = found.get(product_id)
+        if product is None:
+            results[product_id] = None
+            continue
+        etag = product_etag(product)
+        results[product_id] = NOT_MODIFIED if etags.get(product_id) == etag else (product, etag)
+    return results
+
 # ---------------- Create product mapping ----------------
 def create_product_mapping(products):
     """
@@ -29,19 +87,45 @@ def create_product_mapping(products):
     return mapping
 
 # ---------------- Enrich sales transactions ----------------
-def enrich_sales_data(transactions, product_mapping):
+def empty_enrichment_summary():
+    return {'total': 0, 'matched': 0, 'unmatched_products': {}}
+
+
+def merge_enrichment_summary(total, partial):
     """
-    Add API product info to each transaction.
+    Adds the counters of one enrichment summary into another
+    """
+    total['total'] += partial['total']
+    total['matched'] += partial['matched']
+    unmatched = total['unmatched_products']
+    for name, count in partial['unmatched_products'].items():
+        unmatched[name] = unmatched.get(name, 0) + count
+    return total
+
+
+def iter_enrich_sales_data(transactions, product_mapping, summary=None):
+    """
+    Add API product info to each transaction, yielding them one at a time.
+    `product_mapping` is either a ProductName -> product dict (create_product_mapping)
+    or a ProductIndex, which also matches on ProductID and normalized/fuzzy names.
     Adds keys:
         - API_Match (True/False)
-        - ProductID
+        - ProductID (the catalog's ID when matched, otherwise left as is)
         - Category
         - Price
+    If a `summary` dict is given it is filled as records are consumed with:
+    total, matched and unmatched_products (ProductName -> count, first-seen order).
     """
-    enriched = []
+    if summary is not None:
+        summary.update(empty_enrichment_summary())
+
+    if isinstance(product_mapping, ProductIndex):
+        find = lambda tx: product_mapping.lookup(tx.get("ProductID"), tx.get("ProductName"))[0]
+    else:
+        find = lambda tx: product_mapping.get(tx.get("ProductName"))
+
     for tx in transactions:
-        prod_name = tx.get("Product")
-        info = product_mapping.get(prod_name)
+        info = find(tx)
         if info:
             tx["API_Match"] = True
             tx["ProductID"] = info["ProductID"]
@@ -49,20 +133,283 @@ def enrich_sales_data(transactions, product_mapping):
             tx["Price"] = info["Price"]
         else:
             tx["API_Match"] = False
-            tx["ProductID"] = None
             tx["Category"] = None
             tx["Price"] = None
-        enriched.append(tx)
-    return enriched
+
+        if summary is not None:
+            summary['total'] += 1
+            if info:
+                summary['matched'] += 1
+            else:
+                name = tx.get("ProductName")
+                summary['unmatched_products'][name] = summary['unmatched_products'].get(name, 0) + 1
+        yield tx
+
+
+def enrich_sales_data(transactions, product_mapping):
+    """
+    List version of iter_enrich_sales_data.
+    """
+    return list(iter_enrich_sales_data(transactions, product_mapping))
 
 # ---------------- Save enriched data ----------------
-def save_enriched_data(transactions, output_file='data/enriched_sales_data.txt'):
+ENRICHED_FORMATS = ('json', 'ndjson')
+COMPRESSION = {
+    'gzip': (gzip.open, '.gz'),
+    'bz2': (bz2.open, '.bz2'),
+    'xz': (lzma.open, '.xz')
+}
+_COMPRESSION_MAGIC = {
+    b'\x1f\x8b': gzip.open,
+    b'BZh': bz2.open,
+    b'\xfd7zXZ\x00': lzma.open
+}
+
+
+def enriched_path(output_file, compression=None):
+    """
+    Returns: output path with the compression suffix (e.g. ".gz") appended
+    """
+    return output_file + COMPRESSION[compression][1] if compression else output_file
+
+
+_JSON_ARRAY_SEPARATOR = ',\n    '
+
+
+def _json_array_element(tx):
+    return json.dumps(tx, indent=4, default=json_default).replace('\n', '\n    ')
+
+
+def _json_array_chunks(transactions):
+    """
+    Streams the exact text json.dump(transactions, f, indent=4) would write, record by record
+    """
+    first = True
+    for tx in transactions:
+        yield ('[\n    ' if first else _JSON_ARRAY_SEPARATOR) + _json_array_element(tx)
+        first = False
+    yield '[]' if first else '\n]'
+
+
+def _ndjson_lines(transactions):
+    for tx in transactions:
+        yield json.dumps(tx, ensure_ascii=False, separators=(',', ':'), default=json_default) + '\n'
+
+
+def _write_chunks(f, chunks, records_per_write):
+    buffer = []
+    for chunk in chunks:
+        buffer.append(chunk)
+        if len(buffer) >= records_per_write:
+            f.write(''.join(buffer))
+            buffer.clear()
+    f.write(''.join(buffer))
+
+
+def _open_enriched(path, mode, compression):
+    if compression:
+        return COMPRESSION[compression][0](path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8', buffering=1 << 20)
+
+
+def save_enriched_data(transactions, output_file='data/enriched_sales_data.txt', fmt='json',
+                       compression=None, records_per_write=1000):
+    """
+    Stream enriched transactions (any iterable, e.g. iter_enrich_sales_data) to a file.
+    fmt:
+        - json    pretty-printed JSON array (same text as json.dump(..., indent=4))
+        - ndjson  one compact JSON object per line
+    compression: None, 'gzip', 'bz2' or 'xz'; the suffix is appended to output_file.
+    Records are joined and written in bulk every `records_per_write` records.
+    Returns: number of records written
+    """
+    if fmt not in ENRICHED_FORMATS:
+        print(f"Error saving enriched data: unknown format '{fmt}'")
+        return 0
+    if compression is not None and compression not in COMPRESSION:
+        print(f"Error saving enriched data: unknown compression '{compression}'")
+        return 0
+
+    count = 0
+
+    def counted(records):
+        nonlocal count
+        for tx in records:
+            count += 1
+            yield tx
+
+    chunks = (_json_array_chunks if fmt == 'json' else _ndjson_lines)(counted(transactions))
+    output_file = enriched_path(output_file, compression)
+    try:
+        with _open_enriched(output_file, 'w', compression) as f:
+            _write_chunks(f, chunks, records_per_write)
+        print(f"Enriched data saved to {output_file}")
+    except OSError as e:
+        print(f"Error saving enriched data: {e}")
+    return count
+
+
+def append_enriched_data(transactions, output_file='data/enriched_sales_data.txt', fmt='json',
+                         compression=None, records_per_write=1000):
+    """
+    Adds records to the end of a file written by save_enriched_data with the same
+    fmt and compression (e.g. the rows an incremental run appended to the sales file):
+        - ndjson             appended in place; a compressed file gains another
+                             stream, which iter_enriched_data reads through
+        - json               the array is reopened before its closing bracket
+        - json, compressed   rewritten by streaming the stored records back, as
+                             compressed data cannot be edited in place
+    A missing file is written as by save_enriched_data; without records the file is left alone.
+    Returns: number of records appended
+    """
+    records = iter(transactions)
+    first = next(records, None)
+    if first is None:
+        return 0
+    records = itertools.chain([first], records)
+    path = enriched_path(output_file, compression)
+    if not os.path.exists(path):
+        return save_enriched_data(records, output_file, fmt, compression, records_per_write)
+    if fmt not in ENRICHED_FORMATS:
+        print(f"Error saving enriched data: unknown format '{fmt}'")
+        return 0
+
+    count = 0
+
+    def counted(records):
+        nonlocal count
+        for tx in records:
+            count += 1
+            yield tx
+
+    try:
+        if fmt == 'ndjson':
+            with _open_enriched(path, 'a', compression) as f:
+                _write_chunks(f, _ndjson_lines(counted(records)), records_per_write)
+        elif compression:
+            temporary = output_file + '.tmp'
+            save_enriched_data(itertools.chain(iter_enriched_data(path), counted(records)), temporary, fmt,
+                               compression, records_per_write)
+            os.replace(enriched_path(temporary, compression), path)
+        else:
+            with open(path, 'r+b') as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(0, size - 2))
+                tail = f.read()
+                empty = size == 2 and tail == b'[]'
+                if not empty and tail != b'\n]':
+                    print(f"Error saving enriched data: {path} does not end with a JSON array")
+                    return 0
+                f.seek(size - 2)
+                f.truncate()
+                if empty:
+                    chunks = _json_array_chunks(counted(records))
+                else:
+                    elements = (_JSON_ARRAY_SEPARATOR + _json_array_element(tx) for tx in counted(records))
+                    chunks = itertools.chain(elements, ['\n]'])
+                text = io.TextIOWrapper(f, encoding='utf-8', write_through=True)
+                _write_chunks(text, chunks, records_per_write)
+                text.detach()
+        print(f"Enriched data appended to {path}")
+    except OSError as e:
+        print(f"Error saving enriched data: {e}")
+    return count
+
+def write_enriched_part(transactions, part_file, fmt='json', records_per_write=1000):
     """
-    Save enriched transactions to a JSON file.
+    Writes records as one piece of an enriched data file, to be put together by
+    join_enriched_parts (e.g. by parallel workers): NDJSON lines, or the JSON array
+    elements without the enclosing brackets.
+    Returns: number of records written
     """
+    if fmt == 'json':
+        chunks = (('' if i == 0 else _JSON_ARRAY_SEPARATOR) + _json_array_element(tx)
+                  for i, tx in enumerate(transactions))
+    else:
+        chunks = _ndjson_lines(transactions)
+
+    count = 0
+
+    def counted(chunks):
+        nonlocal count
+        for chunk in chunks:
+            count += 1
+            yield chunk
+
+    with open(part_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        _write_chunks(f, counted(chunks), records_per_write)
+    return count
+
+
+def join_enriched_parts(parts, output_file='data/enriched_sales_data.txt', fmt='json', compression=None):
+    """
+    Concatenates the parts written by write_enriched_part, in order, into the same
+    file save_enriched_data would write for all of their records.
+    """
+    output_file = enriched_path(output_file, compression)
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(transactions, f, indent=4)
+        with _open_enriched(output_file, 'w', compression) as f:
+            first = True
+            for part in parts:
+                if not os.path.getsize(part):
+                    continue
+                if fmt == 'json':
+                    f.write('[\n    ' if first else _JSON_ARRAY_SEPARATOR)
+                first = False
+                with open(part, encoding='utf-8') as piece:
+                    shutil.copyfileobj(piece, f, 1 << 20)
+            if fmt == 'json':
+                f.write('[]' if first else '\n]')
         print(f"Enriched data saved to {output_file}")
-    except Exception as e:
+    except OSError as e:
         print(f"Error saving enriched data: {e}")
+
+# ---------------- Read enriched data ----------------
+def _iter_json_array(f, buffer, chunk_size=1 << 16):
+    """
+    Incrementally decodes the objects of a JSON array; `buffer` holds the text after '['
+    """
+    decoder = json.JSONDecoder()
+    pos = 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            if pos == len(buffer):
+                raise ValueError("need more data")
+            record, pos = decoder.raw_decode(buffer, pos)
+        except ValueError:
+            more = f.read(chunk_size)
+            if not more:
+                if pos == len(buffer):
+                    return
+                raise
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+        yield record
+
+
+def iter_enriched_data(input_file):
+    """
+    Streams records back from a file written by save_enriched_data.
+    Format (JSON array or NDJSON) and compression are detected from the content.
+    """
+    with open(input_file, 'rb') as f:
+        magic = f.read(6)
+    opener = open
+    for prefix, candidate in _COMPRESSION_MAGIC.items():
+        if magic.startswith(prefix):
+            opener = candidate
+
+    with opener(input_file, 'rt', encoding='utf-8') as f:
+        first = f.readline()
+        if first.lstrip().startswith('['):
+            yield from _iter_json_array(f, first.lstrip()[1:])
+            return
+        if first.strip():
+            yield json.loads(first)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
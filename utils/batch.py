@@ -0,0 +1,105 @@
+# utils/batch.py
+
+import os
+import glob
+
+from utils.data_processor import (
+    calculate_total_revenue,
+    region_wise_sales,
+    top_selling_products,
+    customer_analysis,
+    daily_sales_trend
+)
+from utils.time_index import DailyTimeIndex
+from utils.report_generator import generate_sales_report
+
+COMBINED_REPORT = 'combined_report.txt'
+
+
+# ---------------- Inputs ----------------
+def expand_inputs(patterns, pattern='*.txt'):
+    """
+    Expands files, directories (their files matching `pattern`, not recursive) and
+    glob patterns (** recurses) into a list of files, each listed once, in the
+    order given and sorted within each directory or glob.
+    Returns: list of file paths
+    """
+    files = []
+    for entry in patterns:
+        if os.path.isdir(entry):
+            matches = sorted(glob.glob(os.path.join(entry, pattern)))
+        elif glob.has_magic(entry):
+            matches = sorted(glob.glob(entry, recursive=True))
+        elif os.path.isfile(entry):
+            matches = [entry]
+        else:
+            print(f"Error: File '{entry}' not found.")
+            continue
+        matches = [m for m in matches if os.path.isfile(m)]
+        if not matches:
+            print(f"Warning: No sales files match '{entry}'")
+        files.extend(matches)
+    return list(dict.fromkeys(os.path.normpath(f) for f in files))
+
+
+def report_names(filenames):
+    """
+    Report file names for per-file reports: the path relative to the inputs'
+    common directory, with separators replaced, so same-named files from
+    different store directories do not overwrite each other. A name already
+    taken (ignoring case), e.g. combined_report.txt for an input named
+    combined.txt or store_a/x.txt next to store/a_x.txt, gets a number.
+    Returns: dict of filename -> '<name>_report.txt' or '<name>_<n>_report.txt'
+    """
+    if not filenames:
+        return {}
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in filenames])
+    names, taken = {}, {COMBINED_REPORT}
+    for filename in filenames:
+        stem = os.path.splitext(os.path.relpath(os.path.abspath(filename), base))[0].replace(os.sep, '_')
+        name, n = stem + '_report.txt', 1
+        while name.casefold() in taken:
+            n += 1
+            name = f"{stem}_{n}_report.txt"
+        taken.add(name.casefold())
+        names[filename] = name
+    return names
+
+
+# ---------------- Reports ----------------
+def write_report(sales_agg, output_file, sources):
+    """
+    Runs the analytics over one aggregator and writes its report (without the
+    API enrichment section; batch runs do not call the catalog API).
+    Returns: total revenue
+    """
+    total_revenue = calculate_total_revenue(sales_agg)
+    daily_trends = daily_sales_trend(sales_agg)
+    generate_sales_report(
+        total_revenue=total_revenue,
+        region_stats=region_wise_sales(sales_agg),
+        top_products=top_selling_products(sales_agg, n=5),
+        customer_stats=customer_analysis(sales_agg),
+        daily_trends=daily_trends,
+        enrichment_summary=None,
+        output_file=output_file,
+        time_index=DailyTimeIndex(daily_trends),
+        sources=sources
+    )
+    return total_revenue
+
+
+def write_batch_reports(results, combined_agg, output_dir='output'):
+    """
+    Writes one report per input file plus COMBINED_REPORT over all of them.
+    `results` is the aggregate_files output.
+    Returns: dict of report path -> total revenue, combined report last
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = {}
+    for filename, name in report_names(list(results)).items():
+        path = os.path.join(output_dir, name)
+        written[path] = write_report(results[filename][0], path, [filename])
+    path = os.path.join(output_dir, COMBINED_REPORT)
+    written[path] = write_report(combined_agg, path, list(results))
+    return written
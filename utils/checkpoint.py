@@ -0,0 +1,465 @@
+# utils/checkpoint.py
+
+import os
+import json
+import hashlib
+import sqlite3
+import tempfile
+
+from utils.file_handler import iter_sales_data
+from utils.data_processor import (
+    iter_transactions,
+    iter_valid_transactions,
+    empty_summary,
+    merge_summary,
+    SalesAggregator,
+    ValidTransactions
+)
+from utils.api_handler import (
+    save_enriched_data,
+    append_enriched_data,
+    empty_enrichment_summary,
+    merge_enrichment_summary,
+    enriched_path
+)
+from utils.transaction import Transaction, gc_paused
+from utils.dedup import BloomDeduplicator
+from utils.validation_rules import DEFAULT_RULESET, QuarantineWriter
+
+FINGERPRINT_BYTES = 4096
+SPILLED_FIELDS = Transaction.FIELDS + ('Amount',)
+
+
+def checkpoint_path(filename):
+    return filename + '.checkpoint.sqlite'
+
+
+def dedup_path(filename):
+    return filename + '.dedup.sqlite'
+
+
+def _fingerprint(filename, offset):
+    """
+    Hashes the bytes just before `offset`, so a rewritten (not appended) file is detected
+    """
+    with open(filename, 'rb') as file:
+        file.seek(max(0, offset - FINGERPRINT_BYTES))
+        return hashlib.blake2b(file.read(min(offset, FINGERPRINT_BYTES))).hexdigest()
+
+
+def _complete_end(filename, chunk_size=65536):
+    """
+    Returns the offset just past the last newline; a partly written last line is left for the next run
+    """
+    with open(filename, 'rb') as file:
+        end = file.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - chunk_size)
+            file.seek(start)
+            newline = file.read(end - start).rfind(b'\n')
+            if newline != -1:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+# ---------------- Checkpoint store ----------------
+# One table per SalesAggregator grouping; seq keeps first-seen order like the aggregator's dicts
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS checkpoint ("
+    " id INTEGER PRIMARY KEY CHECK (id = 0),"
+    " byte_offset INTEGER NOT NULL,"
+    " fingerprint TEXT NOT NULL,"
+    " dedup TEXT NOT NULL,"
+    " rules TEXT NOT NULL,"
+    " row_count INTEGER NOT NULL,"
+    " total_revenue REAL NOT NULL,"
+    " summary TEXT NOT NULL)",  # JSON iter_valid_transactions summary
+    "CREATE TABLE IF NOT EXISTS regions (seq INTEGER PRIMARY KEY, region TEXT NOT NULL UNIQUE,"
+    " total_sales REAL NOT NULL, transaction_count INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS products (seq INTEGER PRIMARY KEY, product TEXT NOT NULL UNIQUE,"
+    " total_quantity INTEGER NOT NULL, total_revenue REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS customers (seq INTEGER PRIMARY KEY, customer TEXT NOT NULL UNIQUE,"
+    " total_spent REAL NOT NULL, purchase_count INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS customer_products (customer TEXT NOT NULL, product TEXT NOT NULL,"
+    " PRIMARY KEY (customer, product)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS days (seq INTEGER PRIMARY KEY, day TEXT NOT NULL UNIQUE,"
+    " revenue REAL NOT NULL, transaction_count INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS day_customers (day TEXT NOT NULL, customer TEXT NOT NULL,"
+    " PRIMARY KEY (day, customer)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS seen_ids (transaction_id TEXT PRIMARY KEY) WITHOUT ROWID",
+    # The enriched data file of the incremental runs and the enrichment summary of its rows
+    "CREATE TABLE IF NOT EXISTS enrichment ("
+    " id INTEGER PRIMARY KEY CHECK (id = 0),"
+    " byte_offset INTEGER NOT NULL,"
+    " output TEXT NOT NULL,"  # JSON [output_file, fmt, compression]
+    " size INTEGER NOT NULL,"
+    " mtime_ns INTEGER NOT NULL,"
+    " summary TEXT NOT NULL)"
+)
+STATE_TABLES = ('regions', 'products', 'customers', 'customer_products', 'days', 'day_customers', 'seen_ids')
+
+
+class Checkpoint:
+    """
+    Incremental-mode state of one sales file in SQLite (<file>.checkpoint.sqlite):
+    the processed offset, the validation summary, the aggregates as one table per
+    grouping and, in exact dedup mode, the seen TransactionIDs.
+    A run reads the aggregates but not the IDs (new IDs are looked up by key), and
+    writes back only the groups, set members and IDs its new rows touched, in one
+    transaction with the new offset. An append therefore costs in proportion to
+    the appended data, and an interrupted run leaves the previous state in place.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.path = checkpoint_path(filename)
+        # Autocommit mode: transactions are opened and closed explicitly (see save)
+        self.db = sqlite3.connect(self.path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            self.db.execute(statement)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def load(self):
+        """
+        Returns: {'offset', 'dedup', 'rules', 'summary', 'row_count', 'total_revenue'} if the
+                 checkpoint still describes a prefix of the file, otherwise None
+        """
+        row = self.db.execute("SELECT byte_offset, fingerprint, dedup, rules, row_count, total_revenue, summary "
+                              "FROM checkpoint WHERE id = 0").fetchone()
+        if row is None:
+            return None
+        offset, fingerprint = row[0], row[1]
+        if offset > os.path.getsize(self.filename) or _fingerprint(self.filename, offset) != fingerprint:
+            print(f"Warning: {self.filename} changed before the checkpoint offset, recomputing from the start")
+            return None
+        summary = json.loads(row[6])
+        summary['regions'] = set(summary['regions'])
+        return {'offset': offset, 'dedup': row[2], 'rules': row[3], 'row_count': row[4],
+                'total_revenue': row[5], 'summary': summary}
+
+    def aggregates(self, state):
+        """
+        Returns: SalesAggregator rebuilt from the stored groups, in first-seen order
+        """
+        db = self.db
+        agg = SalesAggregator()
+        agg.row_count, agg.total_revenue = state['row_count'], state['total_revenue']
+        agg.regions = {
+            r: {'total_sales': sales, 'transaction_count': count}
+            for r, sales, count in db.execute("SELECT region, total_sales, transaction_count FROM regions ORDER BY seq")
+        }
+        agg.products = {
+            p: {'total_quantity': quantity, 'total_revenue': revenue}
+            for p, quantity, revenue in db.execute(
+                "SELECT product, total_quantity, total_revenue FROM products ORDER BY seq")
+        }
+        agg.customers = {
+            c: {'total_spent': spent, 'purchase_count': count, 'products_bought': set()}
+            for c, spent, count in db.execute(
+                "SELECT customer, total_spent, purchase_count FROM customers ORDER BY seq")
+        }
+        for c, p in db.execute("SELECT customer, product FROM customer_products"):
+            agg.customers[c]['products_bought'].add(p)
+        agg.daily = {
+            d: {'revenue': revenue, 'transaction_count': count, 'unique_customers': set()}
+            for d, revenue, count in db.execute("SELECT day, revenue, transaction_count FROM days ORDER BY seq")
+        }
+        for d, c in db.execute("SELECT day, customer FROM day_customers"):
+            agg.daily[d]['unique_customers'].add(c)
+        return agg
+
+    def offset(self):
+        """
+        Returns: the byte offset processed so far (0 without a checkpoint)
+        """
+        row = self.db.execute("SELECT byte_offset FROM checkpoint WHERE id = 0").fetchone()
+        return row[0] if row is not None else 0
+
+    def enrichment(self):
+        """
+        Returns: {'offset', 'output', 'size', 'mtime_ns', 'summary'} of the enriched data
+                 file last written in incremental mode, or None
+        """
+        row = self.db.execute("SELECT byte_offset, output, size, mtime_ns, summary FROM enrichment WHERE id = 0").fetchone()
+        if row is None:
+            return None
+        return {'offset': row[0], 'output': json.loads(row[1]), 'size': row[2], 'mtime_ns': row[3],
+                'summary': json.loads(row[4])}
+
+    def save_enrichment(self, offset, output, summary):
+        """
+        Records that the enriched data file `output` ([output_file, fmt, compression])
+        now holds the rows of the sales file up to `offset`, with their enrichment summary
+        """
+        stat = os.stat(enriched_path(output[0], output[2]))
+        self.db.execute("INSERT OR REPLACE INTO enrichment VALUES (0, ?, ?, ?, ?, ?)",
+                        (offset, json.dumps(output), stat.st_size, stat.st_mtime_ns, json.dumps(summary)))
+
+    def has_id(self, transaction_id):
+        return self.db.execute("SELECT 1 FROM seen_ids WHERE transaction_id = ?", (transaction_id,)).fetchone() is not None
+
+    def save(self, offset, sales_agg, changed, summary, dedup='exact', rules=None, new_ids=(), reset=False):
+        """
+        Writes the groups `changed` (an aggregator over the new rows) touched, with their
+        totals from `sales_agg`, its set members, `new_ids` and the new offset in one
+        transaction. With `reset` the previous state is dropped first.
+        """
+        db = self.db
+        db.execute("BEGIN")
+        try:
+            if reset:
+                for table in STATE_TABLES:
+                    db.execute(f"DELETE FROM {table}")
+            db.executemany(
+                "INSERT INTO regions (region, total_sales, transaction_count) VALUES (?, ?, ?) "
+                "ON CONFLICT (region) DO UPDATE SET total_sales = excluded.total_sales,"
+                " transaction_count = excluded.transaction_count",
+                ((r, sales_agg.regions[r]['total_sales'], sales_agg.regions[r]['transaction_count'])
+                 for r in changed.regions)
+            )
+            db.executemany(
+                "INSERT INTO products (product, total_quantity, total_revenue) VALUES (?, ?, ?) "
+                "ON CONFLICT (product) DO UPDATE SET total_quantity = excluded.total_quantity,"
+                " total_revenue = excluded.total_revenue",
+                ((p, sales_agg.products[p]['total_quantity'], sales_agg.products[p]['total_revenue'])
+                 for p in changed.products)
+            )
+            db.executemany(
+                "INSERT INTO customers (customer, total_spent, purchase_count) VALUES (?, ?, ?) "
+                "ON CONFLICT (customer) DO UPDATE SET total_spent = excluded.total_spent,"
+                " purchase_count = excluded.purchase_count",
+                ((c, sales_agg.customers[c]['total_spent'], sales_agg.customers[c]['purchase_count'])
+                 for c in changed.customers)
+            )
+            db.executemany("INSERT OR IGNORE INTO customer_products VALUES (?, ?)",
+                           ((c, p) for c, stats in changed.customers.items() for p in stats['products_bought']))
+            db.executemany(
+                "INSERT INTO days (day, revenue, transaction_count) VALUES (?, ?, ?) "
+                "ON CONFLICT (day) DO UPDATE SET revenue = excluded.revenue,"
+                " transaction_count = excluded.transaction_count",
+                ((d, sales_agg.daily[d]['revenue'], sales_agg.daily[d]['transaction_count'])
+                 for d in changed.daily)
+            )
+            db.executemany("INSERT OR IGNORE INTO day_customers VALUES (?, ?)",
+                           ((d, c) for d, stats in changed.daily.items() for c in stats['unique_customers']))
+            db.executemany("INSERT OR IGNORE INTO seen_ids VALUES (?)", ((i,) for i in new_ids))
+            db.execute(
+                "INSERT OR REPLACE INTO checkpoint VALUES (0, ?, ?, ?, ?, ?, ?, ?)",
+                (offset, _fingerprint(self.filename, offset), dedup, (rules or DEFAULT_RULESET).fingerprint(),
+                 sales_agg.row_count, sales_agg.total_revenue,
+                 json.dumps({**summary, 'regions': sorted(summary['regions'])}))
+            )
+            db.execute("COMMIT")
+        except BaseException:  # Including KeyboardInterrupt
+            db.execute("ROLLBACK")
+            raise
+
+
+class _CheckpointIds:
+    """
+    Exact deduplicator for incremental runs: IDs of this run are kept in a set,
+    IDs of earlier runs are looked up in the checkpoint instead of being loaded.
+    """
+
+    def __init__(self, checkpoint, stored=True):
+        self.checkpoint = checkpoint
+        self.stored = stored  # False on a full recompute: there are no earlier IDs
+        self.ids = set()
+
+    def seen(self, transaction_id):
+        if transaction_id in self.ids:
+            return True
+        if self.stored and self.checkpoint.has_id(transaction_id):
+            return True
+        self.ids.add(transaction_id)
+        return False
+
+    def close(self):
+        pass
+
+
+# ---------------- Incremental processing ----------------
+class SpilledTransactions:
+    """
+    The new valid transactions of an incremental run, written to an anonymous
+    temporary file as they stream past (their fields and Amount as one
+    `|`-separated line each) and parsed again on every iteration, so they reach
+    enrichment without being held in memory. The file is deleted when closed
+    or collected.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile('w+', encoding='utf-8', newline='\n')
+        self.count = 0
+
+    def add(self, tx):
+        self._file.write('|'.join(str(tx[field]) for field in SPILLED_FIELDS) + '\n')
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            parts = line[:-1].split('|')
+            tx = Transaction(parts[0], parts[1], parts[2], parts[3], int(parts[4]), float(parts[5]),
+                             parts[6], parts[7])
+            tx['Amount'] = float(parts[8])
+            yield tx
+
+    def close(self):
+        self._file.close()
+
+
+def incremental_aggregate(filename, dedup='exact', rules=None, quarantine=None):
+    """
+    Processes only the part of the file appended since the last checkpoint and merges
+    it into the persisted aggregates. The first run (or a rewritten file) processes
+    everything. Results match a full recompute exactly, since the running sums
+    continue in file order.
+    Duplicate TransactionIDs are removed across runs: `dedup` is 'exact' (IDs kept
+    in the checkpoint database), 'bloom' (Bloom filter + ID table in
+    <file>.dedup.sqlite) or 'off'. Changing the mode or the validation `rules`
+    triggers a full recompute.
+    With a `quarantine` path, rejected lines of the new part are appended to it
+    (the file is rewritten on a full recompute).
+    Returns: (SalesAggregator, summary, new valid transactions as SpilledTransactions,
+             bytes processed)
+    """
+    if not os.path.exists(filename):
+        print(f"Error: File '{filename}' not found.")
+        return SalesAggregator(), empty_summary(), [], 0
+
+    rules = rules or DEFAULT_RULESET
+    with Checkpoint(filename) as checkpoint:
+        state = checkpoint.load()
+        if state is not None and state['dedup'] != dedup:
+            print(f"Warning: Dedup mode changed to '{dedup}', recomputing from the start")
+            state = None
+        if state is not None and state['rules'] != rules.fingerprint():
+            print("Warning: Validation rules changed, recomputing from the start")
+            state = None
+
+        deduplicator = None
+        if dedup == 'bloom':
+            deduplicator = BloomDeduplicator(path=dedup_path(filename))
+            if state is not None and deduplicator.tag != str(state['offset']):
+                print(f"Warning: {dedup_path(filename)} does not match the checkpoint, recomputing from the start")
+                state = None
+            if state is None:
+                deduplicator.reset()
+
+        if state is None:
+            offset = 0
+            sales_agg = SalesAggregator()
+            summary = empty_summary()
+        else:
+            offset = state['offset']
+            sales_agg = checkpoint.aggregates(state)
+            summary = state['summary']
+        if dedup == 'exact':
+            deduplicator = _CheckpointIds(checkpoint, stored=state is not None)
+
+        end = _complete_end(filename)
+        new_transactions = SpilledTransactions()
+        # The groups the new rows touch; on a recompute that is every group
+        changed = SalesAggregator() if state is not None else sales_agg
+        quarantine_writer = None
+        try:
+            if end > offset:
+                if quarantine:
+                    quarantine_writer = QuarantineWriter(quarantine, append=offset > 0)
+                tail_summary, malformed = {}, {}
+                with_lines = quarantine_writer is not None
+                lines = iter_sales_data(filename, offset, end)
+                with gc_paused():
+                    for tx in iter_valid_transactions(iter_transactions(lines, malformed, quarantine_writer, with_lines),
+                                                      tail_summary, dedup=deduplicator, rules=rules,
+                                                      quarantine=quarantine_writer, with_lines=with_lines):
+                        sales_agg.add(tx)
+                        if changed is not sales_agg:
+                            changed.add(tx)
+                        new_transactions.add(tx)
+                tail_summary['malformed'] = malformed
+                merge_summary(summary, tail_summary)
+                if quarantine_writer is not None:
+                    quarantine_writer.flush()  # Before the checkpoint, so no rejected line is lost
+                if isinstance(deduplicator, BloomDeduplicator):
+                    deduplicator.save(tag=end)  # Committed first, tagged with the offset it belongs to
+                checkpoint.save(end, sales_agg, changed, summary, dedup, rules,
+                                deduplicator.ids if dedup == 'exact' else (), reset=state is None)
+        except BaseException:
+            new_transactions.close()
+            raise
+        finally:
+            if quarantine_writer is not None:
+                quarantine_writer.close()
+            if deduplicator is not None:
+                deduplicator.close()
+
+    return sales_agg, summary, new_transactions, max(end - offset, 0)
+
+
+# ---------------- Incremental enrichment ----------------
+class IncrementalEnrichment:
+    """
+    Keeps the enriched data file of incremental runs covering the whole sales
+    file. When the file is the one the previous run recorded (same name, format,
+    compression, size and mtime, written up to where this run's new rows start),
+    only the new rows are enriched and appended; otherwise (first run, recompute,
+    file replaced or options changed) every valid row up to the checkpoint is
+    enriched into a fresh file. `transactions` are the rows to enrich; write()
+    stores them and returns the enrichment summary over all rows, kept in the
+    checkpoint between runs.
+    """
+
+    def __init__(self, filename, new_transactions, new_bytes, output_file, fmt='json', compression=None,
+                 dedup='exact', rules=None):
+        self.filename = filename
+        self.output = [output_file, fmt, compression]
+        with Checkpoint(filename) as checkpoint:
+            self.end = checkpoint.offset()
+            stored = checkpoint.enrichment()
+
+        path = enriched_path(output_file, compression)
+        stat = os.stat(path) if os.path.exists(path) else None
+        self.append = (stored is not None and stat is not None and stored['offset'] == self.end - new_bytes
+                       and stored['output'] == self.output
+                       and (stat.st_size, stat.st_mtime_ns) == (stored['size'], stored['mtime_ns']))
+        if self.append:
+            self.transactions = new_transactions
+            self.previous = stored['summary']
+        else:
+            end = self.end
+            self.transactions = ValidTransactions(lambda: iter_transactions(iter_sales_data(filename, 0, end)),
+                                                  dedup=dedup, rules=rules)
+            self.previous = empty_enrichment_summary()
+
+    def write(self, enriched, run_summary):
+        """
+        Appends or writes `enriched` (iter_enrich_sales_data over `transactions`,
+        filling `run_summary`) and records the file in the checkpoint.
+        Returns: enrichment summary over every valid row of the sales file
+        """
+        output_file, fmt, compression = self.output
+        if self.append:
+            append_enriched_data(enriched, output_file, fmt, compression)
+        else:
+            save_enriched_data(enriched, output_file, fmt, compression)
+        summary = merge_enrichment_summary(self.previous, run_summary)
+        if os.path.exists(enriched_path(output_file, compression)):
+            with Checkpoint(self.filename) as checkpoint:
+                checkpoint.save_enrichment(self.end, self.output, summary)
+        return summary
@@ -0,0 +1,326 @@
+# utils/columnar.py
+
+from array import array
+
+from utils.data_processor import SalesAggregator, empty_summary
+from utils.dedup import ExactDeduplicator
+from utils.validation_rules import DEFAULT_RULESET
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the dict-based analytics work without it
+    np = None
+
+BATCH_ROWS = 1 << 16
+
+
+# ---------------- Column-wise validation ----------------
+def iter_valid_batches(transactions, summary=None, dedup=None, rules=None, quarantine=None, with_lines=False,
+                       batch_rows=BATCH_ROWS):
+    """
+    Column-wise counterpart of iter_valid_transactions without filters or cube:
+    `batch_rows` transactions at a time are checked with RuleSet.check_columns
+    masks, then the valid ones are deduplicated and counted in `summary`
+    exactly as the row-wise path does. Invalid transactions go to `quarantine`
+    with their first failed rule (as raw lines with with_lines=True, as there),
+    after any lines the parser rejected while the batch was read.
+    Yields: the valid transactions, in order
+    """
+    if np is None:
+        raise ImportError("NumPy is required for column-wise validation")
+    if summary is None:
+        summary = {}
+    summary.update(empty_summary())
+    if rules is None:
+        rules = DEFAULT_RULESET
+    fields = list(dict.fromkeys(rule['field'] for rule in rules.rules))
+    seen_ids = dedup.ids if isinstance(dedup, ExactDeduplicator) else None
+
+    def validate(batch, lines):
+        summary['total_input'] += len(batch)
+        valid, rule_counts, reason_counts = rules.check_columns(
+            {field: [tx[field] for tx in batch] for field in fields})
+        for counts, key in ((reason_counts, 'invalid_reasons'), (rule_counts, 'rule_failures')):
+            totals = summary[key]
+            for name, count in counts.items():
+                if count:
+                    totals[name] = totals.get(name, 0) + count
+        summary['invalid'] += len(batch) - int(valid.sum())
+        if quarantine is not None:
+            for position in np.flatnonzero(~valid).tolist():
+                tx = batch[position]
+                quarantine.write_transaction(rules.failures(tx)[0], tx, lines[position] if with_lines else None)
+
+        regions = summary['regions']
+        for position in np.flatnonzero(valid).tolist():
+            tx = batch[position]
+            if seen_ids is not None:
+                n = len(seen_ids)
+                seen_ids.add(tx['TransactionID'])
+                if len(seen_ids) == n:
+                    summary['duplicates_removed'] += 1
+                    continue
+            elif dedup is not None and dedup.seen(tx['TransactionID']):
+                summary['duplicates_removed'] += 1
+                continue
+            amount = tx['Quantity'] * tx['UnitPrice']
+            tx['Amount'] = amount
+            regions.add(tx['Region'])
+            amount_range = summary['amount_range']
+            if amount_range is None:
+                summary['amount_range'] = [amount, amount]
+            elif amount < amount_range[0]:
+                amount_range[0] = amount
+            elif amount > amount_range[1]:
+                amount_range[1] = amount
+            summary['final_count'] += 1
+            yield tx
+
+    batch, lines = [], []
+    for tx in transactions:
+        if with_lines:
+            tx, line = tx
+            lines.append(line)  # Raw line of each row, for the rejected ones
+        batch.append(tx)
+        if len(batch) >= batch_rows:
+            yield from validate(batch, lines)
+            batch, lines = [], []
+    if batch:
+        yield from validate(batch, lines)
+
+
+# ---------------- Columnar store ----------------
+class ColumnarTransactions:
+    """
+    Column-oriented, NumPy-backed copy of a list of transactions.
+    Quantity, UnitPrice and Amount are numeric arrays; Region, ProductName,
+    CustomerID and Date are dictionary-encoded as integer codes into the
+    category lists (kept in first-seen order, like the dict-based analytics).
+    """
+
+    def __init__(self, quantity, unit_price, region_codes, product_codes, customer_codes, date_codes,
+                 regions, products, customers, dates):
+        if np is None:
+            raise ImportError("NumPy is required for the columnar transaction store")
+        self.quantity = np.asarray(quantity, dtype=np.int64)
+        self.unit_price = np.asarray(unit_price, dtype=np.float64)
+        self.amount = self.quantity * self.unit_price
+        self.region_codes = np.asarray(region_codes, dtype=np.int32)
+        self.product_codes = np.asarray(product_codes, dtype=np.int32)
+        self.customer_codes = np.asarray(customer_codes, dtype=np.int32)
+        self.date_codes = np.asarray(date_codes, dtype=np.int32)
+        self.regions = list(regions)
+        self.products = list(products)
+        self.customers = list(customers)
+        self.dates = list(dates)
+
+    def __len__(self):
+        return len(self.quantity)
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """
+        Builds the store from an iterable of transactions (e.g. a stream) in one pass;
+        values are collected in typed arrays, never as one Python object per row
+        """
+        if np is None:
+            raise ImportError("NumPy is required for the columnar transaction store")
+        quantity, unit_price = array('q'), array('d')
+        columns = {'Region': array('i'), 'ProductName': array('i'), 'CustomerID': array('i'), 'Date': array('i')}
+        categories = {key: {} for key in columns}
+
+        for tx in transactions:
+            quantity.append(tx['Quantity'])
+            unit_price.append(tx['UnitPrice'])
+            for key, codes in columns.items():
+                lookup = categories[key]
+                value = tx[key]
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(lookup)
+                codes.append(code)
+
+        return cls(
+            np.frombuffer(quantity, dtype=np.int64), np.frombuffer(unit_price, dtype=np.float64),
+            *(np.frombuffer(columns[key], dtype=np.int32) for key in columns),
+            *(categories[key] for key in columns)
+        )
+
+    def filter(self, region=None, min_amount=None, max_amount=None):
+        """
+        Same filter semantics as iter_valid_transactions, as one boolean mask.
+        Returns: ColumnarTransactions over the matching rows (same category lists)
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if isinstance(region, str):
+            region = [region]
+        if region:
+            wanted = set(region)
+            mask &= np.isin(self.region_codes, [code for code, r in enumerate(self.regions) if r in wanted])
+        if min_amount:
+            mask &= self.amount >= min_amount
+        if max_amount:
+            mask &= self.amount <= max_amount
+        return ColumnarTransactions(
+            self.quantity[mask], self.unit_price[mask], self.region_codes[mask], self.product_codes[mask],
+            self.customer_codes[mask], self.date_codes[mask], self.regions, self.products, self.customers, self.dates
+        )
+
+    def aggregate(self):
+        """
+        Fills a SalesAggregator with vectorized group-bys, so the Part 2 functions and
+        the report run on it unchanged. Groups are in first-row order and bincount adds
+        in row order, so it equals aggregate_sales over the same rows.
+        """
+        agg = SalesAggregator()
+        agg.row_count = len(self)
+        agg.total_revenue = calculate_total_revenue(self)
+
+        def groups(codes, categories):
+            return [(code, categories[code]) for code in _present(codes, len(categories)).tolist()]
+
+        size = len(self.regions)
+        sales = _group_sum(self.region_codes, self.amount, size).tolist()
+        counts = _group_count(self.region_codes, size).tolist()
+        agg.regions = {r: {'total_sales': sales[code], 'transaction_count': counts[code]}
+                       for code, r in groups(self.region_codes, self.regions)}
+
+        size = len(self.products)
+        quantities = np.bincount(self.product_codes, weights=self.quantity, minlength=size).astype(np.int64).tolist()
+        revenues = _group_sum(self.product_codes, self.amount, size).tolist()
+        agg.products = {p: {'total_quantity': quantities[code], 'total_revenue': revenues[code]}
+                        for code, p in groups(self.product_codes, self.products)}
+
+        size = len(self.customers)
+        spent = _group_sum(self.customer_codes, self.amount, size).tolist()
+        counts = _group_count(self.customer_codes, size).tolist()
+        agg.customers = {c: {'total_spent': spent[code], 'purchase_count': counts[code], 'products_bought': set()}
+                         for code, c in groups(self.customer_codes, self.customers)}
+        product_size = max(len(self.products), 1)
+        pairs, _ = _distinct_per_group(self.customer_codes, self.product_codes, product_size, size)
+        for c, p in zip((pairs // product_size).tolist(), (pairs % product_size).tolist()):
+            agg.customers[self.customers[c]]['products_bought'].add(self.products[p])
+
+        size = len(self.dates)
+        revenue = _group_sum(self.date_codes, self.amount, size).tolist()
+        counts = _group_count(self.date_codes, size).tolist()
+        agg.daily = {d: {'revenue': revenue[code], 'transaction_count': counts[code], 'unique_customers': set()}
+                     for code, d in groups(self.date_codes, self.dates)}
+        customer_size = max(len(self.customers), 1)
+        pairs, _ = _distinct_per_group(self.date_codes, self.customer_codes, customer_size, size)
+        for d, c in zip((pairs // customer_size).tolist(), (pairs % customer_size).tolist()):
+            agg.daily[self.dates[d]]['unique_customers'].add(self.customers[c])
+        return agg
+
+
+def _group_sum(codes, weights, size):
+    return np.bincount(codes, weights=weights, minlength=size)
+
+
+def _group_count(codes, size):
+    return np.bincount(codes, minlength=size)
+
+
+def _present(codes, size):
+    # Codes occurring in these rows, ordered by their first row (a filtered store
+    # keeps the full category lists)
+    first = np.full(size, len(codes), dtype=np.int64)
+    np.minimum.at(first, codes, np.arange(len(codes), dtype=np.int64))
+    present = np.flatnonzero(first < len(codes))
+    return present[np.argsort(first[present], kind='stable')]
+
+
+# Largest (group, member) code space marked in a bitmap; beyond it pairs are sorted
+DENSE_PAIR_LIMIT = 1 << 26
+
+
+def _distinct_per_group(group_codes, member_codes, member_size, group_size):
+    """
+    Returns the sorted unique (group, member) pair codes and the distinct member count per group
+    """
+    pairs = group_codes.astype(np.int64) * member_size + member_codes
+    if group_size * member_size <= DENSE_PAIR_LIMIT:
+        seen = np.zeros(group_size * member_size, dtype=bool)
+        seen[pairs] = True
+        pairs = np.flatnonzero(seen)
+    else:
+        pairs = np.unique(pairs)
+    return pairs, np.bincount(pairs // member_size, minlength=group_size)
+
+
+def _descending(values, present):
+    # Stable over first-row order, so ties keep first-seen order exactly like sorted(..., reverse=True)
+    return present[np.argsort(-values[present], kind='stable')]
+
+
+# ---------------- Vectorized analytics ----------------
+def calculate_total_revenue(store):
+    # cumsum adds sequentially, matching the dict-based running total bit for bit
+    return float(np.cumsum(store.amount)[-1]) if len(store) else 0
+
+
+def region_wise_sales(store):
+    size = len(store.regions)
+    sales = _group_sum(store.region_codes, store.amount, size)
+    counts = _group_count(store.region_codes, size)
+    total_revenue = calculate_total_revenue(store)
+
+    region_stats = {}
+    for code in _descending(sales, _present(store.region_codes, size)).tolist():
+        region_stats[store.regions[code]] = {
+            'total_sales': float(sales[code]),
+            'transaction_count': int(counts[code]),
+            'percentage': round(float(sales[code]) / total_revenue * 100, 2)
+        }
+    return region_stats
+
+
+def top_selling_products(store, n=5):
+    size = len(store.products)
+    quantities = np.bincount(store.product_codes, weights=store.quantity, minlength=size).astype(np.int64)
+    revenues = _group_sum(store.product_codes, store.amount, size)
+
+    return [(store.products[code], int(quantities[code]), float(revenues[code]))
+            for code in _descending(quantities, _present(store.product_codes, size))[:n].tolist()]
+
+
+def customer_analysis(store):
+    size = len(store.customers)
+    spent = _group_sum(store.customer_codes, store.amount, size)
+    counts = _group_count(store.customer_codes, size)
+
+    product_size = max(len(store.products), 1)
+    pairs, _ = _distinct_per_group(store.customer_codes, store.product_codes, product_size, size)
+    bounds = np.searchsorted(pairs // product_size, np.arange(size + 1)).tolist()
+    product_codes = (pairs % product_size).tolist()
+
+    customer_stats = {}
+    for code in _descending(spent, _present(store.customer_codes, size)).tolist():
+        total_spent = float(spent[code])
+        purchase_count = int(counts[code])
+        start, end = bounds[code], bounds[code + 1]
+        customer_stats[store.customers[code]] = {
+            'total_spent': total_spent,
+            'purchase_count': purchase_count,
+            'products_bought': [store.products[p] for p in product_codes[start:end]],
+            'unique_products': end - start,
+            'avg_order_value': round(total_spent / purchase_count, 2)
+        }
+    return customer_stats
+
+
+def daily_sales_trend(store):
+    size = len(store.dates)
+    revenue = _group_sum(store.date_codes, store.amount, size)
+    counts = _group_count(store.date_codes, size)
+    _, unique_customers = _distinct_per_group(store.date_codes, store.customer_codes,
+                                              max(len(store.customers), 1), size)
+
+    daily_stats = {}
+    for code in sorted(_present(store.date_codes, size).tolist(), key=store.dates.__getitem__):
+        daily_stats[store.dates[code]] = {
+            'revenue': float(revenue[code]),
+            'transaction_count': int(counts[code]),
+            'unique_customers': int(unique_customers[code])
+        }
+    return daily_stats
@@ -1,270 +1,514 @@
-def parse_transactions(raw_lines):
-    transactions = []
-
-    for line in raw_lines:
-        parts = line.split('|')
-
-        if len(parts) != 8:
-            continue
-
-        try:
-            transaction = {
-                'TransactionID': parts[0].strip(),
-                'Date': parts[1].strip(),
-                'ProductID': parts[2].strip(),
-                'ProductName': parts[3].replace(',', '').strip(),
-                'Quantity': int(parts[4].replace(',', '').strip()),
-                'UnitPrice': float(parts[5].replace(',', '').strip()),
-                'CustomerID': parts[6].strip(),
-                'Region': parts[7].strip()
-            }
-            transactions.append(transaction)
-        except ValueError:
-            continue
-
-    return transactions
-
-
-def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
-    valid_transactions = []
-    invalid_count = 0
-
-    regions = set()
-    amounts = []
+# utils/data_processor.py
 
-    for tx in transactions:
-        if (
-            tx['Quantity'] <= 0 or
-            tx['UnitPrice'] <= 0 or
-            not tx['TransactionID'].startswith('T') or
-            not tx['ProductID'].startswith('P') or
-            not tx['CustomerID'].startswith('C')
-        ):
-            invalid_count += 1
-            continue
+import heapq
 
-        amount = tx['Quantity'] * tx['UnitPrice']
-        tx['Amount'] = amount
+from utils.transaction import Transaction, gc_paused
+from utils.instrumentation import instrumented
+from utils.dedup import ExactDeduplicator, make_deduplicator
+from utils.validation_rules import DEFAULT_RULESET
 
-        regions.add(tx['Region'])
-        amounts.append(amount)
-        valid_transactions.append(tx)
+PRICE_MEMO_SIZE = 1 << 16
 
-    print(f"Available Regions: {', '.join(sorted(regions))}")
-    if amounts:
-        print(f"Transaction Amount Range: {min(amounts)} - {max(amounts)}")
 
-    filtered = []
-    filtered_by_region = 0
-    filtered_by_amount = 0
+def _shared_prices():
+    """
+    Returns a function mapping equal UnitPrice floats to one shared object
+    (prices repeat per product); at most PRICE_MEMO_SIZE distinct values are kept.
+    """
+    prices = {}
 
-    for tx in valid_transactions:
-        if region and tx['Region'] != region:
-            filtered_by_region += 1
-            continue
-        if min_amount and tx['Amount'] < min_amount:
-            filtered_by_amount += 1
-            continue
-        if max_amount and tx['Amount'] > max_amount:
-            filtered_by_amount += 1
-            continue
-        filtered.append(tx)
-
-    summary = {
-        'total_input': len(transactions),
-        'invalid': invalid_count,
-        'filtered_by_region': filtered_by_region,
-        'filtered_by_amount': filtered_by_amount,
-        'final_count': len(filtered)
-    }
+    def share(price):
+        shared = prices.get(price)
+        if shared is not None:
+            return shared
+        if len(prices) < PRICE_MEMO_SIZE:
+            prices[price] = price
+        return price
+    return share
 
-    return filtered, invalid_count, summary
-# utils/data_processor.py
 
 # ---------------- Part 1 ----------------
-def parse_transactions(raw_lines):
-    transactions = []
-
+def iter_transactions(raw_lines, malformed=None, quarantine=None, with_lines=False):
+    """
+    Generator version of parse_transactions.
+    Yields one Transaction per well-formed line; malformed lines are skipped
+    and, if a `malformed` dict is given, counted in it by reason. A
+    QuarantineWriter passed as `quarantine` receives the skipped lines.
+    With with_lines=True yields (Transaction, raw line) pairs instead, for
+    iter_valid_transactions(..., with_lines=True) to quarantine the lines the
+    rules reject as they were read.
+    """
+    if malformed is None:
+        malformed = {}
+    share_price = _shared_prices()
     for line in raw_lines:
         parts = line.split('|')
 
         if len(parts) != 8:
+            malformed['field_count'] = malformed.get('field_count', 0) + 1
+            if quarantine is not None:
+                quarantine.write('field_count', line)
             continue
 
         try:
-            transaction = {
-                'TransactionID': parts[0].strip(),
-                'Date': parts[1].strip(),
-                'ProductID': parts[2].strip(),
-                'ProductName': parts[3].replace(',', '').strip(),
-                'Quantity': int(parts[4].replace(',', '').strip()),
-                'UnitPrice': float(parts[5].replace(',', '').strip()),
-                'CustomerID': parts[6].strip(),
-                'Region': parts[7].strip()
-            }
-            transactions.append(transaction)
+            tx = Transaction(
+                parts[0].strip(),
+                parts[1].strip(),
+                parts[2].strip(),
+                parts[3].replace(',', '').strip(),
+                int(parts[4].replace(',', '').strip()),
+                share_price(float(parts[5].replace(',', '').strip())),
+                parts[6].strip(),
+                parts[7].strip()
+            )
         except ValueError:
+            malformed['number_format'] = malformed.get('number_format', 0) + 1
+            if quarantine is not None:
+                quarantine.write('number_format', line)
+            continue
+        if with_lines:
+            yield tx, line
+        else:
+            yield tx
+
+
+def _reject_record(reason, parts, malformed, quarantine):
+    malformed[reason] = malformed.get(reason, 0) + 1
+    if quarantine is not None:
+        quarantine.write(reason, '|'.join(parts))
+
+
+def iter_record_transactions(records, malformed=None, quarantine=None):
+    """
+    Like iter_transactions, for records already split and cleaned by
+    file_handler.iter_sales_records (numeric fields arrive comma-free).
+    Malformed records are counted in `malformed` and written to `quarantine`
+    re-joined with '|' (cleaned fields for records that split into 8).
+    """
+    if malformed is None:
+        malformed = {}
+    share_price = _shared_prices()
+    for parts in records:
+        if len(parts) != 8:
+            _reject_record('field_count', parts, malformed, quarantine)
             continue
 
-    return transactions
+        try:
+            yield Transaction(parts[0], parts[1], parts[2], parts[3],
+                              int(parts[4]), share_price(float(parts[5])), parts[6], parts[7])
+        except ValueError:
+            _reject_record('number_format', parts, malformed, quarantine)
+            continue
 
 
-def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
-    valid_transactions = []
-    invalid_count = 0
+@instrumented
+def parse_transactions(raw_lines):
+    with gc_paused():
+        return list(iter_transactions(raw_lines))
+
+
+def empty_summary():
+    """
+    Returns a fresh validation summary as filled in by iter_valid_transactions
+    """
+    return {
+        'total_input': 0,
+        'invalid': 0,
+        'duplicates_removed': 0,
+        'filtered_by_region': 0,
+        'filtered_by_amount': 0,
+        'final_count': 0,
+        'invalid_reasons': {},
+        'rule_failures': {},
+        'malformed': {},
+        'regions': set(),
+        'amount_range': None
+    }
+
 
-    regions = set()
-    amounts = []
+def iter_valid_transactions(transactions, summary=None, region=None, min_amount=None, max_amount=None,
+                           cube=None, dedup=None, rules=None, quarantine=None, with_lines=False):
+    """
+    Generator version of validate_and_filter.
+    Yields valid transactions that pass the filters, one at a time.
+    Counters are accumulated into `summary` while the stream is consumed, together with
+    the available regions and the [min, max] amount range of all valid transactions.
+    Validity is decided by `rules` (a validation_rules.RuleSet, default: positive
+    Quantity/UnitPrice and T/P/C ID prefixes). invalid_reasons breaks the invalid
+    count down by the first failed rule, rule_failures counts every failed rule;
+    the caller may record parser rejects (see iter_transactions) under malformed.
+    Invalid transactions are written to `quarantine` (a QuarantineWriter) if given:
+    their raw line with with_lines=True, where `transactions` yields the
+    (Transaction, raw line) pairs of iter_transactions(..., with_lines=True),
+    otherwise their fields joined with '|'.
+    `region` may be a single Region name or a collection of names.
+    A SalesCube passed as `cube` receives every valid transaction, before filtering.
+    With a deduplicator (see utils.dedup) as `dedup`, a valid transaction whose
+    TransactionID was already seen is dropped and counted in duplicates_removed.
+    """
+    if summary is None:
+        summary = {}
+    if isinstance(region, str):
+        region = {region}
+    summary.update(empty_summary())
+    regions = summary['regions']
+    reasons = summary['invalid_reasons']
+    rule_failures = summary['rule_failures']
+    if rules is None:
+        rules = DEFAULT_RULESET
+    check_record, check_mapping = rules.check_record, rules.check_mapping
+    # The exact mode's set is used inline; a method call per row costs as much as the check
+    seen_ids = dedup.ids if isinstance(dedup, ExactDeduplicator) else None
+    line = None
 
     for tx in transactions:
-        if (
-            tx['Quantity'] <= 0 or
-            tx['UnitPrice'] <= 0 or
-            not tx['TransactionID'].startswith('T') or
-            not tx['ProductID'].startswith('P') or
-            not tx['CustomerID'].startswith('C')
-        ):
-            invalid_count += 1
+        if with_lines:
+            tx, line = tx
+        summary['total_input'] += 1
+        if not (check_record(tx) if tx.__class__ is Transaction else check_mapping(tx)):
+            summary['invalid'] += 1
+            failed = rules.failures(tx)
+            reasons[failed[0]] = reasons.get(failed[0], 0) + 1
+            for name in failed:
+                rule_failures[name] = rule_failures.get(name, 0) + 1
+            if quarantine is not None:
+                quarantine.write_transaction(failed[0], tx, line)
+            continue
+        if seen_ids is not None:
+            n = len(seen_ids)
+            seen_ids.add(tx['TransactionID'])
+            if len(seen_ids) == n:
+                summary['duplicates_removed'] += 1
+                continue
+        elif dedup is not None and dedup.seen(tx['TransactionID']):
+            summary['duplicates_removed'] += 1
             continue
 
         amount = tx['Quantity'] * tx['UnitPrice']
         tx['Amount'] = amount
+        if cube is not None:
+            cube.add(tx)
 
         regions.add(tx['Region'])
-        amounts.append(amount)
-        valid_transactions.append(tx)
+        amount_range = summary['amount_range']
+        if amount_range is None:
+            summary['amount_range'] = [amount, amount]
+        elif amount < amount_range[0]:
+            amount_range[0] = amount
+        elif amount > amount_range[1]:
+            amount_range[1] = amount
+
+        if region and tx['Region'] not in region:
+            summary['filtered_by_region'] += 1
+            continue
+        if min_amount and amount < min_amount:
+            summary['filtered_by_amount'] += 1
+            continue
+        if max_amount and amount > max_amount:
+            summary['filtered_by_amount'] += 1
+            continue
 
+        summary['final_count'] += 1
+        yield tx
+
+
+def merge_summary(total, partial):
+    """
+    Adds the counters of one iter_valid_transactions summary into another
+    """
+    for key in ('total_input', 'invalid', 'filtered_by_region', 'filtered_by_amount', 'final_count'):
+        total[key] += partial[key]
+    # Checkpoints written before dedup existed lack the counter
+    total['duplicates_removed'] = total.get('duplicates_removed', 0) + partial.get('duplicates_removed', 0)
+    total['regions'] |= partial['regions']
+    for key in ('invalid_reasons', 'rule_failures', 'malformed'):
+        counts = total.setdefault(key, {})  # Checkpoints written before these counters existed
+        for reason, count in partial.get(key, {}).items():
+            counts[reason] = counts.get(reason, 0) + count
+
+    if partial['amount_range'] is not None:
+        if total['amount_range'] is None:
+            total['amount_range'] = list(partial['amount_range'])
+        else:
+            total['amount_range'][0] = min(total['amount_range'][0], partial['amount_range'][0])
+            total['amount_range'][1] = max(total['amount_range'][1], partial['amount_range'][1])
+    return total
+
+
+@instrumented
+def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None, cube=None, dedup=None,
+                        rules=None, quarantine=None, with_lines=False):
+    """
+    Duplicate TransactionIDs are removed with a fresh ExactDeduplicator unless another
+    deduplicator is passed as `dedup`; pass dedup=False to keep duplicates.
+    `rules`, `quarantine` and `with_lines` are passed on to iter_valid_transactions.
+    """
+    if dedup is None:
+        dedup = ExactDeduplicator()
+    summary = {}
+    with gc_paused():
+        filtered = list(iter_valid_transactions(transactions, summary, region, min_amount, max_amount, cube,
+                                                dedup if dedup is not False else None, rules, quarantine,
+                                                with_lines))
+
+    regions = summary.pop('regions')
+    amount_range = summary.pop('amount_range')
     print(f"Available Regions: {', '.join(sorted(regions))}")
-    if amounts:
-        print(f"Transaction Amount Range: {min(amounts)} - {max(amounts)}")
+    if amount_range:
+        print(f"Transaction Amount Range: {amount_range[0]} - {amount_range[1]}")
+
+    return filtered, summary['invalid'], summary
+
+
+class ValidTransactions:
+    """
+    Re-iterable stream of the valid transactions of a source, used in place of a
+    list: every iteration parses and validates the source again with a fresh
+    deduplicator, so later passes (filtering, enrichment) see the same rows
+    without any of them being held in memory. `source` is a function returning a
+    new iterable of Transactions; `dedup` is a utils.dedup mode and the other
+    options are those of iter_valid_transactions. `summary` holds the counters of
+    the last completed pass.
+    """
+
+    def __init__(self, source, region=None, min_amount=None, max_amount=None, dedup='exact', rules=None):
+        self.source = source
+        self.region = region
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.dedup = dedup
+        self.rules = rules
+        self.summary = empty_summary()
+
+    def filter(self, region=None, min_amount=None, max_amount=None):
+        """
+        Returns: ValidTransactions over the same source with these filters
+        """
+        return ValidTransactions(self.source, region, min_amount, max_amount, self.dedup, self.rules)
+
+    def __iter__(self):
+        dedup = make_deduplicator(self.dedup)
+        summary = {}
+        try:
+            yield from iter_valid_transactions(self.source(), summary, self.region, self.min_amount,
+                                               self.max_amount, dedup=dedup, rules=self.rules)
+        finally:
+            if dedup is not None:
+                dedup.close()
+        self.summary = summary
+
+# ---------------- Fused aggregation ----------------
+class SalesAggregator:
+    """
+    Single-pass aggregation engine behind the Part 2 analytics.
+    Each transaction is visited once and its amount computed once, filling the
+    region, product, customer and daily groupings together. The analytics functions
+    below accept an aggregator in place of a list of transactions.
+    """
+
+    def __init__(self):
+        self.row_count = 0
+        self.total_revenue = 0
+        self.regions = {}
+        self.products = {}
+        self.customers = {}
+        self.daily = {}
+
+    def add(self, tx):
+        amt = tx['Quantity'] * tx['UnitPrice']
+        self.row_count += 1
+        self.total_revenue += amt
 
-    filtered = []
-    filtered_by_region = 0
-    filtered_by_amount = 0
+        r = tx['Region']
+        if r not in self.regions:
+            self.regions[r] = {'total_sales': 0.0, 'transaction_count': 0}
+        region = self.regions[r]
+        region['total_sales'] += amt
+        region['transaction_count'] += 1
 
-    for tx in valid_transactions:
-        if region and tx['Region'] != region:
-            filtered_by_region += 1
-            continue
-        if min_amount and tx['Amount'] < min_amount:
-            filtered_by_amount += 1
-            continue
-        if max_amount and tx['Amount'] > max_amount:
-            filtered_by_amount += 1
-            continue
-        filtered.append(tx)
-
-    summary = {
-        'total_input': len(transactions),
-        'invalid': invalid_count,
-        'filtered_by_region': filtered_by_region,
-        'filtered_by_amount': filtered_by_amount,
-        'final_count': len(filtered)
-    }
+        p = tx['ProductName']
+        if p not in self.products:
+            self.products[p] = {'total_quantity': 0, 'total_revenue': 0.0}
+        product = self.products[p]
+        product['total_quantity'] += tx['Quantity']
+        product['total_revenue'] += amt
+
+        c = tx['CustomerID']
+        if c not in self.customers:
+            self.customers[c] = {'total_spent': 0.0, 'purchase_count': 0, 'products_bought': set()}
+        customer = self.customers[c]
+        customer['total_spent'] += amt
+        customer['purchase_count'] += 1
+        customer['products_bought'].add(p)
+
+        d = tx['Date']
+        if d not in self.daily:
+            self.daily[d] = {'revenue': 0.0, 'transaction_count': 0, 'unique_customers': set()}
+        day = self.daily[d]
+        day['revenue'] += amt
+        day['transaction_count'] += 1
+        day['unique_customers'].add(c)
+
+    def update(self, transactions):
+        for tx in transactions:
+            self.add(tx)
+        return self
+
+    def merge(self, other):
+        """
+        Folds another aggregator's partial results into this one (map-reduce combine step)
+        """
+        self.row_count += other.row_count
+        self.total_revenue += other.total_revenue
+
+        for r, stats in other.regions.items():
+            if r not in self.regions:
+                self.regions[r] = {'total_sales': 0.0, 'transaction_count': 0}
+            region = self.regions[r]
+            region['total_sales'] += stats['total_sales']
+            region['transaction_count'] += stats['transaction_count']
+
+        for p, stats in other.products.items():
+            if p not in self.products:
+                self.products[p] = {'total_quantity': 0, 'total_revenue': 0.0}
+            product = self.products[p]
+            product['total_quantity'] += stats['total_quantity']
+            product['total_revenue'] += stats['total_revenue']
+
+        for c, stats in other.customers.items():
+            if c not in self.customers:
+                self.customers[c] = {'total_spent': 0.0, 'purchase_count': 0, 'products_bought': set()}
+            customer = self.customers[c]
+            customer['total_spent'] += stats['total_spent']
+            customer['purchase_count'] += stats['purchase_count']
+            customer['products_bought'] |= stats['products_bought']
+
+        for d, stats in other.daily.items():
+            if d not in self.daily:
+                self.daily[d] = {'revenue': 0.0, 'transaction_count': 0, 'unique_customers': set()}
+            day = self.daily[d]
+            day['revenue'] += stats['revenue']
+            day['transaction_count'] += stats['transaction_count']
+            day['unique_customers'] |= stats['unique_customers']
+        return self
+
+    def get_state(self):
+        """
+        Returns the aggregate state as plain JSON-serializable data (sets become lists)
+        """
+        return {
+            'row_count': self.row_count,
+            'total_revenue': self.total_revenue,
+            'regions': self.regions,
+            'products': self.products,
+            'customers': {c: {**stats, 'products_bought': list(stats['products_bought'])}
+                          for c, stats in self.customers.items()},
+            'daily': {d: {**stats, 'unique_customers': list(stats['unique_customers'])}
+                      for d, stats in self.daily.items()}
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        agg = cls()
+        agg.row_count = state['row_count']
+        agg.total_revenue = state['total_revenue']
+        agg.regions = state['regions']
+        agg.products = state['products']
+        agg.customers = {c: {**stats, 'products_bought': set(stats['products_bought'])}
+                         for c, stats in state['customers'].items()}
+        agg.daily = {d: {**stats, 'unique_customers': set(stats['unique_customers'])}
+                     for d, stats in state['daily'].items()}
+        return agg
+
+
+@instrumented
+def aggregate_sales(transactions):
+    """
+    Returns a SalesAggregator over the transactions (or the aggregator itself if one is passed)
+    """
+    if isinstance(transactions, SalesAggregator):
+        return transactions
+    return SalesAggregator().update(transactions)
 
-    return filtered, invalid_count, summary
 
 # ---------------- Part 2 ----------------
+@instrumented
 def calculate_total_revenue(transactions):
-    return sum(tx['Quantity'] * tx['UnitPrice'] for tx in transactions)
+    return aggregate_sales(transactions).total_revenue
 
 
+@instrumented
 def region_wise_sales(transactions):
+    agg = aggregate_sales(transactions)
     region_stats = {}
-    total_revenue = calculate_total_revenue(transactions)
-
-    for tx in transactions:
-        r = tx['Region']
-        amt = tx['Quantity'] * tx['UnitPrice']
-        if r not in region_stats:
-            region_stats[r] = {'total_sales': 0.0, 'transaction_count': 0}
-        region_stats[r]['total_sales'] += amt
-        region_stats[r]['transaction_count'] += 1
 
-    for r in region_stats:
-        region_stats[r]['percentage'] = round(region_stats[r]['total_sales'] / total_revenue * 100, 2)
+    for r, stats in agg.regions.items():
+        region_stats[r] = {
+            'total_sales': stats['total_sales'],
+            'transaction_count': stats['transaction_count'],
+            'percentage': round(stats['total_sales'] / agg.total_revenue * 100, 2)
+        }
 
     region_stats = dict(sorted(region_stats.items(), key=lambda x: x[1]['total_sales'], reverse=True))
     return region_stats
 
 
+@instrumented
 def top_selling_products(transactions, n=5):
-    product_stats = {}
-    for tx in transactions:
-        p = tx['ProductName']
-        qty = tx['Quantity']
-        amt = tx['Quantity'] * tx['UnitPrice']
-        if p not in product_stats:
-            product_stats[p] = {'total_quantity': 0, 'total_revenue': 0.0}
-        product_stats[p]['total_quantity'] += qty
-        product_stats[p]['total_revenue'] += amt
+    product_stats = aggregate_sales(transactions).products
 
-    products = [(p, product_stats[p]['total_quantity'], product_stats[p]['total_revenue']) for p in product_stats]
-    products.sort(key=lambda x: x[1], reverse=True)
-    return products[:n]
+    products = ((p, product_stats[p]['total_quantity'], product_stats[p]['total_revenue']) for p in product_stats)
+    # O(groups * log n) heap selection; same order as a stable descending sort
+    return heapq.nlargest(n, products, key=lambda x: x[1])
 
 
+@instrumented
 def customer_analysis(transactions):
     customer_stats = {}
-    for tx in transactions:
-        c = tx['CustomerID']
-        amt = tx['Quantity'] * tx['UnitPrice']
-        p = tx['ProductName']
-        if c not in customer_stats:
-            customer_stats[c] = {'total_spent': 0.0, 'purchase_count': 0, 'products_bought': set()}
-        customer_stats[c]['total_spent'] += amt
-        customer_stats[c]['purchase_count'] += 1
-        customer_stats[c]['products_bought'].add(p)
-
-    for c in customer_stats:
-        stats = customer_stats[c]
-        stats['avg_order_value'] = round(stats['total_spent'] / stats['purchase_count'], 2)
-        stats['products_bought'] = list(stats['products_bought'])
+    for c, stats in aggregate_sales(transactions).customers.items():
+        products = stats['products_bought']
+        customer_stats[c] = {
+            'total_spent': stats['total_spent'],
+            'purchase_count': stats['purchase_count'],
+            # Approximate mode only estimates how many (HyperLogLog), so there is no list of names
+            'products_bought': list(products) if isinstance(products, set) else None,
+            'unique_products': len(products),
+            'avg_order_value': round(stats['total_spent'] / stats['purchase_count'], 2)
+        }
 
     customer_stats = dict(sorted(customer_stats.items(), key=lambda x: x[1]['total_spent'], reverse=True))
     return customer_stats
 
 
+@instrumented
 def daily_sales_trend(transactions):
     daily_stats = {}
-    for tx in transactions:
-        d = tx['Date']
-        amt = tx['Quantity'] * tx['UnitPrice']
-        cust = tx['CustomerID']
-        if d not in daily_stats:
-            daily_stats[d] = {'revenue': 0.0, 'transaction_count': 0, 'unique_customers': set()}
-        daily_stats[d]['revenue'] += amt
-        daily_stats[d]['transaction_count'] += 1
-        daily_stats[d]['unique_customers'].add(cust)
-
-    for d in daily_stats:
-        daily_stats[d]['unique_customers'] = len(daily_stats[d]['unique_customers'])
+    for d, stats in aggregate_sales(transactions).daily.items():
+        daily_stats[d] = {
+            'revenue': stats['revenue'],
+            'transaction_count': stats['transaction_count'],
+            'unique_customers': len(stats['unique_customers'])
+        }
 
     return dict(sorted(daily_stats.items()))
 
 
+@instrumented
 def find_peak_sales_day(transactions):
-    daily_stats = daily_sales_trend(transactions)
-    peak_day = max(daily_stats.items(), key=lambda x: x[1]['revenue'])
-    date = peak_day[0]
-    revenue = peak_day[1]['revenue']
-    transaction_count = peak_day[1]['transaction_count']
+    # Scans the daily groups directly; building daily_sales_trend would also count
+    # unique customers and sort. Ties go to the earliest date, as in date order.
+    daily = aggregate_sales(transactions).daily
+    date = min(daily, key=lambda d: (-daily[d]['revenue'], d))
+    revenue = daily[date]['revenue']
+    transaction_count = daily[date]['transaction_count']
     return date, revenue, transaction_count
 
 
+@instrumented
 def low_performing_products(transactions, threshold=10):
-    product_stats = {}
-    for tx in transactions:
-        p = tx['ProductName']
-        qty = tx['Quantity']
-        amt = qty * tx['UnitPrice']
-        if p not in product_stats:
-            product_stats[p] = {'total_quantity': 0, 'total_revenue': 0.0}
-        product_stats[p]['total_quantity'] += qty
-        product_stats[p]['total_revenue'] += amt
+    product_stats = aggregate_sales(transactions).products
 
     low_products = [(p, product_stats[p]['total_quantity'], product_stats[p]['total_revenue'])
                     for p in product_stats if product_stats[p]['total_quantity'] < threshold]
     low_products.sort(key=lambda x: x[1])
     return low_products
-
@@ -0,0 +1,250 @@
+# utils/dedup.py
+
+import os
+import json
+import math
+import struct
+import sqlite3
+import hashlib
+import tempfile
+
+SQLITE_BATCH = 10_000  # IDs buffered in memory before they are written to the confirmation table
+
+
+# ---------------- Exact mode ----------------
+class ExactDeduplicator:
+    """
+    Remembers every TransactionID in a hash set. Exact and fastest, but memory
+    grows with the number of distinct IDs (see benchmarks/bench_dedup.py).
+    """
+
+    def __init__(self, ids=()):
+        self.ids = set(ids)
+
+    def seen(self, transaction_id):
+        """
+        Returns: True if the ID was seen before; otherwise records it and returns False
+        (iter_valid_transactions uses `ids` directly, without this call)
+        """
+        if transaction_id in self.ids:
+            return True
+        self.ids.add(transaction_id)
+        return False
+
+    @property
+    def stats(self):
+        return {'ids': len(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def save(self, tag=None):
+        pass
+
+    def close(self):
+        pass
+
+
+# ---------------- Bloom filter ----------------
+class BloomFilter:
+    """
+    Set membership in a fixed bit array: no false negatives, and false positives
+    at about `error_rate` while at most `capacity` items were added.
+    """
+
+    def __init__(self, capacity=10_000_000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing (h1 + i * h2) from one 128-bit digest, reduced first so the
+        # arithmetic stays on small ints
+        size = self.size
+        h1, h2 = struct.unpack('<QQ', hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest())
+        h1 %= size
+        h2 = h2 % size or 1
+        return [pos % size for pos in range(h1, h1 + self.hashes * h2, h2)]
+
+    def add(self, item):
+        """
+        Returns: True if the item was (probably) present already, False if it certainly was not
+        """
+        bits = self.bits
+        present = True
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                present = False
+        if not present:
+            self.count += 1
+        return present
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def get_state(self):
+        """
+        Returns: (JSON header, bit array bytes)
+        """
+        header = {'capacity': self.capacity, 'error_rate': self.error_rate, 'count': self.count}
+        return json.dumps(header), bytes(self.bits)
+
+    @classmethod
+    def from_state(cls, header, bits):
+        header = json.loads(header)
+        bloom = cls(header['capacity'], header['error_rate'])
+        if len(bits) != len(bloom.bits):
+            raise ValueError("bloom filter state does not match its header")
+        bloom.bits = bytearray(bits)
+        bloom.count = header['count']
+        return bloom
+
+
+# ---------------- Bounded-memory mode ----------------
+class BloomDeduplicator:
+    """
+    Bloom filter in memory, exact confirmation on disk: every new ID is written to
+    a SQLite table, which is only queried when the filter reports a possible
+    duplicate. Memory stays at ~1.8 bytes per ID of `capacity` (error_rate 0.001)
+    regardless of how many IDs are checked.
+    With `path`, the filter and the ID table persist in that SQLite file across
+    runs. Nothing is committed until save(tag), which stores both in one
+    transaction together with `tag` (e.g. the checkpoint offset they belong to),
+    so a crashed run leaves the previous state intact. Without `path` a temporary
+    file is used and removed on close().
+    """
+
+    def __init__(self, capacity=10_000_000, error_rate=0.001, path=None):
+        self.path = path
+        self.stats = {'checked': 0, 'duplicates': 0, 'bloom_positives': 0, 'false_positives': 0}
+        self._pending = set()
+        self._warned = False
+
+        if path:
+            self._db_path = path
+        else:
+            fd, self._db_path = tempfile.mkstemp(suffix='.sqlite')
+            os.close(fd)
+        self.db = sqlite3.connect(self._db_path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS seen_ids (transaction_id TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS bloom ("
+            " id INTEGER PRIMARY KEY CHECK (id = 0),"
+            " header TEXT NOT NULL,"
+            " bits BLOB NOT NULL,"
+            " tag TEXT)"
+        )
+        self.db.commit()
+
+        self.tag = None
+        self.bloom = None
+        row = self.db.execute("SELECT header, bits, tag FROM bloom WHERE id = 0").fetchone()
+        if row is not None:
+            try:
+                self.bloom = BloomFilter.from_state(row[0], row[1])
+                self.tag = row[2]
+            except ValueError as e:
+                print(f"Warning: Resetting unreadable dedup state {path}: {e}")
+                self.reset()
+        if self.bloom is None:
+            self.bloom = BloomFilter(capacity, error_rate)
+
+    def reset(self):
+        """
+        Forgets all IDs, e.g. when the data file was rewritten
+        """
+        self._pending.clear()
+        self.db.execute("DELETE FROM seen_ids")
+        self.db.execute("DELETE FROM bloom")
+        self.db.commit()
+        self.bloom = BloomFilter(self.bloom.capacity, self.bloom.error_rate) if self.bloom else None
+        self.tag = None
+
+    def seen(self, transaction_id):
+        """
+        Returns: True if the ID was seen before; otherwise records it and returns False
+        """
+        self.stats['checked'] += 1
+        if not self.bloom.add(transaction_id):
+            self._record(transaction_id)
+            return False
+
+        self.stats['bloom_positives'] += 1
+        if transaction_id in self._pending or self.db.execute(
+                "SELECT 1 FROM seen_ids WHERE transaction_id = ?", (transaction_id,)).fetchone():
+            self.stats['duplicates'] += 1
+            return True
+        self.stats['false_positives'] += 1
+        self.bloom.count += 1
+        self._record(transaction_id)
+        return False
+
+    def _record(self, transaction_id):
+        self._pending.add(transaction_id)
+        if len(self._pending) >= SQLITE_BATCH:
+            self._flush()
+        if not self._warned and self.bloom.count > self.bloom.capacity:
+            print(f"Warning: Dedup filter holds more than {self.bloom.capacity} IDs, "
+                  "false positives (extra disk lookups) will increase")
+            self._warned = True
+
+    def _flush(self):
+        # Inserted inside the open transaction; committed by save()
+        if self._pending:
+            self.db.executemany("INSERT OR IGNORE INTO seen_ids VALUES (?)", ((i,) for i in self._pending))
+            self._pending.clear()
+
+    def __len__(self):
+        return self.bloom.count
+
+    def __iter__(self):
+        """
+        Yields every recorded ID, streamed from the confirmation table
+        """
+        self._flush()
+        for (transaction_id,) in self.db.execute("SELECT transaction_id FROM seen_ids"):
+            yield transaction_id
+
+    def save(self, tag=None):
+        self._flush()
+        header, bits = self.bloom.get_state()
+        self.db.execute("INSERT OR REPLACE INTO bloom VALUES (0, ?, ?, ?)",
+                        (header, bits, None if tag is None else str(tag)))
+        self.db.commit()
+        self.tag = None if tag is None else str(tag)
+
+    def close(self):
+        self.db.close()  # Uncommitted IDs are rolled back
+        if not self.path:
+            os.remove(self._db_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+DEDUP_MODES = ('exact', 'bloom', 'off')
+
+
+def make_deduplicator(mode='exact', path=None, capacity=10_000_000, error_rate=0.001):
+    """
+    Returns: deduplicator for `mode` ('exact', 'bloom' or 'off' -> None)
+    """
+    if mode == 'exact':
+        return ExactDeduplicator()
+    if mode == 'bloom':
+        return BloomDeduplicator(capacity, error_rate, path)
+    if mode == 'off':
+        return None
+    raise ValueError(f"unknown dedup mode {mode!r}")
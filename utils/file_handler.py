@@ -1,29 +1,379 @@
+import os
+import sys
+import mmap
+import json
+import struct
+import hashlib
+from array import array
+from itertools import accumulate
+from operator import attrgetter
+
+from utils.data_processor import iter_record_transactions
+from utils.transaction import Transaction, gc_paused
+
+ENCODINGS = ['utf-8', 'latin-1', 'cp1252']
+
+
+def _decode_line(raw_line):
+    """
+    Decodes one line of bytes, falling back through the supported encodings
+    """
+    for encoding in ENCODINGS:
+        try:
+            return raw_line.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def iter_sales_data(filename, start=0, end=None):
+    """
+    Lazily reads sales data from file one line at a time.
+    Encoding fallback is applied per line, so the file is never held in memory.
+    `start`/`end` restrict reading to the lines beginning inside that byte range
+    (`start` must be a line boundary, see split_line_ranges).
+    Yields: raw lines (strings), skipping the header and empty lines
+    """
+    try:
+        file = open(filename, 'rb')
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        return
+
+    with file:
+        if start == 0:
+            position = len(file.readline())  # Skip header
+        else:
+            file.seek(start)
+            position = start
+
+        while end is None or position < end:
+            raw_line = file.readline()
+            if not raw_line:
+                break
+            position += len(raw_line)
+            line = _decode_line(raw_line)
+            if line is None:
+                print("Error: Unable to read line with supported encodings.")
+                continue
+            line = line.strip()
+            if line:
+                yield line
+
+
+def split_line_ranges(filename, parts):
+    """
+    Splits a file into up to `parts` contiguous byte ranges aligned to newlines.
+    Returns: list of (start, end) tuples covering the whole file
+    """
+    try:
+        size = os.path.getsize(filename)
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        return []
+
+    boundaries = [0]
+    with open(filename, 'rb') as file:
+        for i in range(1, parts):
+            target = max(size * i // parts, boundaries[-1])
+            file.seek(target)
+            if target > 0:
+                file.readline()  # Move to the start of the next line
+            boundary = min(file.tell(), size)
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+    boundaries.append(size)
+
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+def _decode_block(block):
+    """
+    Decodes a block of whole lines as UTF-8 in one call, falling back per line
+    through ENCODINGS (as iter_sales_data does) only if that fails
+    """
+    try:
+        return block.decode(ENCODINGS[0])
+    except UnicodeDecodeError:
+        return '\n'.join(_decode_line(line) or '' for line in block.split(b'\n'))
+
+
+def iter_sales_records(filename, start=0, end=None, block_size=1 << 22):
+    """
+    Memory-mapped reader that walks the file in newline-aligned blocks of the mapping.
+    Each block is decoded in a single call (falling back per line only for a block
+    that is not valid UTF-8, so lines decode exactly as in iter_sales_data), then
+    split on newlines and '|'. Fields come back stripped and comma-free where the parser
+    needs it. `start`/`end` work as in iter_sales_data.
+    Yields: list of fields per non-empty line (feed to iter_record_transactions)
+    """
+    try:
+        file = open(filename, 'rb')
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        return
+
+    with file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            end = size if end is None else min(end, size)
+            position = start
+            if start == 0:
+                newline = data.find(b'\n')  # Skip header
+                position = size if newline == -1 else newline + 1
+
+            while position < end:
+                # Extend each block to the end of the line it stops in
+                block_end = data.find(b'\n', min(position + block_size, end) - 1)
+                block_end = size if block_end == -1 else block_end + 1
+                text = _decode_block(data[position:block_end])
+                position = block_end
+
+                for line in text.split('\n'):
+                    fields = line.split('|')
+                    if len(fields) != 8:
+                        if line.strip():
+                            yield fields  # Malformed; left for the parser to reject
+                        continue
+
+                    yield [
+                        fields[0].strip(),
+                        fields[1].strip(),
+                        fields[2].strip(),
+                        fields[3].replace(',', '').strip(),
+                        fields[4].replace(',', ''),
+                        fields[5].replace(',', ''),
+                        fields[6].strip(),
+                        fields[7].strip()
+                    ]
+
+
 def read_sales_data(filename):
     """
     Reads sales data from file handling encoding issues
     Returns: list of raw lines (strings)
     """
-    encodings = ['utf-8', 'latin-1', 'cp1252']
-    raw_lines = []
+    return list(iter_sales_data(filename))
+
 
-    for encoding in encodings:
+# ---------------- Binary transaction cache ----------------
+CACHE_MAGIC = b'SALESBC1'
+CACHE_VERSION = 3
+CACHE_BATCH_ROWS = 1 << 16
+TEXT_COLUMNS = ['TransactionID', 'Date', 'ProductID', 'ProductName', 'CustomerID', 'Region']
+# Low-cardinality text columns are stored as int32 codes into a table in the header;
+# TransactionIDs (one per row) as int64 offsets into a packed, newline-terminated string column
+CATEGORY_COLUMNS = TEXT_COLUMNS[1:]
+COLUMN_TYPES = {'Quantity': 'q', 'UnitPrice': 'd', 'TransactionID': 'q', 'TransactionID.data': 'B',
+                **{name: 'i' for name in CATEGORY_COLUMNS}}
+
+
+def cache_path(filename):
+    return filename + '.bincache'
+
+
+def source_fingerprint(filename, chunk_size=1 << 20):
+    """
+    Returns: dict with the path, size, mtime and a BLAKE2 content hash of the source file
+    """
+    stat = os.stat(filename)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return {
+        'path': os.path.abspath(filename),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': digest.hexdigest()
+    }
+
+
+def _source_matches(filename, fingerprint, verify=False):
+    """
+    Path, size and mtime are compared first; the content is only hashed with `verify`
+    """
+    stat = os.stat(filename)
+    if (fingerprint['path'], fingerprint['size'], fingerprint['mtime_ns']) != \
+            (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns):
+        return False
+    return not verify or source_fingerprint(filename) == fingerprint
+
+
+def write_transaction_cache(filename, columns, categories, fingerprint, rejected=()):
+    """
+    Writes parsed transactions as packed columns: int64 Quantity, float64 UnitPrice,
+    int32 dictionary codes for the category columns and the TransactionIDs as a
+    UTF-8 string column (int64 row offsets plus the newline-terminated IDs),
+    behind a JSON header holding the source fingerprint, the category tables,
+    each column's byte offset and the [reason, line] pairs of the malformed
+    lines the parser skipped.
+    """
+    blobs = [(name, columns[name].tobytes()) for name in COLUMN_TYPES]
+
+    layout, offset = {}, 0
+    for name, blob in blobs:
+        layout[name] = [offset, len(blob)]
+        offset += len(blob)
+
+    header = json.dumps({
+        'version': CACHE_VERSION,
+        'byteorder': sys.byteorder,
+        'source': fingerprint,
+        'rows': len(columns['Quantity']),
+        'columns': layout,
+        'categories': {name: list(categories[name]) for name in CATEGORY_COLUMNS},
+        'rejected': list(rejected)
+    }).encode('utf-8')
+    padding = -(len(CACHE_MAGIC) + 8 + len(header)) % 8  # Keep the columns 8-byte aligned
+
+    path = cache_path(filename)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(CACHE_MAGIC)
+        f.write(struct.pack('<Q', len(header) + padding))
+        f.write(header + b' ' * padding)
+        for _, blob in blobs:
+            f.write(blob)
+    os.replace(path + '.tmp', path)
+
+
+def _read_cache_header(data):
+    if data[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+        return None, 0
+    start = len(CACHE_MAGIC) + 8
+    (header_size,) = struct.unpack('<Q', data[len(CACHE_MAGIC):start])
+    return json.loads(bytes(data[start:start + header_size])), start + header_size
+
+
+class CachedTransactions:
+    """
+    The transactions of a binary cache, read in place: the file stays memory-mapped
+    and every iteration decodes CACHE_BATCH_ROWS rows of each column at a time into
+    fresh Transactions, so only the header is read up front and no pass holds
+    more than one batch of rows.
+    """
+
+    def __init__(self, path, header, base):
+        self._file = open(path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._columns = {name: base + offset for name, (offset, _) in header['columns'].items()}
+        self._categories = [header['categories'][name] for name in CATEGORY_COLUMNS]
+        self.rows = header['rows']
+
+    def __len__(self):
+        return self.rows
+
+    def _column(self, name, start, stop):
+        values = array(COLUMN_TYPES[name])
+        offset = self._columns[name] + start * values.itemsize
+        values.frombytes(self._data[offset:offset + (stop - start) * values.itemsize])
+        return values
+
+    def __iter__(self):
+        dates, product_ids, names, customers, regions = self._categories
+        id_data = self._columns['TransactionID.data']
+        for start in range(0, self.rows, CACHE_BATCH_ROWS):
+            stop = min(start + CACHE_BATCH_ROWS, self.rows)
+            bounds = self._column('TransactionID', start, stop + 1)
+            ids = self._data[id_data + bounds[0]:id_data + bounds[-1]].decode('utf-8').split('\n')
+            rows = zip(ids, *(self._column(name, start, stop) for name in
+                              ('Date', 'ProductID', 'ProductName', 'Quantity', 'UnitPrice', 'CustomerID', 'Region')))
+            with gc_paused():
+                batch = [Transaction(t, dates[d], product_ids[p], names[n], quantity, unit_price, customers[c],
+                                     regions[r])
+                         for t, d, p, n, quantity, unit_price, c, r in rows]
+            yield from batch
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+
+def load_transaction_cache(filename, rejected=None, verify=False):
+    """
+    Memory-maps the binary cache of a source file if it is still valid: same
+    format version and byte order, and same path, size and mtime; with `verify`
+    the source content is hashed and compared too.
+    The [reason, line] pairs of its malformed lines are appended to `rejected` if given.
+    Returns: CachedTransactions, or None when the cache is missing or stale
+    """
+    path = cache_path(filename)
+    if not os.path.exists(filename) or not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
         try:
-            with open(filename, 'r', encoding=encoding) as file:
-                lines = file.readlines()
-                break
-        except UnicodeDecodeError:
-            continue
-        except FileNotFoundError:
-            print(f"Error: File '{filename}' not found.")
-            return []
-    else:
-        print("Error: Unable to read file with supported encodings.")
+            header, base = _read_cache_header(data)
+        except (struct.error, ValueError):
+            header = None
+    if (header is None or header.get('version') != CACHE_VERSION
+            or header['byteorder'] != sys.byteorder
+            or not _source_matches(filename, header['source'], verify)):
+        return None
+    if rejected is not None:
+        rejected.extend(header['rejected'])
+    return CachedTransactions(path, header, base)
+
+
+class _RejectedLines(list):
+    """
+    Collects [reason, line] pairs in place of a QuarantineWriter
+    """
+
+    def write(self, reason, line):
+        self.append([reason, line])
+
+
+def load_transactions(filename, malformed=None, quarantine=None, verify=False):
+    """
+    Returns the parsed (not yet validated) transactions of a sales file, served from
+    the binary cache when it matches the source (see load_transaction_cache);
+    otherwise the file is parsed with iter_sales_records and the cache is
+    rewritten. Malformed lines, kept in the cache, are counted by reason in
+    `malformed` and written to `quarantine` (a QuarantineWriter) on every load,
+    like iter_transactions does.
+    Returns: CachedTransactions, or the list of Transactions just parsed
+    """
+    rejected = _RejectedLines()
+    transactions = load_transaction_cache(filename, rejected, verify)
+    if transactions is None:
+        transactions = _parse_and_cache(filename, rejected)
+    for reason, line in rejected:
+        if malformed is not None:
+            malformed[reason] = malformed.get(reason, 0) + 1
+        if quarantine is not None:
+            quarantine.write(reason, line)
+    return transactions
+
+
+def _parse_and_cache(filename, rejected):
+    if not os.path.exists(filename):
+        print(f"Error: File '{filename}' not found.")
         return []
 
-    # Skip header and empty lines
-    for line in lines[1:]:
-        line = line.strip()
-        if line:
-            raw_lines.append(line)
+    fingerprint = source_fingerprint(filename)
+    with gc_paused():
+        transactions = list(iter_record_transactions(iter_sales_records(filename), quarantine=rejected))
+
+    columns = {
+        'Quantity': array('q', [tx.Quantity for tx in transactions]),
+        'UnitPrice': array('d', [tx.UnitPrice for tx in transactions])
+    }
+    ids = [tx.TransactionID.encode('utf-8') + b'\n' for tx in transactions]
+    columns['TransactionID.data'] = array('B', b''.join(ids))
+    columns['TransactionID'] = array('q', accumulate(map(len, ids), initial=0))
+    categories = {}
+    for name in CATEGORY_COLUMNS:
+        values = list(map(attrgetter(name), transactions))
+        categories[name] = list(dict.fromkeys(values))  # Unique values in first-seen order
+        index = {value: code for code, value in enumerate(categories[name])}
+        columns[name] = array('i', map(index.__getitem__, values))
 
-    return raw_lines
+    try:
+        write_transaction_cache(filename, columns, categories, fingerprint, rejected)
+    except OSError as e:
+        print(f"Warning: Could not write cache {cache_path(filename)}: {e}")
+    return transactions
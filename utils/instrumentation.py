@@ -0,0 +1,234 @@
+# utils/instrumentation.py
+
+import os
+import json
+import time
+import cProfile
+import functools
+import itertools
+import threading
+import tracemalloc
+from operator import itemgetter
+from contextlib import contextmanager
+
+# Function name -> {'calls', 'seconds', 'rows'}, filled by @instrumented functions
+FUNCTION_STATS = {}
+# Guards FUNCTION_STATS: the query server runs @instrumented functions on several threads
+_stats_lock = threading.Lock()
+
+# Per-thread depth of @instrumented calls; only the outermost call is recorded
+_calls = threading.local()
+
+
+def _row_count(value):
+    if hasattr(value, 'row_count'):
+        return value.row_count
+    if isinstance(value, (list, tuple)):
+        return len(value)
+    return None
+
+
+def instrumented(func):
+    """
+    Decorator recording call count, cumulative wall time and input rows (length of
+    the first argument, its row_count for aggregators, or the rows consumed from a
+    stream) in FUNCTION_STATS. Calls made from inside another @instrumented call
+    (the Part 2 views calling aggregate_sales) are part of the outer call and are
+    not recorded again.
+    """
+    with _stats_lock:
+        stats = FUNCTION_STATS.setdefault(func.__name__, {'calls': 0, 'seconds': 0.0, 'rows': 0})
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        depth = getattr(_calls, 'depth', 0)
+        if depth:
+            return func(*args, **kwargs)
+
+        consumed = None
+        if args and _row_count(args[0]) is None and hasattr(args[0], '__iter__'):
+            # zip pulls the row before the counter, so the counter's next value is
+            # the number of rows the function consumed; all in C, no per-row Python
+            consumed = itertools.count()
+            args = (map(itemgetter(0), zip(args[0], consumed)),) + args[1:]
+
+        _calls.depth = 1
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _calls.depth = 0
+            seconds = time.perf_counter() - start
+            rows = next(consumed) if consumed is not None else _row_count(args[0]) if args else None
+            with _stats_lock:
+                stats['calls'] += 1
+                stats['seconds'] += seconds
+                if rows:
+                    stats['rows'] += rows
+    return wrapper
+
+
+def snapshot_function_stats():
+    """
+    Returns: a consistent copy of FUNCTION_STATS
+    """
+    with _stats_lock:
+        return {name: dict(stats) for name, stats in FUNCTION_STATS.items()}
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# ---------------- Pipeline metrics ----------------
+class PipelineMetrics:
+    """
+    Per-stage metrics of one pipeline run: wall time, rows, rows/sec, and optionally
+    the peak traced memory above the stage's start (tracemalloc, slows the run down)
+    and a cProfile dump per stage (<profile_dir>/<nn>-<stage>.prof, view with
+    `python -m pstats`).
+    Exported as JSON or Prometheus text together with the @instrumented function
+    stats and the invalid-row reasons.
+    """
+
+    def __init__(self, trace_memory=False, profile_dir=None):
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        self.stages = []
+        self.invalid_reasons = {}
+        self.status = 'running'
+        self.started = time.time()
+        self._functions_at_start = snapshot_function_stats()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the enclosed block; set record['rows'] inside it to get rows/sec
+        """
+        record = {'stage': name, 'status': None, 'seconds': None, 'rows': None,
+                  'rows_per_second': None, 'peak_bytes': None}
+        self.stages.append(record)
+
+        baseline = 0
+        if self.trace_memory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+            else:
+                tracemalloc.start()
+        profiler = cProfile.Profile() if self.profile_dir else None
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        record['status'] = 'failed'  # Until the block and the bookkeeping below complete
+        try:
+            yield record
+        finally:
+            if profiler:
+                profiler.disable()
+            record['seconds'] = round(time.perf_counter() - start, 6)
+            if record['rows'] is not None and record['seconds'] > 0:
+                record['rows_per_second'] = round(record['rows'] / record['seconds'], 1)
+            if self.trace_memory:
+                # Growth over what earlier stages still hold, so each stage shows its own peak
+                record['peak_bytes'] = tracemalloc.get_traced_memory()[1] - baseline
+            if profiler:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(self.profile_dir, f"{len(self.stages):02d}-{name}.prof"))
+        record['status'] = 'ok'
+
+    def failed_stage(self):
+        """
+        Returns: name of the stage that raised, or None
+        """
+        for record in self.stages:
+            if record['status'] != 'ok':
+                return record['stage']
+        return None
+
+    def add_reasons(self, counts, prefix=''):
+        for reason, count in counts.items():
+            key = prefix + reason
+            self.invalid_reasons[key] = self.invalid_reasons.get(key, 0) + count
+
+    def functions(self):
+        """
+        Returns: FUNCTION_STATS accumulated since this run started
+        """
+        result = {}
+        for name, stats in snapshot_function_stats().items():
+            before = self._functions_at_start.get(name, {'calls': 0, 'seconds': 0.0, 'rows': 0})
+            if stats['calls'] > before['calls']:
+                result[name] = {
+                    'calls': stats['calls'] - before['calls'],
+                    'seconds': round(stats['seconds'] - before['seconds'], 6),
+                    'rows': stats['rows'] - before['rows']
+                }
+        return result
+
+    # ---------------- Export ----------------
+    def to_dict(self):
+        return {
+            'status': self.status,
+            'started': self.started,
+            'total_seconds': round(sum(s['seconds'] or 0 for s in self.stages), 6),
+            'stages': self.stages,
+            'functions': self.functions(),
+            'invalid_reasons': self.invalid_reasons
+        }
+
+    def to_prometheus(self):
+        """
+        Returns: metrics in the Prometheus text exposition format
+        """
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_label(val)}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        stages = [s for s in self.stages if s['seconds'] is not None]
+        metric('sales_pipeline_success', 'gauge', "1 if the last run completed, 0 if it failed",
+               [({}, int(self.status == 'ok'))])
+        metric('sales_pipeline_duration_seconds', 'gauge', "Wall time of the whole run",
+               [({}, self.to_dict()['total_seconds'])])
+        metric('sales_pipeline_stage_duration_seconds', 'gauge', "Wall time per pipeline stage",
+               [({'stage': s['stage']}, s['seconds']) for s in stages])
+        metric('sales_pipeline_stage_rows', 'gauge', "Rows handled per pipeline stage",
+               [({'stage': s['stage']}, s['rows']) for s in stages if s['rows'] is not None])
+        metric('sales_pipeline_stage_rows_per_second', 'gauge', "Throughput per pipeline stage",
+               [({'stage': s['stage']}, s['rows_per_second']) for s in stages if s['rows_per_second'] is not None])
+        metric('sales_pipeline_stage_peak_bytes', 'gauge', "Peak traced memory per pipeline stage",
+               [({'stage': s['stage']}, s['peak_bytes']) for s in stages if s['peak_bytes'] is not None])
+        functions = self.functions()
+        metric('sales_pipeline_function_calls_total', 'counter', "Calls per instrumented function",
+               [({'function': name}, f['calls']) for name, f in functions.items()])
+        metric('sales_pipeline_function_seconds_total', 'counter', "Cumulative wall time per instrumented function",
+               [({'function': name}, f['seconds']) for name, f in functions.items()])
+        metric('sales_pipeline_invalid_rows_total', 'counter', "Rejected rows by reason",
+               [({'reason': reason}, count) for reason, count in self.invalid_reasons.items()])
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Writes Prometheus text for *.prom paths, JSON otherwise
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.prom'):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+
+    def summary_lines(self):
+        lines = [f"{'Stage':<16} {'Seconds':>9} {'Rows':>10} {'Rows/s':>12} {'Peak MB':>9}"]
+        for s in self.stages:
+            lines.append(
+                f"{s['stage']:<16} {s['seconds'] if s['seconds'] is not None else 0:>9.4f} "
+                f"{s['rows'] if s['rows'] is not None else '-':>10} "
+                f"{s['rows_per_second'] if s['rows_per_second'] is not None else '-':>12} "
+                + (f"{s['peak_bytes'] / 1e6:>9.2f}" if s['peak_bytes'] is not None else f"{'-':>9}")
+            )
+        return lines
@@ -0,0 +1,408 @@
+# utils/parallel.py
+
+import os
+import zlib
+import shutil
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.file_handler import iter_sales_data, split_line_ranges
+from utils.data_processor import iter_transactions, iter_valid_transactions, empty_summary, merge_summary
+from utils.sketches import make_aggregator
+from utils.dedup import ExactDeduplicator, make_deduplicator
+from utils.validation_rules import RuleSet, QuarantineWriter
+from utils.product_index import ProductIndex
+from utils.api_handler import (
+    iter_enrich_sales_data,
+    empty_enrichment_summary,
+    merge_enrichment_summary,
+    write_enriched_part,
+    join_enriched_parts
+)
+
+_RULESETS = {}  # Compiled once per worker process, keyed by fingerprint
+_PRODUCT_INDEX = None  # Built once per worker process by _init_products
+BUCKET_BYTES = 64 << 20  # Source bytes per ID bucket checked for cross-range repeats (~1M IDs)
+ID_WRITE_BATCH = 10_000
+
+
+def _ruleset(specs):
+    if specs is None:
+        return None
+    rules = RuleSet(specs)
+    return _RULESETS.setdefault(rules.fingerprint(), rules)
+
+
+def _range_deduplicator(dedup, start, end, seen_ids=()):
+    """
+    Deduplicator for one byte range, holding `seen_ids` (IDs kept by earlier ranges) from the start
+    """
+    if dedup == 'exact':
+        return ExactDeduplicator(seen_ids)
+    if dedup != 'bloom':
+        return make_deduplicator(dedup)
+    # A Bloom filter sized for its range (at most one ID per 20 bytes) instead of the default 10M IDs
+    deduplicator = make_deduplicator('bloom', capacity=max(1024, (end - start) // 20 + len(seen_ids)))
+    for transaction_id in seen_ids:
+        deduplicator.seen(transaction_id)
+    return deduplicator
+
+
+def _init_products(products, fuzzy, fuzzy_threshold):
+    global _PRODUCT_INDEX
+    _PRODUCT_INDEX = ProductIndex(products, fuzzy, fuzzy_threshold)
+
+
+# ---------------- Cross-range dedup ----------------
+def _id_path(directory, index, bucket):
+    return os.path.join(directory, f"{index}.{bucket}.ids")
+
+
+def _export_ids(deduplicator, directory, index, buckets):
+    """
+    Writes the IDs a range kept to one file per bucket (CRC32 of the ID), so
+    each bucket can be checked across all ranges on its own
+    """
+    pending = [[] for _ in range(buckets)]
+
+    def flush(bucket):
+        with open(_id_path(directory, index, bucket), 'a', encoding='utf-8', newline='\n') as f:
+            f.write(''.join(transaction_id + '\n' for transaction_id in pending[bucket]))
+        pending[bucket].clear()
+
+    for transaction_id in deduplicator:
+        bucket = zlib.crc32(transaction_id.encode('utf-8')) % buckets
+        pending[bucket].append(transaction_id)
+        if len(pending[bucket]) >= ID_WRITE_BATCH:
+            flush(bucket)
+    for bucket in range(buckets):
+        if pending[bucket]:
+            flush(bucket)
+
+
+def _bucket_repeats(directory, bucket, ranges):
+    """
+    Returns: per range in file order, the IDs of this bucket it kept that an earlier range kept too
+    """
+    seen, repeats = set(), []
+    for index in range(ranges):
+        path = _id_path(directory, index, bucket)
+        if not os.path.exists(path):
+            repeats.append(set())
+            continue
+        with open(path, encoding='utf-8', newline='\n') as f:
+            ids = f.read().split('\n')[:-1]
+        repeats.append(seen.intersection(ids))
+        seen.update(ids)
+    return repeats
+
+
+def _map_ranges_dedup(func, tasks, workers, dedup, sizes, initializer=None, initargs=()):
+    """
+    Runs func(*task, ids, seen_ids) for every byte range task with duplicate
+    TransactionIDs removed across ranges, as one sequential pass would:
+      1. each range runs with its own deduplicator and exports the IDs it kept,
+         hashed into buckets of about BUCKET_BYTES of source data;
+      2. the buckets are checked in parallel, each keeping the IDs of its
+         earlier ranges, for IDs a range kept although an earlier range did;
+      3. only the ranges holding such repeats run again, with those IDs already
+         seen. Files a range writes (quarantine, enriched parts) are rewritten
+         with the same names, so the rerun replaces them.
+    Clean data costs one pass plus the ID export; replays cost a second pass of the ranges they land in.
+    Returns: list of results in task order
+    """
+    if dedup == 'off' or len(tasks) <= 1:
+        return list(_map_ranges(func, [task + (None, ()) for task in tasks], workers, initializer, initargs))
+
+    buckets = max(workers, -(-sum(sizes) // BUCKET_BYTES))
+    directory = tempfile.mkdtemp(prefix='sales-ids-')
+    try:
+        with _pool(workers, len(tasks), initializer, initargs) as run:
+            first = [task + ((directory, index, buckets), ()) for index, task in enumerate(tasks)]
+            results = list(run(func, first))
+
+            repeats = [set() for _ in tasks]
+            checks = [(directory, bucket, len(tasks)) for bucket in range(buckets)]
+            for partial in run(_bucket_repeats, checks):
+                for ids, found in zip(repeats, partial):
+                    ids |= found
+
+            reruns = [index for index, ids in enumerate(repeats) if ids]
+            again = [tasks[index] + (None, list(repeats[index])) for index in reruns]
+            for index, result in zip(reruns, run(func, again)):
+                results[index] = result
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+# ---------------- Worker (map) ----------------
+def _valid_range(filename, start, end, region, min_amount, max_amount, dedup, rule_specs, summary=None,
+                 malformed=None, quarantine=None, ids=None, seen_ids=()):
+    """
+    Valid, matching transactions of one byte range. `seen_ids` start out as
+    seen; with `ids` ((directory, index, buckets), see _map_ranges_dedup) the
+    kept IDs are exported once the range was read to the end.
+    """
+    deduplicator = _range_deduplicator(dedup, start, end, seen_ids)
+    try:
+        lines = iter_sales_data(filename, start, end)
+        with_lines = quarantine is not None
+        yield from iter_valid_transactions(iter_transactions(lines, malformed, quarantine, with_lines), summary,
+                                           region, min_amount, max_amount, dedup=deduplicator,
+                                           rules=_ruleset(rule_specs), quarantine=quarantine, with_lines=with_lines)
+        if ids is not None and deduplicator is not None:
+            _export_ids(deduplicator, *ids)
+    finally:
+        if deduplicator is not None:
+            deduplicator.close()
+
+
+def _collect(transactions, sales_agg, product_ids):
+    """
+    Adds each transaction to `sales_agg`, and its ProductID to the `product_ids`
+    dict when given, before passing it on (e.g. to enrichment, which changes ProductID)
+    """
+    add = sales_agg.add
+    for tx in transactions:
+        add(tx)
+        if product_ids is not None:
+            product_ids[tx['ProductID']] = None
+        yield tx
+
+
+def _aggregate_range(filename, start, end, region=None, min_amount=None, max_amount=None, approximate=False,
+                     dedup='exact', rule_specs=None, quarantine_part=None, collect_ids=False, enriched_part=None,
+                     fmt='json', ids=None, seen_ids=()):
+    """
+    Reads, parses, validates and aggregates one byte range of the file.
+    Rules travel as their specs (compiled predicates do not pickle); rejected
+    lines go to this range's own quarantine part file. `dedup` is a utils.dedup
+    mode; `ids` and `seen_ids` extend it across ranges (see _map_ranges_dedup).
+    In the same pass, `collect_ids` gathers the distinct ProductIDs, and with an
+    `enriched_part` the transactions are enriched against this process's
+    ProductIndex and written to that part of the enriched data file.
+    Returns: (SalesAggregator, summary, ProductIDs or None, (enrichment summary, lookups,
+             per-tier lookup stats) or None) partials - never the row dicts themselves
+    """
+    summary, malformed = {}, {}
+    product_ids = {} if collect_ids else None
+    enrichment = None
+    quarantine = QuarantineWriter(quarantine_part) if quarantine_part else None
+    try:
+        valid = _valid_range(filename, start, end, region, min_amount, max_amount, dedup, rule_specs, summary,
+                             malformed, quarantine, ids, seen_ids)
+        sales_agg = make_aggregator(approximate)
+        if enriched_part:
+            product_index = _PRODUCT_INDEX
+            product_index.reset_stats()
+            enrichment_summary = {}
+            write_enriched_part(iter_enrich_sales_data(_collect(valid, sales_agg, product_ids), product_index,
+                                                       enrichment_summary), enriched_part, fmt)
+            enrichment = (enrichment_summary, product_index.lookups, product_index.stats)
+        elif collect_ids:
+            for _ in _collect(valid, sales_agg, product_ids):
+                pass
+        else:
+            sales_agg.update(valid)
+    finally:
+        if quarantine is not None:
+            quarantine.close()
+    summary['malformed'] = malformed
+    return sales_agg, summary, list(product_ids) if collect_ids else None, enrichment
+
+
+def _enrich_range(filename, start, end, region=None, min_amount=None, max_amount=None, dedup='exact',
+                  rule_specs=None, fmt='json', part=None, ids=None, seen_ids=()):
+    """
+    Validates, filters and enriches one byte range against this process's
+    ProductIndex and writes the records to its part of the enriched data file.
+    Returns: (enrichment summary, lookups, per-tier lookup stats)
+    """
+    product_index = _PRODUCT_INDEX
+    product_index.reset_stats()
+    summary = {}
+    valid = _valid_range(filename, start, end, region, min_amount, max_amount, dedup, rule_specs,
+                         ids=ids, seen_ids=seen_ids)
+    write_enriched_part(iter_enrich_sales_data(valid, product_index, summary), part, fmt)
+    return summary, product_index.lookups, product_index.stats
+
+
+@contextmanager
+def _pool(workers, tasks, initializer=None, initargs=()):
+    """
+    A ProcessPoolExecutor of `workers` processes, or this process when there is
+    only one worker or task.
+    Yields: run(func, tasks), which yields func(*task) for every task in task order,
+    so merges see the file order of a sequential run
+    """
+    if workers == 1 or tasks <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        yield lambda func, tasks: (func(*task) for task in tasks)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        def run(func, tasks):
+            futures = [executor.submit(func, *task) for task in tasks]
+            return (future.result() for future in futures)
+        yield run
+
+
+def _map_ranges(func, tasks, workers, initializer=None, initargs=()):
+    """
+    Yields: func(*task) for every task, in task order (see _pool)
+    """
+    with _pool(workers, len(tasks), initializer, initargs) as run:
+        yield from run(func, tasks)
+
+
+def _join_quarantine(path, parts):
+    # Concatenated in file order, so the result matches a sequential run
+    with open(path, 'wb') as out:
+        for part in parts:
+            if os.path.exists(part):
+                with open(part, 'rb') as f:
+                    shutil.copyfileobj(f, out)
+                os.remove(part)
+
+
+# ---------------- Combine (reduce) ----------------
+def _plan_ranges(filenames, tasks):
+    """
+    Splits every file into newline-aligned byte ranges in proportion to its size,
+    about `tasks` ranges in total and at least one per non-empty file.
+    Returns: list of (filename, start, end) in file order
+    """
+    sizes = [os.path.getsize(f) if os.path.isfile(f) else 0 for f in filenames]
+    total = sum(sizes) or 1
+    plan = []
+    for filename, size in zip(filenames, sizes):
+        parts = max(1, round(tasks * size / total))
+        plan.extend((filename, start, end) for start, end in split_line_ranges(filename, parts))
+    return plan
+
+
+def aggregate_files(filenames, workers=None, region=None, min_amount=None, max_amount=None,
+                    chunks_per_worker=4, approximate=False, dedup='exact', rules=None, quarantine=None,
+                    product_ids=None, product_index=None, enriched_file=None, fmt='json', compression=None,
+                    enrichment_summary=None):
+    """
+    Map-reduce over several sales files at once. All files share one bounded
+    ProcessPoolExecutor of `workers` processes, and large files are split into
+    several byte ranges, so wall-clock time depends on the total data size and the
+    number of cores rather than on the number of files.
+    Options are those of parallel_aggregate. Duplicates are removed across all
+    files as if they were read one after another in the given order, so a
+    TransactionID counts in the first file holding it; the quarantine holds the
+    rejected lines of all files, in file order, and the enriched data file their
+    records.
+    Returns: dict of filename -> (SalesAggregator, summary), in the given order
+    """
+    workers = workers or os.cpu_count() or 1
+    filenames = list(dict.fromkeys(filenames))  # A file named twice is still read once
+    plan = _plan_ranges(filenames, workers * chunks_per_worker)
+    rule_specs = rules.rules if rules is not None else None
+    parts = [f"{quarantine}.{i}.part" if quarantine else None for i in range(len(plan))]
+    enrich = product_index is not None and enriched_file is not None
+    enriched_parts = [f"{enriched_file}.{i}.part" if enrich else None for i in range(len(plan))]
+    initializer, initargs = None, ()
+    if enrich:
+        initializer = _init_products
+        initargs = (product_index.products, product_index.fuzzy, product_index.fuzzy_threshold)
+        if enrichment_summary is None:
+            enrichment_summary = {}
+        enrichment_summary.update(empty_enrichment_summary())
+
+    results = {
+        filename: (make_aggregator(approximate), empty_summary())
+        for filename in filenames
+    }
+    tasks = [(filename, start, end, region, min_amount, max_amount, approximate, dedup, rule_specs, part,
+              product_ids is not None, enriched_part, fmt)
+             for (filename, start, end), part, enriched_part in zip(plan, parts, enriched_parts)]
+    try:
+        partials = _map_ranges_dedup(_aggregate_range, tasks, workers, dedup, [end - start for _, start, end in plan],
+                                     initializer, initargs)
+        for (filename, _, _), (partial_agg, partial_summary, ids, enrichment) in zip(plan, partials):
+            sales_agg, summary = results[filename]
+            sales_agg.merge(partial_agg)
+            merge_summary(summary, partial_summary)
+            if product_ids is not None:
+                product_ids.update(dict.fromkeys(ids))
+            if enrichment is not None:
+                partial_enrichment, lookups, stats = enrichment
+                merge_enrichment_summary(enrichment_summary, partial_enrichment)
+                product_index.add_stats(lookups, stats)
+        if enrich:
+            join_enriched_parts(enriched_parts, enriched_file, fmt, compression)
+        return results
+    finally:
+        if quarantine:
+            _join_quarantine(quarantine, parts)
+        for part in enriched_parts:
+            if part and os.path.exists(part):
+                os.remove(part)
+
+
+def parallel_aggregate(filename, workers=None, region=None, min_amount=None, max_amount=None,
+                       chunks_per_worker=4, approximate=False, dedup='exact', rules=None, quarantine=None,
+                       product_ids=None, product_index=None, enriched_file=None, fmt='json', compression=None,
+                       enrichment_summary=None):
+    """
+    Map-reduce version of read -> parse -> validate_and_filter -> aggregate_sales.
+    The file is split into newline-aligned byte ranges which are processed in a
+    ProcessPoolExecutor; each worker sends back only its partial aggregates.
+    With `approximate` (True or a dict of sketch options, see sketches.make_aggregator)
+    the partials are ApproxSalesAggregator sketches.
+    `dedup` is a utils.dedup mode ('exact', 'bloom' or 'off'); duplicates are
+    removed across the whole file, like the sequential path (see _map_ranges_dedup).
+    `rules` is a validation_rules.RuleSet; with a `quarantine` path, rejected lines
+    are written there in file order.
+    The same pass also fills, when given:
+        product_ids         dict whose keys become the distinct ProductIDs of the
+                            aggregated transactions, first-seen order (e.g. for a
+                            ProductCatalogCache lookup)
+        product_index       with `enriched_file`: the aggregated transactions are
+                            enriched and written as parallel_enrich does, and
+                            `enrichment_summary` is filled
+    Returns: (SalesAggregator, summary) where summary matches iter_valid_transactions
+    """
+    return aggregate_files([filename], workers, region, min_amount, max_amount, chunks_per_worker,
+                           approximate, dedup, rules, quarantine, product_ids, product_index, enriched_file,
+                           fmt, compression, enrichment_summary)[filename]
+
+
+def parallel_enrich(filename, product_index, output_file, workers=None, region=None, min_amount=None,
+                    max_amount=None, chunks_per_worker=4, dedup='exact', rules=None, fmt='json', compression=None):
+    """
+    Enrichment counterpart of parallel_aggregate over the same byte ranges, filters
+    and dedup, for when the catalog depends on its ProductIDs (otherwise pass the
+    product_index to parallel_aggregate and enrich in its pass): each worker enriches the transactions of its ranges with its own copy
+    of `product_index` and writes them to a part file, and the parts are joined in
+    file order into the file save_enriched_data would write. No rows come back to
+    this process; the workers' lookup statistics are added to `product_index`.
+    Returns: enrichment summary (see api_handler.iter_enrich_sales_data)
+    """
+    workers = workers or os.cpu_count() or 1
+    plan = _plan_ranges([filename], workers * chunks_per_worker)
+    rule_specs = rules.rules if rules is not None else None
+    parts = [f"{output_file}.{i}.part" for i in range(len(plan))]
+    tasks = [(filename, start, end, region, min_amount, max_amount, dedup, rule_specs, fmt, part)
+             for (_, start, end), part in zip(plan, parts)]
+    initargs = (product_index.products, product_index.fuzzy, product_index.fuzzy_threshold)
+
+    summary = empty_enrichment_summary()
+    try:
+        for partial, lookups, stats in _map_ranges_dedup(_enrich_range, tasks, workers, dedup,
+                                                         [end - start for _, start, end in plan],
+                                                         _init_products, initargs):
+            merge_enrichment_summary(summary, partial)
+            product_index.add_stats(lookups, stats)
+        join_enriched_parts(parts, output_file, fmt, compression)
+    finally:
+        for part in parts:
+            if os.path.exists(part):
+                os.remove(part)
+    return summary
@@ -0,0 +1,145 @@
+# utils/product_cache.py
+
+import json
+import time
+import sqlite3
+from collections import OrderedDict
+
+from utils.api_handler import fetch_products, NOT_MODIFIED
+
+SQLITE_BATCH = 500  # Stays below SQLite's bound-parameter limit
+
+
+# ---------------- Persistent product catalog cache ----------------
+class ProductCatalogCache:
+    """
+    On-disk (SQLite) product cache with per-entry TTL and an in-process LRU front.
+    Fresh entries are served from memory or disk; only unknown and stale
+    products go back to the API, stale ones as conditional requests carrying
+    their ETag. IDs the API does not know are cached too (negative entries),
+    so they are not re-requested on every run.
+    """
+
+    def __init__(self, path='data/product_cache.sqlite', ttl=24 * 3600, lru_size=1024,
+                 fetcher=fetch_products, clock=time.time):
+        self.ttl = ttl
+        self.lru_size = lru_size
+        self.fetcher = fetcher
+        self.clock = clock
+        self._lru = OrderedDict()  # ProductID -> (product or None, fetched_at)
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stale': 0,
+            'not_modified': 0,
+            'fetched': 0,
+            'evictions': 0
+        }
+
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS products ("
+            " product_id TEXT PRIMARY KEY,"
+            " data TEXT,"  # JSON; NULL for IDs unknown to the API
+            " etag TEXT,"
+            " fetched_at REAL NOT NULL)"
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ---------------- LRU front ----------------
+    def _remember(self, product_id, product, fetched_at):
+        self._lru[product_id] = (product, fetched_at)
+        self._lru.move_to_end(product_id)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _fresh(self, fetched_at, now):
+        return now - fetched_at < self.ttl
+
+    # ---------------- Lookups ----------------
+    def get_products(self, product_ids):
+        """
+        Returns: dict ProductID -> product for every requested ID the catalog knows
+        """
+        now = self.clock()
+        found, pending = {}, []
+
+        for product_id in dict.fromkeys(product_ids):
+            entry = self._lru.get(product_id)
+            if entry is not None and self._fresh(entry[1], now):
+                self._lru.move_to_end(product_id)
+                self.stats['memory_hits'] += 1
+                if entry[0] is not None:
+                    found[product_id] = entry[0]
+            else:
+                pending.append(product_id)
+
+        stored = self._load_rows(pending)
+        to_fetch, etags = [], {}
+        for product_id in pending:
+            row = stored.get(product_id)
+            if row is None:
+                self.stats['misses'] += 1
+                to_fetch.append(product_id)
+            elif self._fresh(row[2], now):
+                self.stats['disk_hits'] += 1
+                self._remember(product_id, row[0], row[2])
+                if row[0] is not None:
+                    found[product_id] = row[0]
+            else:
+                self.stats['stale'] += 1
+                to_fetch.append(product_id)
+                if row[1] is not None:
+                    etags[product_id] = row[1]
+
+        if to_fetch:
+            found.update(self._refresh(to_fetch, etags, stored, now))
+        return found
+
+    def _load_rows(self, product_ids):
+        rows = {}
+        for i in range(0, len(product_ids), SQLITE_BATCH):
+            batch = product_ids[i:i + SQLITE_BATCH]
+            query = ("SELECT product_id, data, etag, fetched_at FROM products WHERE product_id IN (%s)"
+                     % ','.join('?' * len(batch)))
+            for product_id, data, etag, fetched_at in self.db.execute(query, batch):
+                rows[product_id] = (json.loads(data) if data is not None else None, etag, fetched_at)
+        return rows
+
+    def _refresh(self, product_ids, etags, stored, now):
+        results = self.fetcher(product_ids, etags)
+        found, updates = {}, []
+
+        for product_id in product_ids:
+            result = results.get(product_id)
+            if result == NOT_MODIFIED:
+                self.stats['not_modified'] += 1
+                product, etag = stored[product_id][0], stored[product_id][1]
+            elif result is None:
+                product, etag = None, None
+            else:
+                self.stats['fetched'] += 1
+                product, etag = result
+
+            updates.append((product_id, json.dumps(product) if product is not None else None, etag, now))
+            self._remember(product_id, product, now)
+            if product is not None:
+                found[product_id] = product
+
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO products (product_id, data, etag, fetched_at) VALUES (?, ?, ?, ?)",
+                updates
+            )
+        return found
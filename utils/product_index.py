@@ -0,0 +1,146 @@
+# utils/product_index.py
+
+import re
+import time
+from collections import Counter
+
+_NOT_ALNUM = re.compile(r'[\W_]+')
+# Dice similarity a fuzzy match needs. A name extended by a word stays below it
+# ("Laptop" vs "Laptop Charger" scores 0.57, vs "Laptop Pro" 0.71); a typo in a
+# longer name does not ("Wireles Mouse" vs "Wireless Mouse" scores 0.89).
+FUZZY_THRESHOLD = 0.75
+
+
+def normalize_name(name):
+    """
+    Case-folds a product name and strips punctuation and whitespace: "USB-Cable " -> "usbcable"
+    """
+    return _NOT_ALNUM.sub('', name.casefold())
+
+
+def _trigrams(normalized):
+    padded = f"$${normalized}$"  # Boundary markers so short names still produce trigrams
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# ---------------- Product index ----------------
+class ProductIndex:
+    """
+    Multi-key O(1) product lookup for enrichment, tried in tier order:
+        id          - exact ProductID
+        exact       - exact ProductName
+        normalized  - case-folded name without punctuation/whitespace
+        fuzzy       - opt-in; best trigram (Dice) similarity of at least
+                      `fuzzy_threshold` via an inverted trigram index, so only
+                      products sharing a trigram are scored
+    Match counts and lookup latency are recorded per tier (see match_report).
+    """
+
+    TIERS = ('id', 'exact', 'normalized', 'fuzzy')
+
+    def __init__(self, products, fuzzy=False, fuzzy_threshold=FUZZY_THRESHOLD):
+        self.products = list(products)
+        self.by_id = {}
+        self.by_name = {}
+        self.by_normalized = {}
+        self.fuzzy = fuzzy
+        self.fuzzy_threshold = fuzzy_threshold
+        self._trigram_index = {}
+        self._trigram_counts = []
+        self._fuzzy_cache = {}
+
+        for position, prod in enumerate(self.products):
+            self.by_id.setdefault(prod["ProductID"], prod)
+            self.by_name.setdefault(prod["ProductName"], prod)
+            normalized = normalize_name(prod["ProductName"])
+            self.by_normalized.setdefault(normalized, prod)
+
+            grams = _trigrams(normalized)
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                self._trigram_index.setdefault(gram, []).append(position)
+
+        self.reset_stats()
+
+    def __len__(self):
+        return len(self.products)
+
+    def reset_stats(self):
+        self.lookups = 0
+        self.stats = {tier: {'attempts': 0, 'matches': 0, 'seconds': 0.0} for tier in self.TIERS}
+
+    def add_stats(self, lookups, stats):
+        """
+        Adds the lookup statistics of another index over the same products (e.g. a worker's copy)
+        """
+        self.lookups += lookups
+        for tier, counts in stats.items():
+            for key, value in counts.items():
+                self.stats[tier][key] += value
+
+    def _fuzzy_match(self, normalized):
+        if normalized in self._fuzzy_cache:
+            return self._fuzzy_cache[normalized]
+
+        grams = _trigrams(normalized)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigram_index.get(gram, ()))
+
+        best, best_score = None, self.fuzzy_threshold
+        for position, count in shared.items():
+            score = 2 * count / (len(grams) + self._trigram_counts[position])
+            if score >= best_score:
+                best, best_score = self.products[position], score
+
+        self._fuzzy_cache[normalized] = best
+        return best
+
+    def _find_normalized(self, name):
+        return self.by_normalized.get(normalize_name(name))
+
+    def _find_fuzzy(self, name):
+        normalized = normalize_name(name)
+        return self._fuzzy_match(normalized) if normalized else None
+
+    def _try(self, tier, find, key):
+        start = time.perf_counter()
+        product = find(key)
+        stats = self.stats[tier]
+        stats['seconds'] += time.perf_counter() - start
+        stats['attempts'] += 1
+        if product is not None:
+            stats['matches'] += 1
+        return product
+
+    def lookup(self, product_id=None, name=None):
+        """
+        Returns: (product, tier) for the first tier that matches, or (None, None)
+        """
+        self.lookups += 1
+        tiers = []
+        if product_id:
+            tiers.append(('id', self.by_id.get, product_id))
+        if name:
+            tiers += [('exact', self.by_name.get, name), ('normalized', self._find_normalized, name)]
+            if self.fuzzy:
+                tiers.append(('fuzzy', self._find_fuzzy, name))
+
+        for tier, find, key in tiers:
+            product = self._try(tier, find, key)
+            if product is not None:
+                return product, tier
+        return None, None
+
+    def match_report(self):
+        """
+        Returns: dict tier -> {'matches', 'match_rate' (% of all lookups), 'avg_latency_us'}
+        """
+        report = {}
+        for tier, stats in self.stats.items():
+            report[tier] = {
+                'matches': stats['matches'],
+                'match_rate': round(stats['matches'] / self.lookups * 100, 2) if self.lookups else 0.0,
+                'avg_latency_us': round(stats['seconds'] / stats['attempts'] * 1e6, 3) if stats['attempts'] else 0.0
+            }
+        return report
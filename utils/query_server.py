@@ -0,0 +1,366 @@
+# utils/query_server.py
+
+import os
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+
+from utils.file_handler import iter_sales_data
+from utils.data_processor import (
+    iter_transactions,
+    iter_valid_transactions,
+    aggregate_sales,
+    calculate_total_revenue,
+    region_wise_sales,
+    top_selling_products,
+    customer_analysis,
+    daily_sales_trend,
+    find_peak_sales_day,
+    low_performing_products
+)
+from utils.transaction_index import TransactionIndex
+from utils.rollup_cube import SalesCube
+from utils.time_index import weekly_sales_trend, monthly_sales_trend, moving_average_revenue
+from utils.transaction import gc_paused
+from utils.dedup import make_deduplicator
+
+# Query name -> (function, extra integer parameters it accepts)
+QUERIES = {
+    'total_revenue': (calculate_total_revenue, ()),
+    'region_wise_sales': (region_wise_sales, ()),
+    'top_selling_products': (top_selling_products, ('n',)),
+    'customer_analysis': (customer_analysis, ()),
+    'daily_sales_trend': (daily_sales_trend, ()),
+    'peak_sales_day': (find_peak_sales_day, ()),
+    'low_performing_products': (low_performing_products, ('threshold',)),
+    'weekly_sales_trend': (weekly_sales_trend, ()),
+    'monthly_sales_trend': (monthly_sales_trend, ()),
+    'moving_average': (moving_average_revenue, ('window',))
+}
+FILTERS = ('region', 'min_amount', 'max_amount', 'start_date', 'end_date')
+# Queries answered from the rollup cube when only region/date filters are given
+CUBE_QUERIES = {'total_revenue', 'region_wise_sales', 'top_selling_products', 'daily_sales_trend',
+                'peak_sales_day', 'low_performing_products', 'weekly_sales_trend', 'monthly_sales_trend',
+                'moving_average'}
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Content Too Large', 500: 'Internal Server Error'}
+# Request bodies are read and discarded so the next request on the connection starts at its request line
+MAX_BODY_BYTES = 1 << 20
+
+
+class QueryError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ---------------- Resident dataset ----------------
+class DatasetVersion:
+    """
+    One loaded version of the dataset: validated transactions, their SalesCube and
+    unfiltered aggregates. Never changed after loading, so queries can run on it
+    from several threads; the TransactionIndex for amount filters is built on the
+    first query that needs it.
+    """
+
+    def __init__(self, version=0, transactions=(), cube=None, sales_agg=None, summary=None):
+        self.version = version
+        self.transactions = list(transactions)
+        self.cube = cube if cube is not None else SalesCube()
+        self.sales_agg = sales_agg if sales_agg is not None else aggregate_sales(self.transactions)
+        self.summary = summary or {}
+        self._index = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def index(self):
+        with self._index_lock:  # Built once even when several queries need it at the same time
+            if self._index is None:
+                self._index = TransactionIndex(self.transactions)
+            return self._index
+
+    def run(self, name, filters, options):
+        if name not in QUERIES:
+            raise QueryError(404, f"unknown query '{name}'")
+        func, _ = QUERIES[name]
+
+        if not any(value is not None for value in filters.values()):
+            source = self.sales_agg
+        elif name in CUBE_QUERIES and filters['min_amount'] is None and filters['max_amount'] is None:
+            source = self.cube.rollup(filters['region'], filters['start_date'], filters['end_date'])
+        else:
+            source = aggregate_sales(self.index.filter(**filters))
+        if name == 'peak_sales_day' and not source.row_count:
+            return None
+        return func(source, **options)
+
+
+class AnalyticsDataset:
+    """
+    The current DatasetVersion of one sales file, validated with `rules` and
+    deduplicated in `dedup` mode like the batch pipeline. The file is reloaded only
+    when its size or modification time changes; the new version replaces `current`
+    in one assignment, so queries already running finish on the version they
+    started with and others keep being answered while a reload runs.
+    """
+
+    def __init__(self, filename, dedup='exact', rules=None):
+        self.filename = filename
+        self.dedup = dedup
+        self.rules = rules
+        self.current = DatasetVersion()
+        self._stat = None
+        self._reload_lock = threading.Lock()
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    @property
+    def version(self):
+        return self.current.version
+
+    def refresh(self, wait=True):
+        """
+        Reloads the file if it changed since the last load. With wait=False a
+        caller arriving while another thread reloads returns at once.
+        Returns: True if the dataset was (re)loaded by this call
+        """
+        if not self._reload_lock.acquire(blocking=wait):
+            return False
+        try:
+            stat = self._file_stat()
+            if stat == self._stat and self.current.version:
+                return False
+
+            summary = {}
+            cube = SalesCube()
+            lines = iter_sales_data(self.filename)
+            dedup = make_deduplicator(self.dedup)
+            try:
+                with gc_paused():
+                    transactions = list(iter_valid_transactions(iter_transactions(lines), summary, cube=cube,
+                                                                dedup=dedup, rules=self.rules))
+            finally:
+                if dedup is not None:
+                    dedup.close()
+            self.current = DatasetVersion(
+                self.current.version + 1, transactions, cube,
+                summary={**summary, 'regions': sorted(r for r in summary['regions'] if r)}
+            )
+            self._stat = stat
+            print(f"Loaded {len(transactions)} valid transactions from {self.filename} (version {self.version})")
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def run(self, name, filters, options):
+        return self.current.run(name, filters, options)
+
+
+def _parse_query(target):
+    """
+    Splits a request target like /top_selling_products?region=North,East&n=3
+    Returns: (query name, filters dict, options dict)
+    """
+    url = urlsplit(target)
+    name = url.path.strip('/')
+    params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+    allowed = FILTERS + (QUERIES[name][1] if name in QUERIES else ())
+    unknown = set(params) - set(allowed)
+    if unknown:
+        raise QueryError(400, f"unknown parameter(s): {', '.join(sorted(unknown))}")
+
+    filters = dict.fromkeys(FILTERS)
+    options = {}
+    try:
+        if params.get('region'):
+            filters['region'] = [r.strip() for r in params['region'].split(',') if r.strip()]
+        for key in ('min_amount', 'max_amount'):
+            if params.get(key):
+                filters[key] = float(params[key])
+        for key in ('start_date', 'end_date'):
+            if params.get(key):
+                filters[key] = params[key]
+        for key in ('n', 'threshold', 'window'):
+            if key in params:
+                options[key] = int(params[key])
+    except ValueError as e:
+        raise QueryError(400, f"invalid parameter value: {e}") from e
+    if options.get('window', 1) < 1:
+        raise QueryError(400, "window must be at least 1")
+    return name, filters, options
+
+
+# ---------------- Query server ----------------
+class AnalyticsServer:
+    """
+    Asyncio HTTP/1.1 server answering analytics queries over a resident dataset.
+        GET /<query>?region=North,East&min_amount=100&max_amount=5000
+                    &start_date=2024-12-01&end_date=2024-12-31[&n=5|&threshold=10|&window=7]
+        GET /stats   dataset version, row count and cache statistics
+    Encoded responses are kept in an LRU cache keyed by (dataset version, query,
+    parameters), so repeated dashboard queries are answered without recomputing.
+    Before each request the source file is checked and reloaded if it changed.
+    Reloads and queries run on a pool of `workers` threads, never on the event
+    loop: while one request reloads the file or runs a long query, the others are
+    still read and answered (from the previous version during a reload).
+    """
+
+    def __init__(self, filename, cache_size=256, workers=4, dedup='exact', rules=None):
+        self.dataset = AnalyticsDataset(filename, dedup, rules)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()  # Guards the cache and stats across worker threads
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analytics')
+        self.stats = {'requests': 0, 'cache_hits': 0, 'cache_misses': 0, 'reloads': 0, 'errors': 0}
+
+    # ---------------- Query handling ----------------
+    def answer(self, target):
+        """
+        Blocking; run in a worker thread by the HTTP handler.
+        Returns: (HTTP status, JSON body bytes) for a request target
+        """
+        try:
+            return self._answer(target)
+        except QueryError as e:
+            return e.status, json.dumps({'error': str(e)}).encode('utf-8')
+        except Exception as e:
+            with self._lock:
+                self.stats['errors'] += 1
+            print(f"Error: query {target!r} failed: {e!r}")
+            return 500, json.dumps({'error': f"internal error: {type(e).__name__}"}).encode('utf-8')
+
+    def _answer(self, target):
+        with self._lock:
+            self.stats['requests'] += 1
+        if self.dataset.refresh(wait=False):
+            with self._lock:
+                self.stats['reloads'] += 1
+                self._cache.clear()  # Entries of older versions can never be hit again
+
+        name, filters, options = _parse_query(target)
+        if name == 'stats':
+            return 200, json.dumps(self.describe()).encode('utf-8')
+
+        current = self.dataset.current  # The whole query runs on this version
+        key = (current.version, name, tuple(
+            tuple(sorted(value)) if isinstance(value, list) else value for value in filters.values()
+        ), tuple(sorted(options.items())))
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return 200, body
+            self.stats['cache_misses'] += 1
+
+        result = current.run(name, filters, options)
+        body = json.dumps({'query': name, 'version': current.version, 'result': result}).encode('utf-8')
+        with self._lock:
+            if current is self.dataset.current:  # Not cached once a reload replaced the version
+                self._cache[key] = body
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return 200, body
+
+    def describe(self):
+        current = self.dataset.current
+        with self._lock:
+            return {
+                'file': self.dataset.filename,
+                'version': current.version,
+                'rows': len(current.transactions),
+                'summary': current.summary,
+                'queries': sorted(QUERIES),
+                'cache_entries': len(self._cache),
+                **self.stats
+            }
+
+    # ---------------- HTTP ----------------
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                parts = request_line.decode('latin-1').split()
+                length = headers.get('content-length', '0')
+                if 'transfer-encoding' in headers or not length.isdigit():
+                    # The body cannot be skipped reliably, so the connection ends after the reply
+                    status, body, keep_alive = 400, b'{"error": "unsupported request body framing"}', False
+                elif int(length) > MAX_BODY_BYTES:
+                    status, body, keep_alive = 413, b'{"error": "request body too large"}', False
+                else:
+                    await reader.readexactly(int(length))  # Ignored, but not to be read as the next request
+                    if len(parts) != 3:
+                        status, body = 400, b'{"error": "malformed request line"}'
+                    elif parts[0] != 'GET':
+                        status, body = 405, b'{"error": "only GET is supported"}'
+                    else:
+                        status, body = await asyncio.get_running_loop().run_in_executor(
+                            self._executor, self.answer, parts[1]
+                        )
+
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('ascii') + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8080, unix_socket=None):
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.dataset.refresh)
+        if unix_socket:
+            server = await asyncio.start_unix_server(self._handle, path=unix_socket)
+            print(f"Serving analytics queries on unix socket {unix_socket}")
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+            print(f"Serving analytics queries on http://{host}:{port}/")
+        return server
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def serve(filename, host='127.0.0.1', port=8080, unix_socket=None, cache_size=256, dedup='exact', rules=None):
+    """
+    Runs the analytics query server until interrupted (Ctrl+C).
+    """
+    async def run():
+        analytics = AnalyticsServer(filename, cache_size, dedup=dedup, rules=rules)
+        try:
+            server = await analytics.start(host, port, unix_socket)
+            async with server:
+                await server.serve_forever()
+        finally:
+            analytics.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\nServer stopped")
@@ -2,117 +2,113 @@
 
 from datetime import datetime
 
-def generate_sales_report(transactions, enriched_transactions, output_file='output/sales_report.txt'):
+def generate_sales_report(total_revenue, region_stats, top_products, customer_stats, daily_trends,
+                          enrichment_summary, output_file='output/sales_report.txt', time_index=None,
+                          sources=None):
     """
-    Generates a comprehensive formatted text report safely handling None values.
+    Generates a formatted text report from the aggregates computed in the analysis step:
+        total_revenue      - calculate_total_revenue
+        region_stats       - region_wise_sales
+        top_products       - top_selling_products
+        customer_stats     - customer_analysis (sorted by total spent)
+        daily_trends       - daily_sales_trend (sorted by date)
+        enrichment_summary - summary filled by iter_enrich_sales_data, or None to leave the
+                             enrichment section out (batch runs do not enrich)
+        time_index         - optional DailyTimeIndex over daily_trends, adds the period analysis
+        sources            - optional list of the input files, listed in the header
+    Work is proportional to the number of groups, not transactions; the report is
+    built in memory and written in one go.
     """
 
     def safe_str(val):
         return str(val) if val is not None else "N/A"
 
     # Overall summary
-    total_revenue = sum(tx.get('amount', 0) for tx in transactions)
-    total_transactions = len(transactions)
+    total_transactions = sum(stats['transaction_count'] for stats in region_stats.values())
     avg_order = total_revenue / total_transactions if total_transactions else 0
-    dates = [tx.get('date') for tx in transactions if tx.get('date')]
-    start_date = min(dates) if dates else "N/A"
-    end_date = max(dates) if dates else "N/A"
+    start_date = next(iter(daily_trends), "N/A")
+    end_date = next(reversed(daily_trends), "N/A")
 
-    # Region-wise
-    region_summary = {}
-    for tx in transactions:
-        region = safe_str(tx.get('region'))
-        amt = tx.get('amount', 0)
-        if region not in region_summary:
-            region_summary[region] = {'total_sales': 0, 'transactions': 0}
-        region_summary[region]['total_sales'] += amt
-        region_summary[region]['transactions'] += 1
+    top_customers = list(customer_stats.items())[:5]
 
-    # Top products
-    product_totals = {}
-    for tx in transactions:
-        products = tx.get('products_bought') or []
-        for p in products:
-            pname = safe_str(p)
-            if pname not in product_totals:
-                product_totals[pname] = {'quantity': 0, 'revenue': 0}
-            product_totals[pname]['quantity'] += 1
-            product_totals[pname]['revenue'] += tx.get('amount', 0)
-    top_products = sorted(product_totals.items(), key=lambda x: x[1]['revenue'], reverse=True)[:5]
+    lines = [
+        "="*40,
+        "       SALES ANALYTICS REPORT",
+        f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Records Processed: {total_transactions}"
+    ]
+    if sources:
+        lines.append(f"Source: {sources[0]}" if len(sources) == 1 else f"Sources: {len(sources)} files")
+    lines += [
+        "="*40,
+        "",
+        "OVERALL SUMMARY",
+        "-"*40,
+        f"Total Revenue: ₹{total_revenue:,.2f}",
+        f"Total Transactions: {total_transactions}",
+        f"Average Order Value: ₹{avg_order:,.2f}",
+        f"Date Range: {start_date} to {end_date}",
+        "",
+        "REGION-WISE PERFORMANCE",
+        "-"*40,
+        f"{'Region':<10} {'Sales':>15} {'Transactions':>15}"
+    ]
+    for region, stats in region_stats.items():
+        lines.append(f"{safe_str(region):<10} ₹{stats['total_sales']:>14,.2f} {stats['transaction_count']:>15}")
 
-    # Top customers
-    customer_totals = {}
-    for tx in transactions:
-        cust = safe_str(tx.get('customer_id'))
-        amt = tx.get('amount', 0)
-        if cust not in customer_totals:
-            customer_totals[cust] = {'total_spent': 0, 'orders': 0}
-        customer_totals[cust]['total_spent'] += amt
-        customer_totals[cust]['orders'] += 1
-    top_customers = sorted(customer_totals.items(), key=lambda x: x[1]['total_spent'], reverse=True)[:5]
+    lines += ["", "TOP 5 PRODUCTS", "-"*40, f"{'Rank':<5} {'Product':<20} {'Qty':>5} {'Revenue':>15}"]
+    for idx, (pname, quantity, revenue) in enumerate(top_products, 1):
+        lines.append(f"{idx:<5} {safe_str(pname):<20} {quantity:>5} ₹{revenue:>14,.2f}")
 
-    # Daily trends
-    daily_stats = {}
-    for tx in transactions:
-        date = safe_str(tx.get('date'))
-        if date not in daily_stats:
-            daily_stats[date] = {'revenue': 0, 'transactions': 0, 'customers': set()}
-        daily_stats[date]['revenue'] += tx.get('amount', 0)
-        daily_stats[date]['transactions'] += 1
-        daily_stats[date]['customers'].add(safe_str(tx.get('customer_id')))
-    
-    # API enrichment
-    total_enriched = sum(1 for tx in enriched_transactions if tx.get('API_Match'))
-    success_rate = (total_enriched / len(enriched_transactions) * 100) if enriched_transactions else 0
-    unmatched_products = [tx.get('product_name', 'N/A') for tx in enriched_transactions if not tx.get('API_Match')]
+    lines += ["", "TOP 5 CUSTOMERS", "-"*40, f"{'Rank':<5} {'Customer':<15} {'Total Spent':>15} {'Orders':>10}"]
+    for idx, (cust, data) in enumerate(top_customers, 1):
+        lines.append(f"{idx:<5} {safe_str(cust):<15} ₹{data['total_spent']:>14,.2f} {data['purchase_count']:>10}")
 
-    # Write to file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write("="*40 + "\n")
-        f.write("       SALES ANALYTICS REPORT\n")
-        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Records Processed: {total_transactions}\n")
-        f.write("="*40 + "\n\n")
-
-        f.write("OVERALL SUMMARY\n")
-        f.write("-"*40 + "\n")
-        f.write(f"Total Revenue: ₹{total_revenue:,.2f}\n")
-        f.write(f"Total Transactions: {total_transactions}\n")
-        f.write(f"Average Order Value: ₹{avg_order:,.2f}\n")
-        f.write(f"Date Range: {start_date} to {end_date}\n\n")
+    lines += ["", "DAILY SALES TREND", "-"*40,
+              f"{'Date':<12} {'Revenue':>15} {'Transactions':>12} {'Unique Customers':>18}"]
+    for date, stats in daily_trends.items():
+        lines.append(f"{safe_str(date):<12} ₹{stats['revenue']:>14,.2f} {stats['transaction_count']:>12} "
+                     f"{stats['unique_customers']:>18}")
 
-        f.write("REGION-WISE PERFORMANCE\n")
-        f.write("-"*40 + "\n")
-        f.write(f"{'Region':<10} {'Sales':>15} {'Transactions':>15}\n")
-        for region, stats in sorted(region_summary.items(), key=lambda x: x[1]['total_sales'], reverse=True):
-            f.write(f"{region:<10} ₹{stats['total_sales']:>14,.2f} {stats['transactions']:>15}\n")
-        f.write("\n")
+    if time_index is not None and len(time_index):
+        lines += ["", "PERIOD ANALYSIS", "-"*40]
+        for label, peak in (("Peak Week", time_index.peak_week()), ("Peak Month", time_index.peak_month())):
+            lines.append(f"{label}: {peak[0]} (₹{peak[1]:,.2f}, {peak[2]} transactions)")
+        for window in (7, 30):
+            averages = time_index.moving_average(window)
+            if averages:
+                last_date, average = next(reversed(averages.items()))
+                lines.append(f"{window}-Day Moving Average (to {last_date}): ₹{average:,.2f}")
 
-        f.write("TOP 5 PRODUCTS\n")
-        f.write("-"*40 + "\n")
-        f.write(f"{'Rank':<5} {'Product':<20} {'Qty':>5} {'Revenue':>15}\n")
-        for idx, (pname, data) in enumerate(top_products, 1):
-            f.write(f"{idx:<5} {pname:<20} {data['quantity']:>5} ₹{data['revenue']:>14,.2f}\n")
-        f.write("\n")
+        for title, periods in (("Week", time_index.weekly()), ("Month", time_index.monthly())):
+            lines += ["", f"{title:<10}{'Days':>5} {'Revenue':>15} {'Growth':>10}"]
+            for label, stats in periods.items():
+                growth = f"{stats['growth_pct']:+.2f}%" if stats['growth_pct'] is not None else "N/A"
+                partial = "" if stats['complete'] else " (partial)"
+                lines.append(f"{label:<10}{stats['days']:>5} ₹{stats['revenue']:>14,.2f} {growth:>10}{partial}")
+    if time_index is not None and time_index.skipped_days:
+        lines += ["", f"Note: {len(time_index.skipped_days)} non-ISO date(s) ({time_index.skipped_transactions} "
+                      f"transactions) are left out of the period analysis"]
 
-        f.write("TOP 5 CUSTOMERS\n")
-        f.write("-"*40 + "\n")
-        f.write(f"{'Rank':<5} {'Customer':<15} {'Total Spent':>15} {'Orders':>10}\n")
-        for idx, (cust, data) in enumerate(top_customers, 1):
-            f.write(f"{idx:<5} {cust:<15} ₹{data['total_spent']:>14,.2f} {data['orders']:>10}\n")
-        f.write("\n")
+    if enrichment_summary is not None:
+        total_enriched = enrichment_summary['matched']
+        enriched_count = enrichment_summary['total']
+        success_rate = (total_enriched / enriched_count * 100) if enriched_count else 0
+        unmatched_products = enrichment_summary['unmatched_products']
+        lines += [
+            "",
+            "API ENRICHMENT SUMMARY",
+            "-"*40,
+            f"Total products enriched: {total_enriched}",
+            f"Success rate: {success_rate:.2f}%",
+            f"Unmatched products: {', '.join(safe_str(p) for p in unmatched_products) or 'None'}"
+        ]
 
-        f.write("DAILY SALES TREND\n")
-        f.write("-"*40 + "\n")
-        f.write(f"{'Date':<12} {'Revenue':>15} {'Transactions':>12} {'Unique Customers':>18}\n")
-        for date, stats in sorted(daily_stats.items()):
-            f.write(f"{date:<12} ₹{stats['revenue']:>14,.2f} {stats['transactions']:>12} {len(stats['customers']):>18}\n")
-        f.write("\n")
+    lines += [
+        "",
+        "=== END OF REPORT ===",
+        ""
+    ]
 
-        f.write("API ENRICHMENT SUMMARY\n")
-        f.write("-"*40 + "\n")
-        f.write(f"Total products enriched: {total_enriched}\n")
-        f.write(f"Success rate: {success_rate:.2f}%\n")
-        f.write(f"Unmatched products: {', '.join(safe_str(p) for p in unmatched_products)}\n")
-        f.write("\n")
-        f.write("=== END OF REPORT ===\n")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
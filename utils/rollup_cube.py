@@ -0,0 +1,116 @@
+# utils/rollup_cube.py
+
+from bisect import bisect_left, bisect_right
+
+from utils.data_processor import SalesAggregator
+
+
+# ---------------- Rollup cube ----------------
+class SalesCube:
+    """
+    Materialized Region x ProductName x Date rollup of the valid transactions.
+    Each (Region, Date) cell holds, per product, [revenue, quantity, transaction
+    count, first row], plus the set of customers who bought in that cell.
+    Filled while validating (see iter_valid_transactions' `cube`), then any
+    region/date slice is answered by summing cells, so its cost depends on the
+    number of distinct groups, not on the number of rows.
+    """
+
+    def __init__(self):
+        self.row_count = 0
+        self.cells = {}
+        self._dates = None
+
+    def add(self, tx):
+        amt = tx['Quantity'] * tx['UnitPrice']
+        key = (tx['Region'], tx['Date'])
+        if key not in self.cells:
+            self.cells[key] = ({}, set())
+            self._dates = None
+        products, customers = self.cells[key]
+
+        p = tx['ProductName']
+        if p not in products:
+            products[p] = [0.0, 0, 0, self.row_count]
+        product = products[p]
+        product[0] += amt
+        product[1] += tx['Quantity']
+        product[2] += 1
+        customers.add(tx['CustomerID'])
+        self.row_count += 1
+
+    def update(self, transactions):
+        for tx in transactions:
+            self.add(tx)
+        return self
+
+    def regions(self):
+        return sorted(set(r for r, _ in self.cells if r))
+
+    def dates(self):
+        if self._dates is None:
+            self._dates = sorted(set(d for _, d in self.cells))
+        return self._dates
+
+    def _select(self, region=None, start_date=None, end_date=None):
+        if isinstance(region, str):
+            region = [region]
+        regions = set(region) if region else None
+        if start_date is None and end_date is None:
+            dates = None
+        else:
+            all_dates = self.dates()
+            lo = bisect_left(all_dates, start_date) if start_date is not None else 0
+            hi = bisect_right(all_dates, end_date) if end_date is not None else len(all_dates)
+            dates = set(all_dates[lo:hi])
+        return [
+            (key, cell) for key, cell in self.cells.items()
+            if (regions is None or key[0] in regions) and (dates is None or key[1] in dates)
+        ]
+
+    # ---------------- Rollups ----------------
+    def rollup(self, region=None, start_date=None, end_date=None):
+        """
+        Sums the cells matching the filters into a SalesAggregator, so the Part 2
+        analytics run on it unchanged. `region` may be a name or a collection of
+        names; dates are inclusive YYYY-MM-DD bounds. Groups are inserted in
+        first-row order, so ties rank exactly as with aggregate_sales over the rows
+        (sums may differ from it only by float rounding).
+        Customers are not a cube dimension: customer_analysis needs the rows.
+        """
+        agg = SalesAggregator()
+        regions, products, daily = {}, {}, {}
+        region_first, product_first = {}, {}
+
+        for (r, d), (cell_products, customers) in self._select(region, start_date, end_date):
+            if r not in regions:
+                regions[r] = {'total_sales': 0.0, 'transaction_count': 0}
+                region_first[r] = self.row_count
+            if d not in daily:
+                daily[d] = {'revenue': 0.0, 'transaction_count': 0, 'unique_customers': set()}
+            region_stats = regions[r]
+            day = daily[d]
+            day['unique_customers'] |= customers
+
+            for p, (revenue, quantity, count, first) in cell_products.items():
+                if p not in products:
+                    products[p] = {'total_quantity': 0, 'total_revenue': 0.0}
+                    product_first[p] = first
+                elif first < product_first[p]:
+                    product_first[p] = first
+                product = products[p]
+                product['total_quantity'] += quantity
+                product['total_revenue'] += revenue
+                region_stats['total_sales'] += revenue
+                region_stats['transaction_count'] += count
+                day['revenue'] += revenue
+                day['transaction_count'] += count
+                agg.total_revenue += revenue
+                agg.row_count += count
+                if first < region_first[r]:
+                    region_first[r] = first
+
+        agg.regions = {r: regions[r] for r in sorted(regions, key=region_first.__getitem__)}
+        agg.products = {p: products[p] for p in sorted(products, key=product_first.__getitem__)}
+        agg.daily = daily
+        return agg
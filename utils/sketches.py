@@ -0,0 +1,334 @@
+# utils/sketches.py
+
+import heapq
+import math
+import hashlib
+from array import array
+
+from utils.data_processor import SalesAggregator
+
+
+def hash64(item):
+    """
+    Stable 64-bit hash of a string (unlike hash(), identical across processes, so sketches merge)
+    """
+    return int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+# ---------------- HyperLogLog ----------------
+class HyperLogLog:
+    """
+    Distinct-count estimate with relative standard error ~`error` in 2**p byte registers.
+    Small sets are kept exact (as hashes) until they would outgrow the registers.
+    len() returns the (rounded) estimate.
+    """
+
+    def __init__(self, error=0.01):
+        self.error = error
+        self.p = min(18, max(4, math.ceil(math.log2((1.04 / error) ** 2))))
+        self.m = 1 << self.p
+        self._sparse = set()
+        self._registers = None
+
+    def add(self, item):
+        self.add_hash(hash64(item))
+
+    def add_hash(self, h):
+        if self._registers is None:
+            self._sparse.add(h)
+            if len(self._sparse) > self.m // 64:  # A set costs ~64 bytes per hash, a register 1
+                self._densify()
+            return
+        index = h & (self.m - 1)
+        rank = (64 - self.p) - (h >> self.p).bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def _densify(self):
+        self._registers = bytearray(self.m)
+        sparse, self._sparse = self._sparse, set()
+        for h in sparse:
+            self.add_hash(h)
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("cannot merge HyperLogLogs of different precision")
+        if other._registers is None:
+            for h in other._sparse:
+                self.add_hash(h)
+            return self
+        if self._registers is None:
+            self._densify()
+        self._registers = bytearray(map(max, self._registers, other._registers))
+        return self
+
+    def count(self):
+        if self._registers is None:
+            return len(self._sparse)
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # Linear counting for small cardinalities
+        return estimate
+
+    def __len__(self):
+        return round(self.count())
+
+
+# ---------------- Count-Min sketch ----------------
+class CountMinSketch:
+    """
+    Point-frequency estimates in bounded memory: estimate(x) >= true count, and
+    exceeds it by at most epsilon * total weight with probability 1 - delta.
+    """
+
+    def __init__(self, epsilon=0.001, delta=0.01):
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.total = 0
+        self._table = array('d', bytes(8 * self.width * self.depth))
+
+    def _cells(self, h):
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, item, weight=1):
+        self.add_hash(hash64(item), weight)
+
+    def add_hash(self, h, weight=1):
+        self.total += weight
+        table = self._table
+        for cell in self._cells(h):
+            table[cell] += weight
+
+    def estimate(self, item):
+        table = self._table
+        return min(table[cell] for cell in self._cells(hash64(item)))
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("cannot merge Count-Min sketches of different shape")
+        self.total += other.total
+        self._table = array('d', map(sum, zip(self._table, other._table)))
+        return self
+
+
+# ---------------- Space-Saving ----------------
+class SpaceSaving:
+    """
+    Heavy hitters over a weighted stream, monitoring at most `capacity` items.
+    Every item whose true weight exceeds total / capacity is monitored, and a
+    monitored item's count overestimates its weight by at most errors[item].
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self._heap = []  # (count, item); entries may be stale, counts only grow
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts[item] == count:
+                return item
+            heapq.heappush(self._heap, (self.counts[item], item))
+
+    def offer(self, item, weight=1):
+        """
+        Returns: the item evicted to make room, or None
+        """
+        if item in self.counts:
+            self.counts[item] += weight
+            return None
+        if len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (weight, item))
+            return None
+
+        evicted = self._pop_min()
+        floor = self.counts.pop(evicted)
+        del self.errors[evicted]
+        self.counts[item] = floor + weight
+        self.errors[item] = floor
+        heapq.heappush(self._heap, (floor + weight, item))
+        return evicted
+
+    def top(self, n=None):
+        """
+        Returns: [(item, count, error)] by descending count
+        """
+        ranked = heapq.nlargest(n or len(self.counts), self.counts.items(), key=lambda x: x[1])
+        return [(item, count, self.errors[item]) for item, count in ranked]
+
+    def merge(self, other):
+        """
+        Combines two summaries and keeps the `capacity` largest counts.
+        Returns: the items that were dropped
+        """
+        # An item missing from a full summary may have had up to that summary's minimum count
+        self_floor = min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+        other_floor = min(other.counts.values()) if len(other.counts) >= other.capacity else 0
+        for item in self.counts.keys() - other.counts.keys():
+            self.counts[item] += other_floor
+            self.errors[item] += other_floor
+        for item, count in other.counts.items():
+            self.counts[item] = self.counts.get(item, self_floor) + count
+            self.errors[item] = self.errors.get(item, self_floor) + other.errors[item]
+        dropped = []
+        if len(self.counts) > self.capacity:
+            keep = set(item for item, _, _ in self.top(self.capacity))
+            dropped = [item for item in self.counts if item not in keep]
+            for item in dropped:
+                del self.counts[item], self.errors[item]
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+        return dropped
+
+
+# ---------------- Approximate aggregation ----------------
+class ApproxSalesAggregator(SalesAggregator):
+    """
+    Bounded-memory variant of SalesAggregator for huge product/customer cardinalities,
+    usable with the same Part 2 analytics functions:
+        - totals, regions and daily revenue/transaction counts stay exact
+        - unique customers per day and distinct products per customer are
+          HyperLogLog estimates (relative error ~distinct_error / products_error)
+        - only the `capacity` heaviest products (by quantity) and customers
+          (by spend) are kept, via Space-Saving; their quantity/spend may be
+          overestimated by at most total / capacity, while revenue, purchase
+          counts and products are counted from when they were last admitted
+          (customer_analysis reports the estimate as unique_products, and
+          products_bought as None)
+        - Count-Min sketches give point estimates for any product or customer
+          (see estimate_product_quantity / estimate_customer_spend)
+    low_performing_products only sees the monitored (heavy) products here.
+    """
+
+    def __init__(self, capacity=1000, distinct_error=0.01, products_error=0.05,
+                 cms_epsilon=0.001, cms_delta=0.01):
+        super().__init__()
+        self.capacity = capacity
+        self.distinct_error = distinct_error
+        self.products_error = products_error
+        self.top_products = SpaceSaving(capacity)
+        self.top_customers = SpaceSaving(capacity)
+        self.product_quantities = CountMinSketch(cms_epsilon, cms_delta)
+        self.customer_spend = CountMinSketch(cms_epsilon, cms_delta)
+
+    def add(self, tx):
+        amt = tx['Quantity'] * tx['UnitPrice']
+        self.row_count += 1
+        self.total_revenue += amt
+
+        r = tx['Region']
+        if r not in self.regions:
+            self.regions[r] = {'total_sales': 0.0, 'transaction_count': 0}
+        region = self.regions[r]
+        region['total_sales'] += amt
+        region['transaction_count'] += 1
+
+        p = tx['ProductName']
+        p_hash = hash64(p)
+        self.product_quantities.add_hash(p_hash, tx['Quantity'])
+        evicted = self.top_products.offer(p, tx['Quantity'])
+        if evicted is not None:
+            del self.products[evicted]
+        if p not in self.products:
+            self.products[p] = {'total_quantity': 0, 'total_revenue': 0.0}
+        product = self.products[p]
+        product['total_quantity'] = self.top_products.counts[p]
+        product['total_revenue'] += amt
+
+        c = tx['CustomerID']
+        c_hash = hash64(c)
+        self.customer_spend.add_hash(c_hash, amt)
+        evicted = self.top_customers.offer(c, amt)
+        if evicted is not None:
+            del self.customers[evicted]
+        if c not in self.customers:
+            self.customers[c] = {'total_spent': 0.0, 'purchase_count': 0,
+                                 'products_bought': HyperLogLog(self.products_error)}
+        customer = self.customers[c]
+        customer['total_spent'] = self.top_customers.counts[c]
+        customer['purchase_count'] += 1
+        customer['products_bought'].add_hash(p_hash)
+
+        d = tx['Date']
+        if d not in self.daily:
+            self.daily[d] = {'revenue': 0.0, 'transaction_count': 0,
+                             'unique_customers': HyperLogLog(self.distinct_error)}
+        day = self.daily[d]
+        day['revenue'] += amt
+        day['transaction_count'] += 1
+        day['unique_customers'].add_hash(c_hash)
+
+    def merge(self, other):
+        self.row_count += other.row_count
+        self.total_revenue += other.total_revenue
+
+        for r, stats in other.regions.items():
+            if r not in self.regions:
+                self.regions[r] = {'total_sales': 0.0, 'transaction_count': 0}
+            region = self.regions[r]
+            region['total_sales'] += stats['total_sales']
+            region['transaction_count'] += stats['transaction_count']
+
+        for p, stats in other.products.items():
+            if p not in self.products:
+                self.products[p] = {'total_quantity': 0, 'total_revenue': 0.0}
+            self.products[p]['total_revenue'] += stats['total_revenue']
+        for p in self.top_products.merge(other.top_products):
+            del self.products[p]
+        for p, count in self.top_products.counts.items():
+            self.products[p]['total_quantity'] = count
+
+        for c, stats in other.customers.items():
+            if c not in self.customers:
+                self.customers[c] = {'total_spent': 0.0, 'purchase_count': 0,
+                                     'products_bought': HyperLogLog(self.products_error)}
+            customer = self.customers[c]
+            customer['purchase_count'] += stats['purchase_count']
+            customer['products_bought'].merge(stats['products_bought'])
+        for c in self.top_customers.merge(other.top_customers):
+            del self.customers[c]
+        for c, spent in self.top_customers.counts.items():
+            self.customers[c]['total_spent'] = spent
+
+        for d, stats in other.daily.items():
+            if d not in self.daily:
+                self.daily[d] = {'revenue': 0.0, 'transaction_count': 0,
+                                 'unique_customers': HyperLogLog(self.distinct_error)}
+            day = self.daily[d]
+            day['revenue'] += stats['revenue']
+            day['transaction_count'] += stats['transaction_count']
+            day['unique_customers'].merge(stats['unique_customers'])
+
+        self.product_quantities.merge(other.product_quantities)
+        self.customer_spend.merge(other.customer_spend)
+        return self
+
+    def get_state(self):
+        raise NotImplementedError("approximate aggregates are not checkpointed; use exact mode")
+
+    def estimate_product_quantity(self, product_name):
+        return self.product_quantities.estimate(product_name)
+
+    def estimate_customer_spend(self, customer_id):
+        return self.customer_spend.estimate(customer_id)
+
+
+def make_aggregator(approximate=None):
+    """
+    Returns: a SalesAggregator, or an ApproxSalesAggregator when `approximate` is
+    True or a dict (possibly empty) of its options (capacity, distinct_error,
+    products_error, cms_epsilon, cms_delta)
+    """
+    if approximate is True:
+        return ApproxSalesAggregator()
+    if isinstance(approximate, dict):
+        return ApproxSalesAggregator(**approximate)
+    return SalesAggregator()
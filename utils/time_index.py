@@ -0,0 +1,207 @@
+# utils/time_index.py
+
+from calendar import monthrange
+from datetime import date, timedelta
+from itertools import accumulate
+
+from utils.data_processor import daily_sales_trend
+
+
+def _parse_date(value, name):
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an ISO date (YYYY-MM-DD), not {value!r}") from None
+
+
+# ---------------- Daily time index ----------------
+class DailyTimeIndex:
+    """
+    Dense day-by-day revenue and transaction arrays from the first to the last
+    sales date (days without sales are zero), with cumulative prefix sums.
+    Built in O(days) from daily_sales_trend output in any date order; the
+    revenue or transaction count of any date range is then O(1).
+    Weeks are ISO weeks (Monday to Sunday, labelled YYYY-Www) and months are
+    calendar months (YYYY-MM); the first and last period may be partial.
+    Dates that are not ISO dates (e.g. 12/30/2024) cannot be placed on the
+    axis; they are left out and listed in `skipped_days`, with their
+    transactions counted in `skipped_transactions`.
+    """
+
+    def __init__(self, daily_trends):
+        self.daily_trends = daily_trends
+        days, stats = [], []
+        self.skipped_days = []
+        self.skipped_transactions = 0
+        for d, day_stats in daily_trends.items():
+            try:
+                days.append(date.fromisoformat(d))
+            except (TypeError, ValueError):
+                self.skipped_days.append(d)
+                self.skipped_transactions += day_stats['transaction_count']
+                continue
+            stats.append(day_stats)
+        self.start = min(days) if days else None
+        self.end = max(days) if days else None
+        size = (self.end - self.start).days + 1 if days else 0
+
+        revenue = [0.0] * size
+        counts = [0] * size
+        for day, day_stats in zip(days, stats):
+            pos = (day - self.start).days
+            revenue[pos] += day_stats['revenue']
+            counts[pos] += day_stats['transaction_count']
+        self.revenue = revenue
+        self.transaction_counts = counts
+        # _revenue_sums[i] = revenue of the first i days
+        self._revenue_sums = [0.0] + list(accumulate(revenue))
+        self._count_sums = [0] + list(accumulate(counts))
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """
+        Builds the index from transactions or a SalesAggregator, via daily_sales_trend
+        """
+        return cls(daily_sales_trend(transactions))
+
+    def __len__(self):
+        return len(self.revenue)
+
+    def date_at(self, pos):
+        return (self.start + timedelta(days=pos)).isoformat()
+
+    def _span(self, start_date, end_date):
+        """
+        Returns: [lo, hi) positions of the inclusive date range, clipped to the index
+        Raises: ValueError when a bound is not an ISO date
+        """
+        start = _parse_date(start_date, 'start_date') if start_date is not None else None
+        end = _parse_date(end_date, 'end_date') if end_date is not None else None
+        if not self.revenue:
+            return 0, 0
+        lo = (start - self.start).days if start is not None else 0
+        hi = (end - self.start).days + 1 if end is not None else len(self.revenue)
+        lo = min(max(lo, 0), len(self.revenue))
+        hi = min(max(hi, lo), len(self.revenue))
+        return lo, hi
+
+    # ---------------- Range queries ----------------
+    def range_revenue(self, start_date=None, end_date=None):
+        lo, hi = self._span(start_date, end_date)
+        return self._revenue_sums[hi] - self._revenue_sums[lo]
+
+    def range_transactions(self, start_date=None, end_date=None):
+        lo, hi = self._span(start_date, end_date)
+        return self._count_sums[hi] - self._count_sums[lo]
+
+    def moving_average(self, window=7):
+        """
+        Trailing `window`-day average daily revenue (days without sales count as zero).
+        Returns: dict of date -> average, for every date with a full window behind it
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        sums = self._revenue_sums
+        return {
+            self.date_at(pos): round((sums[pos + 1] - sums[pos + 1 - window]) / window, 2)
+            for pos in range(window - 1, len(self.revenue))
+        }
+
+    # ---------------- Periods ----------------
+    def _periods(self, key):
+        """
+        Groups consecutive days by key(day).
+        Returns: list of (label, first day, lo, hi)
+        """
+        labels = [key(self.start + timedelta(days=pos)) for pos in range(len(self.revenue))]
+        periods = []
+        lo = 0
+        for pos in range(1, len(labels) + 1):
+            if pos == len(labels) or labels[pos] != labels[lo]:
+                periods.append((labels[lo], self.start + timedelta(days=lo), lo, pos))
+                lo = pos
+        return periods
+
+    def _period_stats(self, key, period_days):
+        """
+        Growth compares revenue totals when both periods are complete, and average
+        daily revenue when either is partial (the edges of the data).
+        """
+        result = {}
+        previous = None
+        for label, first, lo, hi in self._periods(key):
+            revenue = self._revenue_sums[hi] - self._revenue_sums[lo]
+            complete = hi - lo == period_days(first)
+            growth = None
+            if previous is not None:
+                prev_revenue, prev_days, prev_complete = previous
+                if complete and prev_complete:
+                    current, before = revenue, prev_revenue
+                else:
+                    current, before = revenue / (hi - lo), prev_revenue / prev_days
+                if before:
+                    growth = round((current - before) / before * 100, 2)
+            result[label] = {
+                'start_date': first.isoformat(),
+                'end_date': self.date_at(hi - 1),
+                'days': hi - lo,
+                'complete': complete,
+                'revenue': revenue,
+                'transaction_count': self._count_sums[hi] - self._count_sums[lo],
+                'growth_pct': growth
+            }
+            previous = (revenue, hi - lo, complete)
+        return result
+
+    def weekly(self):
+        """
+        Returns: dict of ISO week -> {'start_date', 'end_date', 'days', 'complete', 'revenue',
+                 'transaction_count', 'growth_pct'} with week-over-week growth
+                 (None for the first week or after a week without revenue)
+        """
+        return self._period_stats(lambda day: "{}-W{:02d}".format(*day.isocalendar()[:2]), lambda first: 7)
+
+    def monthly(self):
+        """
+        Returns: dict of YYYY-MM -> same fields as weekly(), with month-over-month growth
+        """
+        return self._period_stats(lambda day: f"{day.year}-{day.month:02d}",
+                                  lambda first: monthrange(first.year, first.month)[1])
+
+    @staticmethod
+    def _peak(periods):
+        # Partial edge periods only compete when no period is complete
+        candidates = [p for p in periods if periods[p]['complete']] or list(periods)
+        if not candidates:
+            return None
+        label = max(candidates, key=lambda p: periods[p]['revenue'])
+        return label, periods[label]['revenue'], periods[label]['transaction_count']
+
+    def peak_week(self):
+        """
+        Returns: (ISO week, revenue, transaction count) of the highest-revenue complete week
+                 (any week if none is complete), or None
+        """
+        return self._peak(self.weekly())
+
+    def peak_month(self):
+        """
+        Returns: (YYYY-MM, revenue, transaction count) of the highest-revenue complete month
+                 (any month if none is complete), or None
+        """
+        return self._peak(self.monthly())
+
+
+# ---------------- Period analytics ----------------
+def weekly_sales_trend(transactions):
+    return DailyTimeIndex.from_transactions(transactions).weekly()
+
+
+def monthly_sales_trend(transactions):
+    return DailyTimeIndex.from_transactions(transactions).monthly()
+
+
+def moving_average_revenue(transactions, window=7):
+    return DailyTimeIndex.from_transactions(transactions).moving_average(window)
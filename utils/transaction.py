@@ -0,0 +1,112 @@
+# utils/transaction.py
+
+import gc
+from sys import intern
+from contextlib import contextmanager
+
+
+# ---------------- Transaction record ----------------
+class Transaction:
+    """
+    Compact sales row. Fields live in __slots__ instead of a per-row dict, and the
+    categorical fields (Date, ProductID, ProductName, CustomerID, Region) are
+    interned, so every row shares one string object per distinct value.
+    Amount is set once by validation, API_Match/Category/Price by enrichment.
+    Supports the dict operations the pipeline uses: tx[key], tx[key] = value,
+    get, `in`, keys/items/iteration, dict(tx) and == against dicts.
+    """
+
+    FIELDS = ('TransactionID', 'Date', 'ProductID', 'ProductName', 'Quantity', 'UnitPrice', 'CustomerID', 'Region')
+    DERIVED = ('Amount', 'API_Match', 'Category', 'Price')
+    __slots__ = FIELDS + DERIVED
+
+    def __init__(self, TransactionID, Date, ProductID, ProductName, Quantity, UnitPrice, CustomerID, Region):
+        self.TransactionID = TransactionID
+        self.Date = intern(Date)
+        self.ProductID = intern(ProductID)
+        self.ProductName = intern(ProductName)
+        self.Quantity = Quantity
+        self.UnitPrice = UnitPrice
+        self.CustomerID = intern(CustomerID)
+        self.Region = intern(Region)
+
+    # ---------------- Dict-like access ----------------
+    def __getitem__(self, key):
+        if key in _SLOTS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in _SLOTS:
+            raise KeyError(f"Transaction has no field {key!r}")
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in _SLOTS and hasattr(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return [key for key in self.__slots__ if hasattr(self, key)]
+
+    def values(self):
+        return [getattr(self, key) for key in self.keys()]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def to_dict(self):
+        """
+        Returns: plain dict with the set fields in column order (as json.dump expects)
+        """
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (Transaction, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Transaction({self.to_dict()!r})"
+
+
+_SLOTS = frozenset(Transaction.__slots__)
+
+
+def json_default(obj):
+    """
+    `default` hook for json.dump/json.dumps so Transactions serialize like dicts
+    """
+    if isinstance(obj, Transaction):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+@contextmanager
+def gc_paused():
+    """
+    Building millions of Transactions triggers repeated, useless cyclic GC passes
+    (unlike dicts of plain values, __slots__ objects are always GC-tracked)
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
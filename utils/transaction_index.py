@@ -0,0 +1,110 @@
+# utils/transaction_index.py
+
+from bisect import bisect_left, bisect_right
+
+
+# ---------------- Transaction index ----------------
+class TransactionIndex:
+    """
+    Secondary indexes over validated transactions, built once so repeated filter
+    queries do not rescan the rows:
+        region  - hash index Region -> row ids
+        date    - hash index Date -> row ids, plus the sorted dates for ranges
+        amount  - row ids sorted by Amount, range-searched with bisect
+        cells   - (Region, Date) -> row ids sorted by Amount, for combined filters
+    A single-column filter is answered from its own index. Combined filters visit
+    only the matching (Region, Date) cells and bisect the amount range inside each,
+    so no row is inspected. Row ids are positions in `transactions`.
+    """
+
+    def __init__(self, transactions):
+        self.transactions = transactions if isinstance(transactions, list) else list(transactions)
+
+        self.by_region = {}
+        self.by_date = {}
+        for row_id, tx in enumerate(self.transactions):
+            self.by_region.setdefault(tx['Region'], []).append(row_id)
+            self.by_date.setdefault(tx['Date'], []).append(row_id)
+
+        amounts = [tx['Amount'] for tx in self.transactions]
+        self._amount_order = sorted(range(len(amounts)), key=amounts.__getitem__)
+        self._amounts = [amounts[i] for i in self._amount_order]
+        self._dates = sorted(self.by_date)
+
+        # Walking the rows in amount order keeps every cell sorted by amount
+        cells = {}
+        for row_id, amount in zip(self._amount_order, self._amounts):
+            tx = self.transactions[row_id]
+            key = (tx['Region'], tx['Date'])
+            if key not in cells:
+                cells[key] = ([], [])
+            cell = cells[key]
+            cell[0].append(amount)
+            cell[1].append(row_id)
+        self._cells = cells
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def regions(self):
+        return sorted(r for r in self.by_region if r)
+
+    def amount_range(self):
+        """
+        Returns: (min, max) Amount, or (0, 0) when empty
+        """
+        return (self._amounts[0], self._amounts[-1]) if self._amounts else (0, 0)
+
+    @staticmethod
+    def _bounds(values, low, high):
+        lo = bisect_left(values, low) if low is not None else 0
+        hi = bisect_right(values, high) if high is not None else len(values)
+        return lo, max(lo, hi)
+
+    # ---------------- Queries ----------------
+    def query(self, region=None, min_amount=None, max_amount=None, start_date=None, end_date=None):
+        """
+        Row ids (ascending, i.e. file order) of transactions matching all given filters.
+        `region` may be a single Region name or a collection of names; amount and
+        date bounds are inclusive, dates compare as YYYY-MM-DD strings.
+        """
+        if isinstance(region, str):
+            region = [region]
+        regions = list(dict.fromkeys(region)) if region else None
+        has_amount = min_amount is not None or max_amount is not None
+        if start_date is not None or end_date is not None:
+            dates = self._dates[slice(*self._bounds(self._dates, start_date, end_date))]
+        else:
+            dates = None
+
+        if regions is None and dates is None:
+            if not has_amount:
+                return list(range(len(self.transactions)))
+            lo, hi = self._bounds(self._amounts, min_amount, max_amount)
+            return sorted(self._amount_order[lo:hi])
+
+        if not has_amount and (regions is None or dates is None):
+            index, keys = (self.by_region, regions) if dates is None else (self.by_date, dates)
+            if len(keys) == 1:
+                return list(index.get(keys[0], ()))
+            return sorted(i for key in keys for i in index.get(key, ()))
+
+        row_ids = []
+        cells = self._cells
+        for r in regions if regions is not None else self.by_region:
+            for d in dates if dates is not None else self._dates:
+                cell = cells.get((r, d))
+                if cell is not None:
+                    if has_amount:
+                        lo, hi = self._bounds(cell[0], min_amount, max_amount)
+                        row_ids += cell[1][lo:hi]
+                    else:
+                        row_ids += cell[1]
+        row_ids.sort()
+        return row_ids
+
+    def filter(self, **filters):
+        """
+        Like query, but returns the matching transactions in file order
+        """
+        return [self.transactions[i] for i in self.query(**filters)]
@@ -0,0 +1,305 @@
+# utils/transaction_store.py
+
+import os
+import json
+import time
+import sqlite3
+from itertools import islice
+
+from utils.file_handler import iter_sales_data, source_fingerprint
+from utils.data_processor import iter_transactions, iter_valid_transactions, empty_summary, SalesAggregator
+from utils.transaction import Transaction, gc_paused
+from utils.validation_rules import DEFAULT_RULESET, QuarantineWriter
+from utils.dedup import make_deduplicator
+
+STORE_BATCH = 50_000  # Rows per executemany call; the whole load is one transaction
+# Led by Region, Date, ProductName and CustomerID, and covering the columns each
+# GROUP BY reads, so aggregate() scans indexes instead of the table; Region +
+# Amount also answers the main.py filters with one range search
+INDEXES = {
+    'region': ('Region', 'Amount'),
+    'date': ('Date', 'CustomerID', 'Amount'),
+    'product': ('ProductName', 'Quantity', 'Amount'),
+    'customer': ('CustomerID', 'ProductName', 'Amount')
+}
+COLUMNS = Transaction.FIELDS + ('Amount',)
+
+
+def store_path(filename):
+    return filename + '.sqlite'
+
+
+# ---------------- Transaction store ----------------
+class TransactionStore:
+    """
+    Validated transactions in a local SQLite database (WAL mode), so datasets
+    larger than memory can be analyzed and a loaded file is reused across runs.
+    Rows are bulk-loaded with executemany in one transaction together with the
+    indexes on Region, Date, ProductName and CustomerID (see INDEXES, built after
+    the rows) and the load metadata, so an interrupted reload leaves the previous
+    contents in place.
+    Analytics are pushed down as GROUP BY queries: aggregate() fills a
+    SalesAggregator from them, so the Part 2 functions run on it unchanged and
+    only the groups, never the rows, are held in memory.
+    """
+
+    def __init__(self, path, batch_size=STORE_BATCH):
+        self.path = path
+        self.batch_size = batch_size
+        # Autocommit mode: transactions are opened and closed explicitly (see _replace)
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; only the last commit may be lost
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS store_meta ("
+            " id INTEGER PRIMARY KEY CHECK (id = 0),"
+            " source TEXT NOT NULL,"  # JSON source_fingerprint of the loaded file
+            " rules TEXT NOT NULL,"
+            " dedup TEXT NOT NULL,"
+            " summary TEXT NOT NULL,"  # JSON iter_valid_transactions summary of the load
+            " loaded_at REAL NOT NULL)"
+        )
+        self._create_table()
+
+    def _create_table(self):
+        # seq keeps file order: groups are read back in first-seen order
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS transactions ("
+            " seq INTEGER PRIMARY KEY,"
+            " TransactionID TEXT NOT NULL,"
+            " Date TEXT NOT NULL,"
+            " ProductID TEXT NOT NULL,"
+            " ProductName TEXT NOT NULL,"
+            " Quantity INTEGER NOT NULL,"
+            " UnitPrice REAL NOT NULL,"
+            " CustomerID TEXT NOT NULL,"
+            " Region TEXT NOT NULL,"
+            " Amount REAL NOT NULL)"
+        )
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    # ---------------- Loading ----------------
+    def load(self, transactions, source=None, rules=None, dedup='exact', summary=None):
+        """
+        Replaces the stored rows with `transactions` (validated, with Amount set),
+        recording where they came from so is_current() can skip the next load.
+        Returns: number of rows loaded
+        """
+        return self._replace(transactions, source, rules, dedup, summary if summary is not None else empty_summary())
+
+    def _replace(self, transactions, source, rules, dedup, summary):
+        """
+        Drops the old rows, inserts the new ones, builds the indexes and writes the
+        metadata in one transaction; any error or interrupt rolls all of it back.
+        `summary` may still be filled while `transactions` is consumed.
+        Returns: number of rows loaded
+        """
+        db = self.db
+        insert = f"INSERT INTO transactions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        rows = ((tx['TransactionID'], tx['Date'], tx['ProductID'], tx['ProductName'], tx['Quantity'],
+                 tx['UnitPrice'], tx['CustomerID'], tx['Region'], tx['Amount']) for tx in transactions)
+        db.execute("BEGIN")
+        try:
+            db.execute("DROP TABLE IF EXISTS transactions")  # Drops its indexes too
+            db.execute("DELETE FROM store_meta")
+            self._create_table()
+            count = 0
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                db.executemany(insert, batch)
+                count += len(batch)
+
+            # Built once after the load instead of being updated row by row
+            for name, columns in INDEXES.items():
+                db.execute(f"CREATE INDEX idx_transactions_{name} ON transactions ({', '.join(columns)})")
+            db.execute(
+                "INSERT INTO store_meta VALUES (0, ?, ?, ?, ?, ?)",
+                (json.dumps(source), (rules or DEFAULT_RULESET).fingerprint(), dedup,
+                 json.dumps({**summary, 'regions': sorted(summary['regions'])}), time.time())
+            )
+            db.execute("COMMIT")
+        except BaseException:  # Including KeyboardInterrupt
+            db.execute("ROLLBACK")
+            raise
+        return count
+
+    def is_current(self, source, rules=None, dedup='exact'):
+        """
+        Returns: the stored load summary if the rows were loaded from this exact file
+                 content with the same rules and dedup mode, otherwise None
+        """
+        row = self.db.execute("SELECT source, rules, dedup, summary FROM store_meta WHERE id = 0").fetchone()
+        if row is None:
+            return None
+        stored = json.loads(row[0]) or {}
+        if (stored.get('hash') != source['hash'] or stored.get('size') != source['size'] or
+                row[1] != (rules or DEFAULT_RULESET).fingerprint() or row[2] != dedup):
+            return None
+        summary = json.loads(row[3])
+        summary['regions'] = set(summary['regions'])
+        return summary
+
+    def load_file(self, filename, dedup='exact', rules=None, quarantine=None):
+        """
+        Streams a sales file through parsing and validation into the store, unless
+        the store already holds it (same content, rules and dedup mode). With a
+        `quarantine` path, the rejected lines of a load are written there.
+        Returns: (summary, True if the file was loaded or False if it was reused)
+        """
+        if not os.path.exists(filename):
+            print(f"Error: File '{filename}' not found.")
+            return empty_summary(), False
+
+        source = source_fingerprint(filename)
+        summary = self.is_current(source, rules, dedup)
+        if summary is not None:
+            return summary, False
+
+        summary, malformed = {}, {}
+        deduplicator = make_deduplicator(dedup)
+        quarantine = QuarantineWriter(quarantine) if quarantine else None
+
+        def valid_rows():
+            with_lines = quarantine is not None
+            yield from iter_valid_transactions(iter_transactions(iter_sales_data(filename), malformed, quarantine,
+                                                                 with_lines),
+                                               summary, dedup=deduplicator, rules=rules, quarantine=quarantine,
+                                               with_lines=with_lines)
+            summary['malformed'] = malformed  # Complete once the stream is, before the metadata is written
+
+        try:
+            with gc_paused():
+                self._replace(valid_rows(), source, rules, dedup, summary)
+        finally:
+            if quarantine is not None:
+                quarantine.close()
+            if deduplicator is not None:
+                deduplicator.close()
+        return summary, True
+
+    # ---------------- Queries ----------------
+    def regions(self):
+        return [r for (r,) in self.db.execute("SELECT DISTINCT Region FROM transactions ORDER BY Region") if r]
+
+    def amount_range(self):
+        """
+        Returns: (min, max) Amount, or (0, 0) when empty
+        """
+        low, high = self.db.execute("SELECT MIN(Amount), MAX(Amount) FROM transactions").fetchone()
+        return (low, high) if low is not None else (0, 0)
+
+    @staticmethod
+    def _where(region=None, min_amount=None, max_amount=None):
+        """
+        Same filter semantics as iter_valid_transactions, as a WHERE clause.
+        Returns: (sql, parameters)
+        """
+        clauses, params = [], []
+        if isinstance(region, str):
+            region = [region]
+        if region:
+            region = list(region)
+            clauses.append(f"Region IN ({', '.join('?' * len(region))})")
+            params += region
+        if min_amount:
+            clauses.append("Amount >= ?")
+            params.append(min_amount)
+        if max_amount:
+            clauses.append("Amount <= ?")
+            params.append(max_amount)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, region=None, min_amount=None, max_amount=None):
+        where, params = self._where(region, min_amount, max_amount)
+        return self.db.execute(f"SELECT COUNT(*) FROM transactions{where}", params).fetchone()[0]
+
+    def _groups(self, table, columns, aggregates=""):
+        # Ordered by each group's first row, like the insertion order of SalesAggregator
+        return self.db.execute(f"SELECT {columns}{aggregates} FROM {table} GROUP BY {columns} ORDER BY MIN(seq)")
+
+    def aggregate(self, region=None, min_amount=None, max_amount=None):
+        """
+        Fills a SalesAggregator with GROUP BY queries over the matching rows.
+        Groups are in first-row order, so ties rank as with aggregate_sales over
+        the rows; sums may differ from it only by float rounding.
+        With filters, the matching rows are first copied into a temporary table by
+        one index search, so the GROUP BYs scan only them instead of looking each
+        one up in the table again.
+        """
+        where, params = self._where(region, min_amount, max_amount)
+        table = 'transactions'
+        if where:
+            table = 'temp.selected_transactions'
+            self.db.execute(f"DROP TABLE IF EXISTS {table}")
+            self.db.execute(f"CREATE TABLE {table} AS SELECT seq, Date, ProductName, Quantity, CustomerID, Region, "
+                            f"Amount FROM transactions{where}", params)
+        try:
+            agg = SalesAggregator()
+            agg.row_count, agg.total_revenue = self.db.execute(
+                f"SELECT COUNT(*), TOTAL(Amount) FROM {table}").fetchone()
+            agg.regions = {
+                r: {'total_sales': sales, 'transaction_count': count}
+                for r, sales, count in self._groups(table, "Region", ", TOTAL(Amount), COUNT(*)")
+            }
+            agg.products = {
+                p: {'total_quantity': quantity, 'total_revenue': revenue}
+                for p, quantity, revenue in self._groups(table, "ProductName", ", SUM(Quantity), TOTAL(Amount)")
+            }
+            agg.customers = {
+                c: {'total_spent': spent, 'purchase_count': count, 'products_bought': set()}
+                for c, spent, count in self._groups(table, "CustomerID", ", TOTAL(Amount), COUNT(*)")
+            }
+            for c, p in self._groups(table, "CustomerID, ProductName"):
+                agg.customers[c]['products_bought'].add(p)
+            agg.daily = {
+                d: {'revenue': revenue, 'transaction_count': count, 'unique_customers': set()}
+                for d, revenue, count in self._groups(table, "Date", ", TOTAL(Amount), COUNT(*)")
+            }
+            for d, c in self._groups(table, "Date, CustomerID"):
+                agg.daily[d]['unique_customers'].add(c)
+        finally:
+            if where:
+                self.db.execute(f"DROP TABLE {table}")
+        return agg
+
+    def transactions(self, region=None, min_amount=None, max_amount=None):
+        """
+        Returns: re-iterable StoredTransactions over the matching rows, in file order
+        """
+        return StoredTransactions(self, *self._where(region, min_amount, max_amount))
+
+
+class StoredTransactions:
+    """
+    Query result that streams Transaction records from the store on every
+    iteration instead of holding them in a list; len() is a COUNT query.
+    """
+
+    def __init__(self, store, where, params):
+        self.store = store
+        self.where = where
+        self.params = params
+
+    def __len__(self):
+        return self.store.db.execute(f"SELECT COUNT(*) FROM transactions{self.where}", self.params).fetchone()[0]
+
+    def __iter__(self):
+        cursor = self.store.db.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM transactions{self.where} ORDER BY seq", self.params)
+        for row in cursor:
+            tx = Transaction(*row[:8])
+            tx.Amount = row[8]
+            yield tx
@@ -0,0 +1,291 @@
+# utils/validation_rules.py
+
+import re
+import json
+import hashlib
+import operator
+from datetime import datetime
+from functools import lru_cache
+from numbers import Real
+
+from utils.transaction import Transaction
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only RuleSet.check_columns needs it
+    np = None
+
+# The checks validate_and_filter always applied, in the same order; the first
+# rule a transaction fails is its invalid reason.
+DEFAULT_RULES = [
+    {'name': 'non_positive_quantity', 'field': 'Quantity', 'type': 'range', 'gt': 0},
+    {'name': 'non_positive_unit_price', 'field': 'UnitPrice', 'type': 'range', 'gt': 0},
+    {'name': 'bad_transaction_id', 'field': 'TransactionID', 'type': 'prefix', 'prefix': 'T'},
+    {'name': 'bad_product_id', 'field': 'ProductID', 'type': 'prefix', 'prefix': 'P'},
+    {'name': 'bad_customer_id', 'field': 'CustomerID', 'type': 'prefix', 'prefix': 'C'}
+]
+RULE_TYPES = ('range', 'prefix', 'regex', 'one_of', 'date_format')
+RANGE_BOUNDS = {'gt': operator.gt, 'ge': operator.ge, 'lt': operator.lt, 'le': operator.le}
+# Parsed field types; range works on the numbers, the text rules on the strings
+NUMERIC_FIELDS = ('Quantity', 'UnitPrice')
+TEXT_RULES = ('prefix', 'regex', 'date_format')
+
+
+@lru_cache(maxsize=4096)
+def _date_ok(fmt, value):
+    # Dates have few distinct values, so each is parsed once
+    try:
+        datetime.strptime(value, fmt)
+        return True
+    except ValueError:
+        return False
+
+
+def _check_rule(rule):
+    """
+    Validates one rule spec, including that its type and parameters fit the
+    field's parsed type (numbers for Quantity/UnitPrice, strings otherwise).
+    Returns: its prepared parameter (bounds dict, prefix, compiled regex, value set or date format)
+    """
+    missing = {'name', 'field', 'type'} - set(rule)
+    if missing:
+        raise ValueError(f"rule {rule!r} is missing {', '.join(sorted(missing))}")
+    name, field, kind = rule['name'], rule['field'], rule['type']
+    if field not in Transaction.FIELDS:
+        raise ValueError(f"rule {name!r}: unknown field {field!r}")
+    if kind not in RULE_TYPES:
+        raise ValueError(f"rule {name!r}: unknown type {kind!r} (expected one of {', '.join(RULE_TYPES)})")
+    numeric = field in NUMERIC_FIELDS
+    if kind == 'range' and not numeric:
+        raise ValueError(f"rule {name!r}: range needs a numeric field ({', '.join(NUMERIC_FIELDS)}), not {field!r}")
+    if kind in TEXT_RULES and numeric:
+        raise ValueError(f"rule {name!r}: {kind} needs a text field, not the numeric {field!r}")
+
+    def parameter(key, expected, description):
+        if key not in rule:
+            raise ValueError(f"rule {name!r}: {kind} needs {key!r}")
+        value = rule[key]
+        if not isinstance(value, expected) or isinstance(value, bool):
+            raise ValueError(f"rule {name!r}: {key!r} must be {description}, not {value!r}")
+        return value
+
+    if kind == 'range':
+        bounds = {key: parameter(key, Real, "a number") for key in RANGE_BOUNDS if key in rule}
+        if not bounds:
+            raise ValueError(f"rule {name!r}: a range needs gt, ge, lt or le")
+        return bounds
+    if kind == 'prefix':
+        return parameter('prefix', str, "a string")
+    if kind == 'regex':
+        try:
+            return re.compile(parameter('pattern', str, "a string"))
+        except re.error as e:
+            raise ValueError(f"rule {name!r}: invalid pattern: {e}") from None
+    if kind == 'one_of':
+        values = parameter('values', list, "a list")
+        expected, description = (Real, "numbers") if numeric else (str, "strings")
+        wrong = [v for v in values if not isinstance(v, expected) or isinstance(v, bool)]
+        if wrong:
+            raise ValueError(f"rule {name!r}: values of {field!r} must be {description}, not {wrong[0]!r}")
+        return frozenset(values)
+    return parameter('format', str, "a string") if 'format' in rule else '%Y-%m-%d'
+
+
+def _operations(rule, constant):
+    """
+    Returns: the rule as (field, function, constant, value_first) steps that must
+    all pass; value_first steps call function(value, constant), the others
+    function(constant, value). All functions are C-level (operators, str and
+    pattern methods, the cached date check).
+    """
+    field, kind = rule['field'], rule['type']
+    if kind == 'range':
+        return [(field, RANGE_BOUNDS[key], bound, True) for key, bound in constant.items()]
+    if kind == 'prefix':
+        return [(field, str.startswith, constant, True)]
+    if kind == 'regex':
+        return [(field, re.Pattern.fullmatch, constant, False)]  # A match is truthy, None is not
+    if kind == 'one_of':
+        return [(field, frozenset.__contains__, constant, False)]
+    return [(field, _date_ok, constant, False)]
+
+
+def _group_check(function, value_first, get, constants):
+    if value_first:
+        return lambda tx: all(map(function, get(tx), constants))
+    return lambda tx: all(map(function, constants, get(tx)))
+
+
+def _both(first, second):
+    return lambda tx: first(tx) and second(tx)
+
+
+def _all_of(getter, steps):
+    """
+    Composes steps into `tx -> bool`. `getter` is operator.attrgetter (Transaction
+    records) or operator.itemgetter (dicts). Steps sharing a function run as one
+    all(map(function, values, constants)) over a single multi-field getter call,
+    so the per-rule work stays in C and stops at the first failure.
+    """
+    groups = {}
+    for field, function, constant, value_first in steps:
+        fields, constants = groups.setdefault((function, value_first), ([], []))
+        fields.append(field)
+        constants.append(constant)
+
+    check = None
+    for (function, value_first), (fields, constants) in groups.items():
+        get = getter(*fields)
+        if len(fields) == 1:
+            get = (lambda get: lambda tx: (get(tx),))(get)  # A single-field getter returns the bare value
+        group = _group_check(function, value_first, get, tuple(constants))
+        check = group if check is None else _both(check, group)
+    return check or (lambda tx: True)
+
+
+# ---------------- Rule set ----------------
+class RuleSet:
+    """
+    Declarative validation rules compiled once into a single predicate.
+    Each rule is a dict with 'name' (the rejection reason), 'field', 'type' and
+    its parameters:
+        range        gt / ge / lt / le bounds      {'type': 'range', 'gt': 0}
+        prefix       'prefix'                      {'type': 'prefix', 'prefix': 'T'}
+        regex        'pattern' (full match)        {'type': 'regex', 'pattern': r'T\\d+'}
+        one_of       'values'                      {'type': 'one_of', 'values': ['North', 'South']}
+        date_format  'format' (strptime)           {'type': 'date_format', 'format': '%Y-%m-%d'}
+    Rules are checked at load time against the field types and composed into
+    one predicate (check_record reads Transaction attributes, check_mapping
+    dict items); failures(tx) and check_columns() attribute rejections to rules.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = [dict(rule) for rule in (DEFAULT_RULES if rules is None else rules)]
+        self._constants = [_check_rule(rule) for rule in self.rules]
+        names = [rule['name'] for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError("rule names must be unique")
+        self.names = names
+        steps = [_operations(rule, constant) for rule, constant in zip(self.rules, self._constants)]
+        self.check_record = _all_of(operator.attrgetter, [step for rule in steps for step in rule])
+        self.check_mapping = _all_of(operator.itemgetter, [step for rule in steps for step in rule])
+        self._checks = [_all_of(operator.itemgetter, rule) for rule in steps]
+
+    def fingerprint(self):
+        return hashlib.blake2b(json.dumps(self.rules, sort_keys=True).encode('utf-8'), digest_size=8).hexdigest()
+
+    # ---------------- Row-wise ----------------
+    def is_valid(self, tx):
+        if tx.__class__ is Transaction:
+            return self.check_record(tx)
+        return self.check_mapping(tx)
+
+    def failures(self, tx):
+        """
+        Returns: names of all rules the transaction fails, in rule order
+        """
+        failed = []
+        for name, check in zip(self.names, self._checks):
+            try:
+                ok = check(tx)
+            except (TypeError, AttributeError):  # e.g. a number where a string was expected
+                ok = False
+            if not ok:
+                failed.append(name)
+        return failed
+
+    # ---------------- Column batches ----------------
+    def check_columns(self, columns):
+        """
+        Evaluates the rules over whole columns with NumPy masks (see
+        columnar.iter_valid_batches). `columns` maps the fields the rules use
+        to equally long sequences or arrays.
+        Returns: (valid boolean mask, {rule: rows failing it}, {rule: rows whose first failure it is})
+        """
+        if np is None:
+            raise ImportError("NumPy is required for column-wise validation")
+        size = len(next(iter(columns.values()))) if columns else 0
+        valid = np.ones(size, dtype=bool)
+        rule_counts, reason_counts = {}, {}
+        for rule, constant in zip(self.rules, self._constants):
+            values = columns[rule['field']]
+            kind = rule['type']
+            if kind == 'range':
+                array = np.asarray(values)
+                ok = np.ones(size, dtype=bool)
+                for key, bound in constant.items():
+                    ok &= {'gt': np.greater, 'ge': np.greater_equal,
+                           'lt': np.less, 'le': np.less_equal}[key](array, bound)
+            elif kind == 'prefix':
+                ok = np.char.startswith(np.asarray(values, dtype=str), constant)
+            elif kind == 'one_of':
+                # Compared in the column's own type: numbers as numbers, text as text
+                array = np.asarray(values) if rule['field'] in NUMERIC_FIELDS else np.asarray(values, dtype=str)
+                ok = np.isin(array, list(constant))
+            elif kind == 'regex':
+                ok = np.fromiter((constant.fullmatch(v) is not None for v in values), dtype=bool, count=size)
+            else:
+                ok = np.fromiter((_date_ok(constant, v) for v in values), dtype=bool, count=size)
+
+            failed = ~ok
+            rule_counts[rule['name']] = int(failed.sum())
+            reason_counts[rule['name']] = int((failed & valid).sum())
+            valid &= ok
+        return valid, rule_counts, reason_counts
+
+
+DEFAULT_RULESET = RuleSet()
+
+
+def load_rules(path):
+    """
+    Reads a JSON list of rule specs (see RuleSet) and compiles it.
+    Returns: RuleSet
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return RuleSet(json.load(f))
+
+
+# ---------------- Quarantine ----------------
+class QuarantineWriter:
+    """
+    Buffered writer for rejected lines: `reason|line`, flushed every `buffer_lines`
+    lines, so rejections cost no per-line system call.
+    """
+
+    def __init__(self, path, buffer_lines=1000, append=False):
+        self.path = path
+        self.buffer_lines = buffer_lines
+        self.count = 0
+        self._buffer = []
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, reason, line):
+        self._buffer.append(reason + '|' + line.rstrip('\r\n') + '\n')
+        self.count += 1
+        if len(self._buffer) >= self.buffer_lines:
+            self.flush()
+
+    def write_transaction(self, reason, tx, line=None):
+        """
+        Writes the raw `line` the transaction was parsed from, or without one (e.g.
+        served from the binary cache) its fields joined with '|'
+        """
+        if line is None:
+            line = '|'.join(str(tx[field]) for field in Transaction.FIELDS)
+        self.write(reason, line)
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(''.join(self._buffer))
+            self._buffer.clear()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()